@@ -9,42 +9,84 @@ from src.text_processor import TextProcessor
 from src.vector_store import VectorStore
 from src.retriever import RAGRetriever
 from src.rag_chain import RAGChain
+from src.metrics import MetricsCollector, serve_metrics
+from src.context_compressor import ContextCompressor
+from src.api import create_api_server
+from src.index_reloader import IndexReloader
+from src.admission import AdmissionController, DeadlineExceeded, Overloaded
+from src.llm_providers import ProviderError
+from src.encoder import configure_threads
 
 class RAGChatbot:
     def __init__(self):
         self.vector_store = None
         self.retriever = None
         self.rag_chain = None
+        self.metrics_collector = None
+        self.index_reloader = None
         self.setup()
     
     def setup(self):
         """Setup RAG system"""
         print("🚀 Setting up RAG Chatbot...")
         
-        # 1. Load processed chunks
-        processor = TextProcessor()
-        chunks = processor.load_chunks("data/processed/text_chunks.json")
-        
-        if not chunks:
-            print("❌ No chunks found! Please run text processing first.")
-            return
-        
-        # 2. Setup vector store
+        # 1. Setup vector store
         print("📊 Building vector store...")
         self.vector_store = VectorStore()
         
         # Check if vector store already exists
-        if os.path.exists("data/vector_db/vector_store.json"):
-            print("📂 Loading existing vector store...")
-            self.vector_store.load("data/vector_db/vector_store")
+        # VECTOR_STORE_MMAP=1: index di-mmap read-only, dibagi antar worker process
+        use_mmap = os.getenv("VECTOR_STORE_MMAP", "0") == "1"
+        if os.path.exists("data/vector_db/vector_store_metadata.json") and \
+                self.vector_store.load("data/vector_db/vector_store", mmap=use_mmap):
+            print("📂 Loaded existing vector store")
         else:
+            # 2. Load processed chunks
+            processor = TextProcessor()
+            chunks = processor.load_chunks("data/processed/text_chunks.json")
+            
+            if not chunks:
+                print("❌ No chunks found! Please run text processing first.")
+                return
+            
             print("🔄 Creating new vector store...")
             self.vector_store.build_index(chunks)
             self.vector_store.save("data/vector_db/vector_store")
         
         # 3. Setup retriever dan RAG chain
         self.retriever = RAGRetriever(self.vector_store)
-        self.rag_chain = RAGChain(self.vector_store, self.retriever)
+        # Metrics Prometheus opsional, aktif jika METRICS_PORT di-set
+        metrics_port = os.getenv("METRICS_PORT")
+        if metrics_port:
+            self.metrics_collector = MetricsCollector()
+            serve_metrics(self.metrics_collector, port=int(metrics_port))
+        
+        # Kompresi konteks opsional, aktif jika CONTEXT_TOKEN_BUDGET di-set
+        token_budget = os.getenv("CONTEXT_TOKEN_BUDGET")
+        compressor = ContextCompressor(token_budget=int(token_budget)) if token_budget else None
+        
+        # Admission control opsional: MAX_CONCURRENT_QUERIES (+ MAX_QUEUED_QUERIES), deadline QUERY_TIMEOUT
+        max_concurrent = os.getenv("MAX_CONCURRENT_QUERIES")
+        admission = None
+        if max_concurrent:
+            admission = AdmissionController(
+                max_concurrency=int(max_concurrent),
+                max_queue=int(os.getenv("MAX_QUEUED_QUERIES", str(int(max_concurrent) * 4))))
+        query_timeout = os.getenv("QUERY_TIMEOUT")
+        
+        self.rag_chain = RAGChain(self.vector_store, self.retriever,
+                                  metrics_collector=self.metrics_collector,
+                                  compressor=compressor,
+                                  admission=admission,
+                                  default_timeout=float(query_timeout) if query_timeout else None)
+        
+        # Hot reload opsional: pantau bundle index baru setiap INDEX_RELOAD_INTERVAL detik
+        reload_interval = os.getenv("INDEX_RELOAD_INTERVAL")
+        if reload_interval:
+            self.index_reloader = IndexReloader(self.retriever, self.rag_chain,
+                                                base_path="data/vector_db/vector_store",
+                                                poll_interval=float(reload_interval), mmap=use_mmap)
+            self.index_reloader.start()
         
         print("✅ RAG Chatbot ready!")
     
@@ -64,14 +106,43 @@ class RAGChatbot:
                 continue
             
             print("🔍 Mencari jawaban...")
-            result = self.rag_chain.query(question)
+            try:
+                result = self.rag_chain.query(question, session_id="cli")
+            except (Overloaded, DeadlineExceeded) as e:
+                print(f"\n⚠️ Sistem sedang sibuk ({e}), silakan coba lagi.\n")
+                continue
+            except ProviderError as e:
+                print(f"\n❌ LLM tidak tersedia ({e}), silakan coba lagi.\n")
+                continue
             
             print(f"\n🤖 Jawaban: {result['response']}\n")
             print("-" * 50)
+    
+    def serve(self, host: str = "0.0.0.0", port: int = 8000):
+        """HTTP API interface (POST /query, GET /metrics)"""
+        if self.rag_chain.metrics_collector is None:
+            self.metrics_collector = MetricsCollector()
+            self.rag_chain.metrics_collector = self.metrics_collector
+        
+        server = create_api_server(self.rag_chain, self.metrics_collector, host=host, port=port)
+        print(f"🌐 RAG API aktif di http://{host}:{port} (POST /query)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("👋 Server dihentikan")
+            server.server_close()
 
 def main():
+    # ENCODER_THREADS membatasi thread intra-op encoder (mis. 1-2 untuk query batch-1); setting
+    # global proses, jadi di-set di entry point sebelum model di-load
+    encoder_threads = os.getenv("ENCODER_THREADS")
+    if encoder_threads:
+        configure_threads(int(encoder_threads))
     chatbot = RAGChatbot()
-    chatbot.chat()
+    if "--serve" in sys.argv:
+        chatbot.serve(port=int(os.getenv("API_PORT", "8000")))
+    else:
+        chatbot.chat()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,75 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+
+class HashEncoder:
+    """
+    Encoder deterministik pengganti SentenceTransformer untuk test: bag-of-words yang di-hash
+    ke dimensi tetap, sehingga teks dengan kata yang sama punya cosine similarity tinggi
+    """
+    max_seq_length = 256
+
+    def __init__(self, dimension: int = 64):
+        self.dimension = dimension
+        self.tokenizer = self._tokenize
+        self.encode_calls = []
+
+    def _tokenize(self, texts, **kwargs):
+        return {'input_ids': [[0] * min(len(text.split()) + 2, self.max_seq_length) for text in texts]}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        self.encode_calls.append(list(texts))
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                embeddings[row, int(hashlib.md5(word.strip('.,?!').encode('utf-8')).hexdigest(), 16) % self.dimension] += 1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1.0, norms)
+
+
+ARTICLES = {
+    "Soekarno": ["Soekarno adalah presiden pertama Republik Indonesia.",
+                 "Soekarno membacakan teks proklamasi bersama Hatta di Pegangsaan Timur."],
+    "Hatta": ["Mohammad Hatta lahir di Bukittinggi Sumatera Barat.",
+              "Hatta menjadi wakil presiden pertama Indonesia."],
+    "Sumpah Pemuda": ["Sumpah Pemuda diikrarkan pada kongres pemuda kedua tahun 1928.",
+                      "Kongres pemuda menegaskan satu nusa satu bangsa satu bahasa."],
+    "Pendudukan Jepang": ["Jepang menduduki Hindia Belanda pada tahun 1942.",
+                          "Romusha adalah kerja paksa pada masa pendudukan Jepang."],
+}
+
+
+def make_chunks():
+    chunks = []
+    for title, sentences in ARTICLES.items():
+        for i, content in enumerate(sentences):
+            chunks.append({'content': content, 'source_title': title, 'source_url': f"https://example.org/{title}",
+                           'source_type': "Test", 'chunk_id': f"{title.lower().replace(' ', '_')}_chunk_{i}"})
+    return chunks
+
+
+@pytest.fixture
+def encoder():
+    return HashEncoder()
+
+
+@pytest.fixture
+def make_store(encoder, tmp_path, monkeypatch):
+    """
+    Factory VectorStore dengan HashEncoder; index dibangun dari chunks (default: ARTICLES)
+    """
+    from src.vector_store import VectorStore
+
+    monkeypatch.setenv('VECTOR_DB_PATH', str(tmp_path))
+
+    def make(chunks=None, **kwargs):
+        store = VectorStore(model=encoder, **kwargs)
+        store.build_index(chunks if chunks is not None else make_chunks())
+        return store
+
+    return make
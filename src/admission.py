@@ -0,0 +1,172 @@
+"""
+Admission control untuk jalur query: batas concurrency, antrean terbatas, deadline per request
+dan load shedding dengan mode degradasi saat beban tinggi
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+# Level degradasi (makin tinggi makin murah)
+FULL = 0             # retrieval lengkap + LLM
+NO_EXPANSION = 1     # lewati query expansion
+REDUCED_K = 2        # tanpa expansion dan k lebih kecil
+RETRIEVAL_ONLY = 3   # tanpa LLM: kembalikan potongan konteks teratas
+
+
+class Overloaded(Exception):
+    """
+    Request ditolak (shed) karena antrean penuh atau tidak kebagian slot sebelum deadline
+    """
+    pass
+
+
+class DeadlineExceeded(Exception):
+    """
+    Deadline request habis sebelum tahap tertentu selesai
+    """
+    def __init__(self, stage: str):
+        super().__init__(f"deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    Batas waktu absolut satu request; diteruskan ke retrieval dan generation
+    """
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str):
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+
+class AdmissionController:
+    """
+    Maksimal max_concurrency request diproses bersamaan dan max_queue request menunggu.
+    Request yang datang saat antrean penuh langsung ditolak (Overloaded); request yang
+    menunggu ditolak begitu deadline-nya habis. Level degradasi ditentukan dari kedalaman
+    antrean saat request masuk (degrade_thresholds = fraksi antrean terisi).
+    """
+    def __init__(self, max_concurrency: int = 16, max_queue: int = 64,
+                 degrade_thresholds=(0.25, 0.5, 0.9)):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.degrade_thresholds = degrade_thresholds
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.degraded = 0
+        # Request yang sudah di-admit tetapi gagal (deadline habis / error lain)
+        self.deadline_exceeded = 0
+        self.failed = 0
+        self._cond = threading.Condition()
+        # Thread untuk request async yang menunggu slot (lihat aadmit), dibuat saat pertama dipakai
+        self._executor = None
+
+    def _level(self) -> int:
+        if self.max_queue == 0:
+            return FULL
+        fill = self.waiting / self.max_queue
+        level = FULL
+        for threshold_level, threshold in enumerate(self.degrade_thresholds, 1):
+            if fill >= threshold:
+                level = threshold_level
+        return level
+
+    @contextmanager
+    def admit(self, deadline: Optional[Deadline] = None):
+        """
+        Context manager yang menghasilkan level degradasi untuk request ini
+        """
+        with self._cond:
+            if self.active >= self.max_concurrency and self.waiting >= self.max_queue:
+                self.shed += 1
+                raise Overloaded(f"antrean penuh ({self.waiting} menunggu)")
+
+            level = self._level()
+            self.waiting += 1
+            try:
+                while self.active >= self.max_concurrency:
+                    remaining = deadline.remaining() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        self.shed += 1
+                        raise Overloaded("deadline habis saat menunggu di antrean")
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+            self.admitted += 1
+            if level > FULL:
+                self.degraded += 1
+
+        try:
+            yield level
+        except DeadlineExceeded:
+            with self._cond:
+                self.deadline_exceeded += 1
+            raise
+        except Exception:
+            # Mis. semua provider LLM gagal
+            with self._cond:
+                self.failed += 1
+            raise
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify()
+
+    @asynccontextmanager
+    async def aadmit(self, deadline: Optional[Deadline] = None):
+        """
+        Versi async dari admit(): menunggu slot di thread tersendiri agar event loop tidak terblokir.
+        Executor terpisah dari default executor (dipakai retrieval) supaya request yang menunggu
+        di antrean tidak menghabiskan thread milik request yang sedang berjalan.
+        """
+        with self._cond:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency + self.max_queue,
+                                                    thread_name_prefix="admission")
+        admission = self.admit(deadline)
+        entering = asyncio.get_running_loop().run_in_executor(self._executor, admission.__enter__)
+        try:
+            level = await asyncio.shield(entering)
+        except asyncio.CancelledError:
+            # Caller batal selagi menunggu: slot yang didapat belakangan langsung dilepas
+            entering.add_done_callback(
+                lambda done: done.exception() is None and admission.__exit__(None, None, None))
+            raise
+
+        try:
+            yield level
+        except BaseException as e:
+            if not admission.__exit__(type(e), e, e.__traceback__):
+                raise
+        else:
+            admission.__exit__(None, None, None)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'shed': self.shed,
+                'degraded': self.degraded,
+                'deadline_exceeded': self.deadline_exceeded,
+                'failed': self.failed
+            }
@@ -0,0 +1,129 @@
+"""
+HTTP API sederhana untuk RAG Chatbot (POST /query, GET /metrics, GET /providers, GET /admission, GET /coalescing,
+GET /sessions, DELETE /sessions/<id>, GET /health)
+"""
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .admission import DeadlineExceeded, Overloaded
+from .llm_providers import ProviderError
+from .metadata_filter import validate_filters
+
+
+def create_api_server(rag_chain, metrics_collector=None, host: str = "0.0.0.0",
+                      port: int = 8000) -> ThreadingHTTPServer:
+    """
+    Buat HTTP server yang melayani RAGChain.query; panggil serve_forever() untuk menjalankan
+    """
+    class RAGHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok'})
+            elif self.path == '/providers':
+                self._send_json(200, {'hedge': rag_chain.providers.hedge, 'providers': rag_chain.providers.stats()})
+            elif self.path == '/admission' and rag_chain.admission is not None:
+                self._send_json(200, rag_chain.admission.stats())
+            elif self.path == '/coalescing' and rag_chain.single_flight is not None:
+                self._send_json(200, rag_chain.single_flight.stats())
+            elif self.path == '/sessions':
+                self._send_json(200, rag_chain.sessions.stats())
+            elif self.path == '/metrics' and metrics_collector is not None:
+                body = metrics_collector.export_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_DELETE(self):
+            # Akhiri percakapan: hapus riwayat session
+            if not self.path.startswith('/sessions/'):
+                self._send_json(404, {'error': 'not found'})
+                return
+            session_id = self.path[len('/sessions/'):]
+            self._send_json(200 if rag_chain.sessions.evict(session_id) else 404, {'session_id': session_id})
+
+        def do_POST(self):
+            if self.path != '/query':
+                self._send_json(404, {'error': 'not found'})
+                return
+
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except (ValueError, json.JSONDecodeError):
+                self._send_json(400, {'error': 'invalid JSON body'})
+                return
+            if not isinstance(payload, dict):
+                self._send_json(400, {'error': 'body harus berupa JSON object'})
+                return
+
+            question = str(payload.get('question', '')).strip()
+            if not question:
+                self._send_json(400, {'error': "field 'question' wajib diisi"})
+                return
+
+            filters = payload.get('filters')
+            if filters is not None:
+                try:
+                    validate_filters(filters)
+                except ValueError as e:
+                    self._send_json(400, {'error': f"field 'filters' tidak valid: {e}"})
+                    return
+
+            timeout = payload.get('timeout')
+            if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0):
+                self._send_json(400, {'error': "field 'timeout' harus berupa angka detik > 0"})
+                return
+
+            session_id = payload.get('session_id')
+            if session_id is not None and not isinstance(session_id, str):
+                self._send_json(400, {'error': "field 'session_id' harus berupa string"})
+                return
+
+            try:
+                result = rag_chain.query(question, filters=filters, timeout=timeout, session_id=session_id)
+            except Overloaded as e:
+                # Shed: gagal cepat agar client bisa retry/backoff
+                self._send_json(503, {'error': str(e), 'status': 'shed'}, {'Retry-After': '1'})
+                return
+            except DeadlineExceeded as e:
+                self._send_json(504, {'error': str(e), 'status': 'deadline_exceeded'})
+                return
+            except ProviderError as e:
+                # Semua provider LLM gagal (circuit terbuka / error upstream)
+                self._send_json(503, {'error': str(e), 'status': 'llm_unavailable'}, {'Retry-After': '1'})
+                return
+            except Exception as e:
+                print(f"❌ Error handling /query: {e}")
+                self._send_json(500, {'error': 'internal server error', 'status': 'error'})
+                return
+
+            self._send_json(200, {
+                'question': result['question'],
+                'response': result['response'],
+                'status': result['status'],
+                'sources': result['context']['used_sources'],
+                'metrics': result['metrics']
+            })
+
+        def _send_json(self, status: int, body: dict, headers: dict = None):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), RAGHandler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,59 @@
+"""
+Jawab banyak pertanyaan sekaligus (evaluasi offline, pembuatan FAQ) dengan RAGChain.query_batch
+"""
+import argparse
+import json
+import os
+import time
+from typing import List
+
+from .rag_chain import RAGChain
+from .retriever import RAGRetriever
+from .vector_store import VectorStore
+
+
+def load_questions(path: str) -> List[str]:
+    """
+    JSONL ({"question": ...} per baris) atau JSON list berisi string / {"query"|"question": ...}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            items = [json.loads(line) for line in f if line.strip()]
+        else:
+            items = json.load(f)
+    return [item if isinstance(item, str) else item.get('question', item.get('query')) for item in items]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch question answering ke file JSONL (bisa di-resume)")
+    parser.add_argument('--input', default="data/benchmark/queries.json")
+    parser.add_argument('--output', default="results/answers.jsonl")
+    parser.add_argument('--vector-store', default="data/vector_db/vector_store")
+    parser.add_argument('--concurrency', type=int, default=8, help="Maksimal panggilan LLM paralel")
+    parser.add_argument('--rps', type=float, help="Rate limit panggilan LLM (request/detik)")
+    args = parser.parse_args()
+
+    questions = load_questions(args.input)
+
+    vector_store = VectorStore()
+    if not vector_store.load(args.vector_store):
+        print("❌ Could not load vector store! Please run app.py once to build it")
+        return
+
+    rag_chain = RAGChain(vector_store, RAGRetriever(vector_store))
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+
+    print(f"🚀 Answering {len(questions)} questions (concurrency={args.concurrency}, rps={args.rps})...")
+    start = time.perf_counter()
+    records = rag_chain.query_batch(questions, output_path=args.output, max_concurrency=args.concurrency,
+                                    requests_per_second=args.rps)
+    elapsed = time.perf_counter() - start
+
+    errors = sum(1 for r in records if r['error'])
+    print(f"✅ {len(records) - errors}/{len(records)} answered in {elapsed:.1f}s -> {args.output}")
+    if errors:
+        print(f"⚠️ {errors} questions failed; run again to retry them")
+
+
+if __name__ == "__main__":
+    main()
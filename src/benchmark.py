@@ -0,0 +1,467 @@
+"""
+Benchmark retrieval: kualitas (recall@k, MRR) dan kecepatan (latency, QPS) dalam format JSON
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from .context_compressor import ContextCompressor, estimate_tokens
+from .encoder import load_encoder, quantize_encoder
+from .metrics import NULL_TRACE
+from .rag_chain import RAGChain
+from .retriever import RAGRetriever
+from .vector_store import VectorStore
+
+DEFAULT_QUERIES_PATH = "data/benchmark/queries.json"
+DEFAULT_CHUNKS_PATH = "data/processed/text_chunks.json"
+# Batas regresi kualitas untuk --check dan test (lihat check_quality)
+QUALITY_THRESHOLDS = {'min_hit_rate': 0.7, 'min_keyword_coverage': 0.5, 'max_drop': 0.1}
+
+
+def load_benchmark_queries(path: str = DEFAULT_QUERIES_PATH) -> List[Dict]:
+    """
+    Load labeled query set: query -> expected_chunk_ids / expected_sources / expected_keywords
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class StubRAGChain(RAGChain):
+    """
+    RAGChain dengan LLM palsu untuk mengukur latency end-to-end tanpa memanggil API
+    """
+    def __init__(self, vector_store, retriever, latency: float = 0.2,
+                 seconds_per_prompt_token: float = 0.0, **kwargs):
+        super().__init__(vector_store, retriever, **kwargs)
+        self.latency = latency
+        self.seconds_per_prompt_token = seconds_per_prompt_token
+
+    def _call_llm(self, prompt: str, trace=NULL_TRACE, timeout: float = None) -> str:
+        time.sleep(self.latency + estimate_tokens(prompt) * self.seconds_per_prompt_token)
+        return self._stub_response(prompt, trace)
+
+    async def _acall_llm(self, prompt: str, trace=NULL_TRACE, timeout: float = None) -> str:
+        await asyncio.sleep(self.latency + estimate_tokens(prompt) * self.seconds_per_prompt_token)
+        return self._stub_response(prompt, trace)
+
+    async def _awarmup(self):
+        pass
+
+    def _stub_response(self, prompt: str, trace=NULL_TRACE) -> str:
+        prompt_tokens = estimate_tokens(prompt)
+
+        # Jawaban stub: kalimat pertama dari konteks
+        context = prompt.split("KONTEKS SEJARAH:", 1)[-1]
+        response = context.strip().split("\n", 2)[-1][:200]
+
+        trace.add_usage({
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': estimate_tokens(response),
+            'total_tokens': prompt_tokens + estimate_tokens(response)
+        })
+        return response
+
+
+def _latency_stats(latencies: List[float]) -> Dict:
+    latencies_ms = np.array(latencies) * 1000.0
+    total = float(np.sum(latencies))
+    return {
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'mean_ms': float(np.mean(latencies_ms)),
+        'qps': len(latencies) / total if total > 0 else 0.0
+    }
+
+
+def _quality_stats(ranked_ids: List[List[str]], queries: List[Dict], k: int) -> Dict:
+    recalls, hits, reciprocal_ranks = [], [], []
+
+    for ids, item in zip(ranked_ids, queries):
+        expected = set(item['expected_chunk_ids'])
+        top_k = ids[:k]
+        found = expected.intersection(top_k)
+
+        recalls.append(len(found) / len(expected))
+        hits.append(1.0 if found else 0.0)
+
+        rr = 0.0
+        for rank, chunk_id in enumerate(top_k, 1):
+            if chunk_id in expected:
+                rr = 1.0 / rank
+                break
+        reciprocal_ranks.append(rr)
+
+    return {
+        f'recall@{k}': float(np.mean(recalls)),
+        f'hit_rate@{k}': float(np.mean(hits)),
+        'mrr': float(np.mean(reciprocal_ranks))
+    }
+
+
+def benchmark_vector_store(vector_store: VectorStore, queries: List[Dict], k: int = 5,
+                           repeats: int = 3, **search_kwargs) -> Dict:
+    """
+    Ukur VectorStore.search (encode + FAISS search) untuk semua query benchmark
+    """
+    latencies = []
+    ranked_ids = []
+
+    for repeat in range(repeats):
+        for item in queries:
+            # Kosongkan cache agar latency encode ikut terukur
+            vector_store.clear_query_cache()
+            start = time.perf_counter()
+            results = vector_store.search(item['query'], k=k, min_score=0.0, **search_kwargs)
+            latencies.append(time.perf_counter() - start)
+            if repeat == 0:
+                ranked_ids.append([r['chunk']['chunk_id'] for r in results])
+
+    report = _latency_stats(latencies)
+    report.update(_quality_stats(ranked_ids, queries, k))
+    return report
+
+
+def benchmark_filtered_search(vector_store: VectorStore, queries: List[Dict], k: int = 5,
+                              repeats: int = 20) -> Dict:
+    """
+    Bandingkan latency FAISS search tanpa filter vs dengan filter source_title
+    (query embedding di-encode sekali agar yang terukur hanya tahap search)
+    """
+    embeddings = [vector_store.encode_query(item['query']) for item in queries]
+    report = {}
+
+    for name in ('unfiltered', 'filtered'):
+        latencies = []
+        for _ in range(repeats):
+            for item, embedding in zip(queries, embeddings):
+                filters = {'source_title': item['expected_sources'][0]} if name == 'filtered' else None
+                start = time.perf_counter()
+                vector_store.search_by_embedding(embedding, k=k, min_score=0.0, filters=filters)
+                latencies.append(time.perf_counter() - start)
+        report[name] = _latency_stats(latencies)
+
+    return report
+
+
+def benchmark_routing(vector_store: VectorStore, queries: List[Dict], k: int = 5,
+                      route_widths=(1, 2, 3, 5), repeats: int = 20) -> List[Dict]:
+    """
+    Bandingkan pencarian hierarkis (route ke m artikel) dengan flat search:
+    recall terhadap top-k flat, recall@k berlabel dan latency search
+    """
+    embeddings = [vector_store.encode_query(item['query']) for item in queries]
+    flat_ids = [[r['index'] for r in vector_store.search_by_embedding(e, k=k, min_score=-1.0, route_m=0)]
+                for e in embeddings]
+
+    report = []
+    for route_m in route_widths:
+        latencies = []
+        overlaps = []
+        ranked_ids = []
+        for repeat in range(repeats):
+            for embedding, flat in zip(embeddings, flat_ids):
+                start = time.perf_counter()
+                results = vector_store.search_by_embedding(embedding, k=k, min_score=-1.0, route_m=route_m)
+                latencies.append(time.perf_counter() - start)
+                if repeat == 0:
+                    overlaps.append(len(set(flat) & {r['index'] for r in results}) / max(len(flat), 1))
+                    ranked_ids.append([r['chunk']['chunk_id'] for r in results])
+
+        row = {'route_m': route_m, 'recall_vs_flat': float(np.mean(overlaps))}
+        row.update(_latency_stats(latencies))
+        row.update(_quality_stats(ranked_ids, queries, k))
+        report.append(row)
+
+    return report
+
+
+def benchmark_retriever(retriever: RAGRetriever, queries: List[Dict], k: int = 5,
+                        repeats: int = 3, **retrieve_kwargs) -> Dict:
+    """
+    Ukur RAGRetriever.retrieve_context (preprocess + expansion + search + packing)
+    """
+    latencies = []
+    ranked_ids = []
+    context_lengths = []
+    candidates_examined = []
+
+    for repeat in range(repeats):
+        for item in queries:
+            retriever.vector_store.clear_query_cache()
+            start = time.perf_counter()
+            context = retriever.retrieve_context(item['query'], k=k, **retrieve_kwargs)
+            latencies.append(time.perf_counter() - start)
+            if repeat == 0:
+                ranked_ids.append([part['chunk_id'] for part in context['context_parts']])
+                context_lengths.append(context['total_length'])
+                candidates_examined.append(context['candidates_examined'])
+
+    report = _latency_stats(latencies)
+    report.update(_quality_stats(ranked_ids, queries, k))
+    report['avg_context_length'] = float(np.mean(context_lengths))
+    report['avg_candidates_examined'] = float(np.mean(candidates_examined))
+    return report
+
+
+def benchmark_end_to_end(rag_chain: RAGChain, queries: List[Dict]) -> Dict:
+    """
+    Ukur RAGChain.query end-to-end (dengan StubRAGChain untuk LLM lokal)
+    """
+    latencies = []
+    stage_totals: Dict[str, float] = {}
+    prompt_tokens = []
+    keyword_hits = []
+
+    for item in queries:
+        rag_chain.vector_store.clear_query_cache()
+        start = time.perf_counter()
+        result = rag_chain.query(item['query'])
+        latencies.append(time.perf_counter() - start)
+
+        for stage, seconds in result['metrics']['stages'].items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+        prompt_tokens.append(result['metrics']['tokens'].get('prompt_tokens', estimate_tokens(result['prompt'])))
+
+        # Quality check: konteks yang dikirim ke LLM memuat kata kunci jawaban
+        context_text = result['context']['context'].lower()
+        keywords = item.get('expected_keywords', [])
+        keyword_hits.append(float(all(kw.lower() in context_text for kw in keywords)) if keywords else 1.0)
+
+    report = _latency_stats(latencies)
+    report['stage_mean_ms'] = {stage: total / len(queries) * 1000.0 for stage, total in stage_totals.items()}
+    report['avg_prompt_tokens'] = float(np.mean(prompt_tokens))
+    report['keyword_coverage'] = float(np.mean(keyword_hits))
+    return report
+
+
+def benchmark_async_gather(rag_chain: RAGChain, queries: List[Dict], num_requests: int = 300,
+                           max_concurrency: int = 300) -> Dict:
+    """
+    Ukur RAGChain.agather: banyak percakapan konkuren di satu event loop
+    """
+    questions = [queries[i % len(queries)]['query'] for i in range(num_requests)]
+    # Variasikan pertanyaan agar tidak digabung oleh single-flight
+    questions = [f"{question} ({i})" for i, question in enumerate(questions)]
+
+    start = time.perf_counter()
+    results = asyncio.run(rag_chain.agather(questions, max_concurrency=max_concurrency))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array([r['metrics']['total_seconds'] for r in results]) * 1000.0
+    return {
+        'requests': num_requests,
+        'max_concurrency': max_concurrency,
+        'elapsed_seconds': elapsed,
+        'throughput_rps': num_requests / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99))
+    }
+
+
+def benchmark_encoder_latency(encoders: Dict, query_texts: List[str], repeats: int = 5) -> List[Dict]:
+    """
+    Latency encode query batch-1 per encoder, dengan setting thread PyTorch yang sedang aktif
+    """
+    import torch
+
+    latency = []
+    for name, model in encoders.items():
+        model.encode(query_texts[:1], normalize_embeddings=True)  # warm-up
+        latencies = []
+        for _ in range(repeats):
+            for query in query_texts:
+                start = time.perf_counter()
+                model.encode([query], normalize_embeddings=True)
+                latencies.append(time.perf_counter() - start)
+        row = {'backend': name, 'threads': torch.get_num_threads()}
+        row.update(_latency_stats(latencies))
+        latency.append(row)
+    return latency
+
+
+def benchmark_encoder_agreement(float_model, chunks: List[Dict], queries: List[Dict], backend: str = "int8",
+                                k: int = 5, batch_size: int = 64, repeats: int = 5,
+                                quantized_model=None) -> Dict:
+    """
+    Bandingkan encoder backend (int8) dengan float32: cosine similarity embedding yang sama,
+    recall@k pada query benchmark (corpus dan query int8, atau hanya query int8 di atas index
+    float32 yang sudah ada), top-k overlap dengan float32 dan latency encode query batch-1.
+    quantized_model (default: quantize_encoder(float_model)) bisa diberikan agar dipakai ulang.
+    Thread PyTorch tidak diubah; perbandingan per jumlah thread ada di CLI (python -m src.encoder).
+    """
+    encoders = {'float32': float_model,
+                backend: quantized_model if quantized_model is not None else quantize_encoder(float_model)}
+    texts = [chunk['content'] for chunk in chunks]
+    query_texts = [item['query'] for item in queries]
+    chunk_ids = [chunk['chunk_id'] for chunk in chunks]
+
+    corpus, query_embeddings, corpus_throughput = {}, {}, {}
+    for name, model in encoders.items():
+        start = time.perf_counter()
+        corpus[name] = np.asarray(model.encode(texts, batch_size=batch_size, show_progress_bar=False,
+                                               normalize_embeddings=True), dtype=np.float32)
+        corpus_throughput[name] = len(texts) / (time.perf_counter() - start)
+        query_embeddings[name] = np.asarray(model.encode(query_texts, show_progress_bar=False,
+                                                         normalize_embeddings=True), dtype=np.float32)
+
+    def ranked(corpus_embeddings: np.ndarray, query_matrix: np.ndarray) -> List[List[str]]:
+        top = np.argsort(-(query_matrix @ corpus_embeddings.T), axis=1)[:, :k]
+        return [[chunk_ids[i] for i in row] for row in top]
+
+    baseline = ranked(corpus['float32'], query_embeddings['float32'])
+    retrieval = {}
+    for setup, (corpus_name, query_name) in {'float32': ('float32', 'float32'),
+                                             f'{backend}_query_only': ('float32', backend),
+                                             backend: (backend, backend)}.items():
+        ids = ranked(corpus[corpus_name], query_embeddings[query_name])
+        row = _quality_stats(ids, queries, k)
+        row['topk_overlap_vs_float32'] = float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ids, baseline)]))
+        retrieval[setup] = row
+
+    chunk_cosine = np.sum(corpus['float32'] * corpus[backend], axis=1)
+    query_cosine = np.sum(query_embeddings['float32'] * query_embeddings[backend], axis=1)
+
+    return {
+        'backend': backend,
+        'num_chunks': len(texts),
+        'num_queries': len(query_texts),
+        'cosine': {
+            'chunk_mean': float(np.mean(chunk_cosine)),
+            'chunk_min': float(np.min(chunk_cosine)),
+            'query_mean': float(np.mean(query_cosine)),
+            'query_min': float(np.min(query_cosine))
+        },
+        'retrieval': retrieval,
+        'query_latency': benchmark_encoder_latency(encoders, query_texts, repeats=repeats),
+        'corpus_chunks_per_s': corpus_throughput
+    }
+
+
+def build_vector_store(chunks_path: str = DEFAULT_CHUNKS_PATH, model=None) -> VectorStore:
+    with open(chunks_path, 'r', encoding='utf-8') as f:
+        chunks = json.load(f)
+
+    vector_store = VectorStore(model=model)
+    vector_store.build_index(chunks)
+    return vector_store
+
+
+def check_quality(report: Dict, k: int, min_hit_rate: float = QUALITY_THRESHOLDS['min_hit_rate'],
+                  min_keyword_coverage: float = QUALITY_THRESHOLDS['min_keyword_coverage'],
+                  max_drop: float = QUALITY_THRESHOLDS['max_drop']) -> List[str]:
+    """
+    Regression check kualitas laporan benchmark; return daftar pelanggaran (kosong = lolos).
+    Batas absolut (hit rate, keyword coverage) berlaku untuk model default; jalur optimasi
+    (adaptive retrieval, kompresi konteks) tidak boleh turun lebih dari max_drop dari jalur biasa.
+    """
+    failures = []
+
+    def at_least(name: str, value: float, minimum: float):
+        if value < minimum:
+            failures.append(f"{name} = {value:.3f} < {minimum:.3f}")
+
+    hit_rate = f'hit_rate@{k}'
+    at_least(f'vector_store_search.{hit_rate}', report['vector_store_search'][hit_rate], min_hit_rate)
+    at_least(f'retrieve_context.{hit_rate}', report['retrieve_context'][hit_rate], min_hit_rate)
+    at_least('end_to_end_stub_llm.keyword_coverage', report['end_to_end_stub_llm']['keyword_coverage'],
+             min_keyword_coverage)
+
+    recall = f'recall@{k}'
+    at_least(f'retrieve_context_adaptive.{recall}', report['retrieve_context_adaptive'][recall],
+             report['retrieve_context'][recall] - max_drop)
+    at_least('end_to_end_compressed.keyword_coverage', report['end_to_end_compressed']['keyword_coverage'],
+             report['end_to_end_stub_llm']['keyword_coverage'] - max_drop)
+    return failures
+
+
+def run_benchmarks(args, model=None) -> Dict:
+    """
+    Jalankan semua benchmark sesuai argumen CLI; return laporan.
+    model opsional untuk memakai ulang encoder yang sudah dimuat (mis. dari test)
+    """
+    queries = load_benchmark_queries(args.queries)
+    vector_store = build_vector_store(args.chunks, model=model)
+    retriever = RAGRetriever(vector_store)
+    rag_chain = StubRAGChain(vector_store, retriever, latency=args.llm_latency,
+                             seconds_per_prompt_token=args.llm_seconds_per_token)
+    compressed_chain = StubRAGChain(vector_store, retriever, latency=args.llm_latency,
+                                    seconds_per_prompt_token=args.llm_seconds_per_token,
+                                    compressor=ContextCompressor(token_budget=args.compress_budget))
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'num_queries': len(queries),
+        'num_chunks': len(vector_store.chunks),
+        'k': args.k,
+        'vector_store_search': benchmark_vector_store(vector_store, queries, k=args.k, repeats=args.repeats),
+        'filtered_search': benchmark_filtered_search(vector_store, queries, k=args.k),
+        'routing': benchmark_routing(vector_store, queries, k=args.k),
+        'retrieve_context': benchmark_retriever(retriever, queries, k=args.k, repeats=args.repeats),
+        'retrieve_context_adaptive': benchmark_retriever(retriever, queries, k=args.k, repeats=args.repeats,
+                                                         adaptive=True),
+        'end_to_end_stub_llm': benchmark_end_to_end(rag_chain, queries),
+        'end_to_end_compressed': benchmark_end_to_end(compressed_chain, queries),
+        'async_gather_stub_llm': benchmark_async_gather(rag_chain, queries)
+    }
+    if args.compare_encoder:
+        # Baseline harus float32 walaupun store memakai ENCODER_BACKEND lain
+        float_model = load_encoder(vector_store.model_name, backend='float32')
+        report['encoder_agreement'] = benchmark_encoder_agreement(float_model, list(vector_store.chunks),
+                                                                  queries, backend=args.compare_encoder, k=args.k)
+    return report
+
+
+def main():
+    """
+    Jalankan benchmark lengkap dan tulis hasilnya sebagai JSON
+    """
+    parser = argparse.ArgumentParser(description="Benchmark retrieval RAG Chatbot")
+    parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    parser.add_argument('--chunks', default=DEFAULT_CHUNKS_PATH)
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="Latency stub LLM (detik)")
+    parser.add_argument('--llm-seconds-per-token', type=float, default=0.0002,
+                        help="Latency tambahan stub LLM per prompt token (prefill)")
+    parser.add_argument('--compress-budget', type=int, default=300, help="Token budget kompresi konteks")
+    parser.add_argument('--compare-encoder', choices=['int8'],
+                        help="Tambahkan agreement check encoder backend vs float32 ke laporan")
+    parser.add_argument('--output', help="Path file JSON hasil (default: stdout)")
+    parser.add_argument('--check', action='store_true',
+                        help="Exit code 1 jika kualitas di bawah batas regresi (lihat QUALITY_THRESHOLDS)")
+    parser.add_argument('--min-hit-rate', type=float, default=QUALITY_THRESHOLDS['min_hit_rate'])
+    parser.add_argument('--min-keyword-coverage', type=float, default=QUALITY_THRESHOLDS['min_keyword_coverage'])
+    args = parser.parse_args()
+
+    # Log build/progress ke stderr agar stdout hanya berisi JSON laporan
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmarks(args)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"✅ Benchmark results saved to {args.output}")
+    else:
+        print(output)
+
+    if args.check:
+        failures = check_quality(report, args.k, min_hit_rate=args.min_hit_rate,
+                                 min_keyword_coverage=args.min_keyword_coverage)
+        for failure in failures:
+            print(f"❌ Quality regression: {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+        print("✅ Quality check passed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
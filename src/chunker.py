@@ -0,0 +1,274 @@
+"""
+Chunker native berbasis kalimat (pengganti RecursiveCharacterTextSplitter langchain):
+ukuran dan overlap chunk sama, tetapi batas chunk dihitung sebagai offset karakter
+sehingga teks hanya di-slice sekali per chunk, dan artikel diproses paralel di process pool
+"""
+import argparse
+import json
+import os
+import re
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from operator import sub
+from typing import Dict, List, Tuple
+
+
+_CITATION = re.compile(r'\[\d+\]')
+_UNWANTED = re.compile(r'[^\w\s\.\,\!\?\;\:\-\(\)\"]+')
+# Karakter ASCII yang sama dihapus lewat bytes.translate pada UTF-8 (jauh lebih cepat dari regex;
+# byte multi-byte UTF-8 selalu >= 0x80 sehingga tidak tersentuh). Karakter non-ASCII dicek per
+# karakter unik yang muncul, lalu dihapus dengan str.replace.
+_ASCII_UNWANTED = bytes(c for c in range(128) if _UNWANTED.match(chr(c)))
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+# Akhir kalimat (tanda baca sebelum whitespace) atau baris baru; awal kalimat berikutnya
+# setelah melewati whitespace. Teks yang sudah dibersihkan tidak punya baris baru, dan pola
+# tanpa alternatif zero-width (?=\n) di-scan ~4x lebih cepat.
+_SENTENCE_END = re.compile(r'[.!?](?=\s)|(?=\n)')
+_SENTENCE_END_SINGLE_LINE = re.compile(r'[.!?](?=\s)')
+_SPACES = re.compile(r'\s*')
+_WORD = re.compile(r'\S+')
+
+
+def clean_text(text: str) -> str:
+    """
+    Hapus referensi Wikipedia ([1], [2], ...), rapikan whitespace dan hapus karakter aneh
+    (hasil sama dengan TextProcessor.clean_text lama, dengan regex yang sudah di-compile)
+    """
+    text = _CITATION.sub('', text)
+    text = " ".join(text.split())
+    text = text.encode('utf-8').translate(None, _ASCII_UNWANTED).decode('utf-8')
+    for char in set(_NON_ASCII.findall(text)):
+        if _UNWANTED.match(char):
+            text = text.replace(char, '')
+    return text.strip()
+
+
+class SentenceChunker:
+    """
+    Gabungkan kalimat berurutan sampai chunk_size karakter; chunk berikutnya diawali kalimat
+    terakhir chunk sebelumnya selama totalnya <= chunk_overlap. Kalimat yang lebih panjang dari
+    chunk_size dipecah per kata (dan kata yang terlalu panjang dipotong per chunk_size).
+    """
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap harus lebih kecil dari chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def _units(self, text: str) -> Tuple[List[int], List[int]]:
+        """
+        Offset awal dan akhir kalimat (tanpa whitespace pemisah), masing-masing <= chunk_size
+        """
+        sentence_end = _SENTENCE_END if '\n' in text else _SENTENCE_END_SINGLE_LINE
+        ends = [match.end() for match in sentence_end.finditer(text)]
+        skip_spaces = _SPACES.match
+        starts = [skip_spaces(text, 0).end()] + [skip_spaces(text, end).end() for end in ends]
+        ends.append(len(text.rstrip()))
+
+        lengths = list(map(sub, ends, starts))
+        if lengths and (min(lengths) <= 0 or max(lengths) > self.chunk_size):
+            starts, ends = self._normalize_units(text, starts, ends)
+        return starts, ends
+
+    def _normalize_units(self, text: str, starts: List[int], ends: List[int]) -> Tuple[List[int], List[int]]:
+        # Jalur lambat (jarang): buang unit kosong, pecah kalimat terlalu panjang per kata
+        new_starts, new_ends = [], []
+        for start, end in zip(starts, ends):
+            if end - start <= 0:
+                continue
+            if end - start <= self.chunk_size:
+                new_starts.append(start)
+                new_ends.append(end)
+                continue
+            for word in _WORD.finditer(text, start, end):
+                for piece_start in range(word.start(), word.end(), self.chunk_size):
+                    new_starts.append(piece_start)
+                    new_ends.append(min(piece_start + self.chunk_size, word.end()))
+        return new_starts, new_ends
+
+    def split_spans(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Offset karakter (start, end) setiap chunk pada text; batas chunk dicari dengan
+        bisect atas offset kalimat (O(log n) per chunk)
+        """
+        starts, ends = self._units(text)
+        count = len(starts)
+        spans = []
+        i = 0
+        while i < count:
+            # Kalimat terakhir yang masih muat dalam chunk_size
+            j = bisect_right(ends, starts[i] + self.chunk_size, i) - 1
+            spans.append((starts[i], ends[j]))
+            if j + 1 >= count:
+                break
+
+            # Overlap: kalimat paling awal dalam (i, j] yang masih dalam chunk_overlap dari akhir chunk,
+            # tapi chunk berikutnya harus muat minimal satu kalimat baru (j + 1)
+            k = bisect_left(starts, ends[j] - self.chunk_overlap, i + 1, j + 1)
+            i = bisect_left(starts, ends[j + 1] - self.chunk_size, k, j + 1)
+        return spans
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def chunk_article(self, article: Dict[str, str]) -> List[Dict]:
+        """
+        Bersihkan satu artikel lalu potong menjadi chunk dengan metadata;
+        start_char/end_char adalah offset pada teks artikel yang sudah dibersihkan
+        """
+        clean_content = clean_text(article['content'])
+        spans = self.split_spans(clean_content)
+        slug = article['title'].lower().replace(' ', '_')
+        return [
+            {
+                'content': clean_content[start:end],
+                'source_title': article['title'],
+                'source_url': article['url'],
+                'source_type': article['source'],
+                'chunk_id': f"{slug}_chunk_{i}",
+                'chunk_index': i,
+                'total_chunks': len(spans),
+                'start_char': start,
+                'end_char': end
+            }
+            for i, (start, end) in enumerate(spans)
+        ]
+
+
+def _chunk_article(article: Dict[str, str], chunk_size: int, chunk_overlap: int) -> List[Dict]:
+    # Fungsi level modul agar bisa di-pickle ke worker process
+    return SentenceChunker(chunk_size, chunk_overlap).chunk_article(article)
+
+
+def chunk_articles(articles: List[Dict[str, str]], chunk_size: int = 1000, chunk_overlap: int = 200,
+                   workers: int = None, parallel_min_chars: int = 2_000_000) -> List[List[Dict]]:
+    """
+    Chunk per artikel (urutan sama dengan input). Dengan workers > 1 artikel dibagi ke
+    process pool; workers=None memakai semua CPU jika korpus >= parallel_min_chars karakter
+    (untuk korpus kecil overhead start process lebih besar dari waktu chunking).
+    """
+    if workers is None:
+        total_chars = sum(len(article['content']) for article in articles)
+        workers = (os.cpu_count() or 1) if total_chars >= parallel_min_chars else 1
+    workers = min(workers, len(articles))
+
+    if workers <= 1:
+        chunker = SentenceChunker(chunk_size, chunk_overlap)
+        return [chunker.chunk_article(article) for article in articles]
+
+    fn = partial(_chunk_article, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fn, articles, chunksize=max(1, len(articles) // (workers * 4))))
+
+
+def _langchain_split(articles: List[Dict[str, str]], chunk_size: int, chunk_overlap: int) -> List[List[str]]:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]
+    )
+    return [splitter.split_text(clean_text(article['content'])) for article in articles]
+
+
+def _boundary_agreement(articles: List[Dict[str, str]], chunk_size: int, chunk_overlap: int,
+                        tolerance: int = 2) -> Dict:
+    """
+    Parity dengan splitter langchain: fraksi chunk native yang awalnya berada dalam `tolerance`
+    karakter dari awal salah satu chunk langchain pada artikel yang sama
+    """
+    native = chunk_articles(articles, chunk_size, chunk_overlap, workers=1)
+    matched, total = 0, 0
+    for article, chunks, reference in zip(articles, native, _langchain_split(articles, chunk_size, chunk_overlap)):
+        text = clean_text(article['content'])
+        starts, position = [], 0
+        for chunk in reference:
+            # Chunk langchain bisa diawali separator kalimat sebelumnya (". ")
+            start = text.find(chunk.lstrip('.!? ')[:80], max(0, position - chunk_size))
+            if start >= 0:
+                starts.append(start)
+                position = start
+        for chunk in chunks:
+            total += 1
+            matched += any(abs(chunk['start_char'] - start) <= tolerance for start in starts)
+    return {'chunks': total, 'matched_starts': matched, 'agreement': matched / total if total else 1.0,
+            'tolerance_chars': tolerance}
+
+
+def _summary(chunks: List[str]) -> Dict:
+    lengths = [len(chunk) for chunk in chunks]
+    return {
+        'chunks': len(chunks),
+        'avg_chars': sum(lengths) / len(lengths) if lengths else 0,
+        'max_chars': max(lengths, default=0),
+        'starts_with_punct': sum(1 for chunk in chunks if chunk[:1] in '.!?')
+    }
+
+
+def benchmark(articles_path: str, scale: int = 1, chunk_size: int = 1000, chunk_overlap: int = 200,
+              workers: int = None) -> Dict:
+    """
+    Bandingkan chunker native (serial dan process pool) dengan splitter langchain pada
+    korpus yang direplikasi scale kali; waktu baca + parse JSON sebagai baseline I/O
+    """
+    start = time.perf_counter()
+    with open(articles_path, 'r', encoding='utf-8') as f:
+        articles = json.load(f)
+    # Diekstrapolasi linear ke ukuran korpus yang direplikasi
+    read_seconds = (time.perf_counter() - start) * scale
+
+    corpus = [dict(article, title=f"{article['title']} {copy}") if copy else article
+              for copy in range(scale) for article in articles]
+    megabytes = sum(len(article['content']) for article in corpus) / 1e6
+    report = {'articles': len(corpus), 'megabytes': megabytes, 'read_seconds': read_seconds}
+
+    def timed(name: str, fn):
+        start = time.perf_counter()
+        chunks = fn()
+        elapsed = time.perf_counter() - start
+        report[name] = dict(_summary([c for article_chunks in chunks for c in article_chunks]),
+                            seconds=elapsed, mb_per_s=megabytes / elapsed if elapsed > 0 else 0.0)
+        print(f"   - {name}: {elapsed:.2f}s ({report[name]['mb_per_s']:.1f} MB/s, {report[name]['chunks']} chunks)")
+
+    print(f"🔄 Chunking {len(corpus)} articles ({megabytes:.1f} MB)...")
+    timed('native_serial', lambda: [[c['content'] for c in chunks]
+                                    for chunks in chunk_articles(corpus, chunk_size, chunk_overlap, workers=1)])
+    timed('native_parallel', lambda: [[c['content'] for c in chunks]
+                                      for chunks in chunk_articles(corpus, chunk_size, chunk_overlap,
+                                                                   workers=workers or os.cpu_count())])
+    try:
+        timed('langchain', lambda: _langchain_split(corpus, chunk_size, chunk_overlap))
+        report['boundary_parity'] = _boundary_agreement(articles, chunk_size, chunk_overlap)
+        print(f"   - chunk boundaries matching langchain: {report['boundary_parity']['agreement']:.1%}")
+    except ImportError:
+        print("   - langchain: not installed, skipped")
+
+    print(f"   - read + parse JSON (I/O baseline): {read_seconds:.2f}s")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunker native vs RecursiveCharacterTextSplitter")
+    parser.add_argument('--articles', default="data/raw_texts/all_articles.json")
+    parser.add_argument('--scale', type=int, default=1, help="Replikasi korpus N kali")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--chunk-overlap', type=int, default=200)
+    parser.add_argument('--workers', type=int, help="Jumlah process (default: semua CPU)")
+    parser.add_argument('--output', help="Simpan laporan JSON")
+    args = parser.parse_args()
+
+    report = benchmark(args.articles, args.scale, args.chunk_size, args.chunk_overlap, args.workers)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Kompresi konteks ekstraktif: pilih kalimat paling relevan dari chunk hasil retrieval
+agar prompt ke LLM lebih pendek tanpa kehilangan jawaban
+"""
+import re
+from typing import Dict, List
+
+import numpy as np
+
+from .metrics import NULL_TRACE
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Perkiraan kasar jumlah token (~4 karakter per token)
+    """
+    return max(1, len(text) // 4)
+
+
+class ContextCompressor:
+    """
+    Pecah chunk terpilih menjadi kalimat, skor semua kalimat terhadap query embedding
+    (satu batch encode + satu matrix product), lalu simpan kalimat terbaik dalam
+    token_budget dengan urutan asli sumber
+    """
+    def __init__(self, token_budget: int = 300, min_sentence_chars: int = 20, batch_size: int = 64):
+        self.token_budget = token_budget
+        self.min_sentence_chars = min_sentence_chars
+        self.batch_size = batch_size
+
+    def split_sentences(self, text: str) -> List[str]:
+        sentences = [s.strip() for s in SENTENCE_SPLIT.split(text.replace("\n", " "))]
+        return [s for s in sentences if len(s) >= self.min_sentence_chars]
+
+    def compress(self, query: str, context_data: Dict, vector_store, trace=NULL_TRACE) -> Dict:
+        """
+        Return context_data baru (format sama dengan RAGRetriever.retrieve_context)
+        yang hanya berisi kalimat terpilih
+        """
+        # (index part, kalimat) dalam urutan sumber
+        sentences = []
+        for part_idx, part in enumerate(context_data['context_parts']):
+            # Baris pertama content adalah label "[Sumber: ...]"
+            body = part['content'].split("\n", 1)[-1]
+            sentences.extend((part_idx, s) for s in self.split_sentences(body))
+
+        if not sentences:
+            return context_data
+
+        query_embedding = vector_store.encode_query(query, trace=trace)
+        with trace.span('compress_encode'):
+            sentence_embeddings = vector_store.model.encode(
+                [s for _, s in sentences],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+                normalize_embeddings=True
+            )
+        scores = np.asarray(sentence_embeddings, dtype=np.float32) @ query_embedding[0]
+
+        # Greedy berdasarkan score sampai token_budget habis
+        selected = set()
+        used_tokens = 0
+        for idx in np.argsort(-scores):
+            tokens = estimate_tokens(sentences[idx][1])
+            if used_tokens + tokens > self.token_budget:
+                continue
+            selected.add(int(idx))
+            used_tokens += tokens
+
+        trace.incr('sentences_total', len(sentences))
+        trace.incr('sentences_kept', len(selected))
+
+        return self._rebuild_context(context_data, sentences, scores, selected)
+
+    def _rebuild_context(self, context_data: Dict, sentences: List, scores: np.ndarray,
+                         selected: set) -> Dict:
+        kept_by_part: Dict[int, List[int]] = {}
+        for idx in sorted(selected):
+            kept_by_part.setdefault(sentences[idx][0], []).append(idx)
+
+        context_parts = []
+        used_sources = set()
+        for part_idx, part in enumerate(context_data['context_parts']):
+            if part_idx not in kept_by_part:
+                continue
+            indices = kept_by_part[part_idx]
+            content = f"[Sumber: {part['source']}]\n" + " ".join(sentences[i][1] for i in indices)
+            context_parts.append({
+                'content': content,
+                'score': part['score'],
+                'sentence_score': float(np.max(scores[indices])),
+                'source': part['source'],
+                'sources': part.get('sources') or [part['source']],
+                'chunk_id': part['chunk_id'],
+                'index': part.get('index')
+            })
+            used_sources.update(part.get('sources') or [part['source']])
+
+        total_length = sum(len(part['content']) for part in context_parts)
+        compressed = dict(context_data)
+        compressed.update({
+            'context': "\n\n---\n\n".join(part['content'] for part in context_parts),
+            'context_parts': context_parts,
+            'total_length': total_length,
+            'used_sources': list(used_sources),
+            'num_chunks': len(context_parts),
+            'avg_score': sum(part['score'] for part in context_parts) / len(context_parts) if context_parts else 0,
+            'original_length': context_data['total_length']
+        })
+        return compressed
@@ -0,0 +1,131 @@
+"""
+State percakapan per session: riwayat turn terbatas (chunk yang dipakai + query embedding)
+agar pertanyaan lanjutan bisa memakai ulang hasil retrieval turn sebelumnya
+"""
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Penanda rujukan eksplisit ke topik sebelumnya (kata ganti orang ketiga, "tersebut",
+# penanda urutan waktu). "itu" dan akhiran "-nya" umum tidak dipakai karena juga muncul
+# di pertanyaan baru ("Apa itu Agresi Militer Belanda?", "Kapan kemerdekaannya?")
+FOLLOW_UP_PATTERN = re.compile(
+    r'\b(dia|beliau|mereka|ia|tersebut|lalu|kemudian|selanjutnya|sebelumnya|sesudahnya|setelahnya'
+    r'|(saat|waktu|ketika|setelah|sesudah|sebelum) itu)\b',
+    re.IGNORECASE
+)
+
+
+class Turn:
+    def __init__(self, question: str, response: str, chunk_indices: List[int], query_embedding: np.ndarray,
+                 vector_store=None):
+        self.question = question
+        self.response = response
+        self.chunk_indices = chunk_indices
+        self.query_embedding = query_embedding
+        # Weakref ke store yang menghasilkan chunk_indices (store lama tidak ditahan setelah hot reload)
+        self._vector_store = weakref.ref(vector_store) if vector_store is not None else None
+
+    @property
+    def vector_store(self):
+        return self._vector_store() if self._vector_store is not None else None
+
+    def forget_retrieval(self):
+        self.chunk_indices = []
+        self._vector_store = None
+
+
+class ConversationState:
+    """
+    Riwayat satu session, maksimal history_size turn terakhir
+    """
+    def __init__(self, session_id: str, history_size: int = 5):
+        self.session_id = session_id
+        self.turns = deque(maxlen=history_size)
+        self.last_active = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def last_turn(self) -> Optional[Turn]:
+        return self.turns[-1] if self.turns else None
+
+    def is_follow_up(self, question: str) -> bool:
+        """
+        Heuristik: ada turn sebelumnya dan pertanyaan memakai kata rujukan eksplisit
+        """
+        if not self.turns:
+            return False
+        return bool(FOLLOW_UP_PATTERN.search(question))
+
+    def add_turn(self, turn: Turn):
+        self.turns.append(turn)
+        self.last_active = time.monotonic()
+
+
+class SessionStore:
+    """
+    Penyimpanan ConversationState dengan eviction LRU (max_sessions) dan TTL tidak aktif
+    """
+    def __init__(self, max_sessions: int = 1000, ttl: float = 1800.0, history_size: int = 5):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.history_size = history_size
+        self.evicted = 0
+        self._sessions: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> ConversationState:
+        """
+        Ambil state session (dibuat jika belum ada atau sudah kedaluwarsa)
+        """
+        with self._lock:
+            self._prune()
+            state = self._sessions.pop(session_id, None)
+            if state is None:
+                state = ConversationState(session_id, self.history_size)
+            state.last_active = time.monotonic()
+            self._sessions[session_id] = state
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            return state
+
+    def evict(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def forget_retrieval(self, vector_store) -> int:
+        """
+        Lepas index chunk semua turn yang dihasilkan vector_store (mis. store lama setelah hot
+        reload); riwayat tanya-jawab tetap ada. Return jumlah turn yang dilepas.
+        """
+        with self._lock:
+            states = list(self._sessions.values())
+        forgotten = 0
+        # Tanpa state.lock: session yang sedang menunggu LLM tidak boleh menahan swap index
+        for state in states:
+            for turn in list(state.turns):
+                if turn.vector_store is vector_store:
+                    turn.forget_retrieval()
+                    forgotten += 1
+        return forgotten
+
+    def _prune(self):
+        # Session diurutkan dari yang paling lama tidak dipakai
+        now = time.monotonic()
+        while self._sessions:
+            session_id, state = next(iter(self._sessions.items()))
+            if now - state.last_active < self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'sessions': len(self._sessions), 'evicted': self.evicted,
+                    'max_sessions': self.max_sessions, 'ttl': self.ttl}
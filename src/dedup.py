@@ -0,0 +1,269 @@
+"""
+Deteksi dan deduplikasi chunk near-duplicate saat build index: chunk yang (hampir) sama
+digabung menjadi satu representatif dengan metadata sumber gabungan
+"""
+import argparse
+import hashlib
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Prime > 2^32 untuk hash universal MinHash (a * h + b) mod p
+_MINHASH_PRIME = np.uint64(4294967311)
+_WORD = re.compile(r'\w+')
+
+
+def _group_pairs(n: int, pairs) -> List[List[int]]:
+    """
+    Union-find atas pasangan (i, j); return grup berisi lebih dari satu index (terurut)
+    """
+    parent = list(range(n))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in pairs:
+        root_i, root_j = find(int(i)), find(int(j))
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups: Dict[int, List[int]] = {}
+    for idx in range(n):
+        groups.setdefault(find(idx), []).append(idx)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def _split_component(members: List[int], neighbours: Dict[int, set], priority) -> List[List[int]]:
+    """
+    Pecah satu komponen union-find menjadi grup dengan representatif di posisi pertama:
+    anggota dengan prioritas tertinggi menjadi representatif dan hanya menyerap anggota yang
+    berpasangan langsung dengannya (similarity >= threshold), sisanya diproses ulang. Rantai
+    A~B~C dengan A dan C tidak mirip tidak membuat C dibuang demi A.
+    """
+    groups = []
+    remaining = sorted(members, key=priority, reverse=True)
+    while remaining:
+        representative = remaining[0]
+        absorbed = [idx for idx in remaining[1:] if idx in neighbours.get(representative, ())]
+        if absorbed:
+            groups.append([representative] + absorbed)
+        taken = set(absorbed)
+        remaining = [idx for idx in remaining[1:] if idx not in taken]
+    return groups
+
+
+def exact_duplicate_pairs(texts: List[str]):
+    """
+    Pasangan teks identik (setelah normalisasi spasi dan huruf kecil)
+    """
+    first_seen: Dict[str, int] = {}
+    for idx, text in enumerate(texts):
+        key = hashlib.sha1(" ".join(text.lower().split()).encode('utf-8')).hexdigest()
+        if key in first_seen:
+            yield first_seen[key], idx
+        else:
+            first_seen[key] = idx
+
+
+def embedding_duplicate_pairs(embeddings: np.ndarray, threshold: float = 0.95, block_size: int = 1024):
+    """
+    Pasangan (i, j), i < j, dengan cosine similarity >= threshold. Embeddings harus ter-normalisasi;
+    inner product dihitung per tile (block_size x block_size) sehingga memori tetap terbatas
+    berapa pun jumlah chunk.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n = len(embeddings)
+    for row_start in range(0, n, block_size):
+        block = embeddings[row_start:row_start + block_size]
+        # Cukup segitiga atas: tile kolom mulai dari baris pertama blok
+        for col_start in range(row_start, n, block_size):
+            scores = block @ embeddings[col_start:col_start + block_size].T
+            rows, cols = np.nonzero(scores >= threshold)
+            rows, cols = rows + row_start, cols + col_start
+            keep = cols > rows
+            for row, col in zip(rows[keep], cols[keep]):
+                yield int(row), int(col)
+
+
+def minhash_signatures(texts: List[str], num_perm: int = 128, shingle_size: int = 5,
+                       seed: int = 0) -> np.ndarray:
+    """
+    Signature MinHash (n, num_perm) dari shingle kata; P(sig_i == sig_j) per kolom = Jaccard shingle
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(_MINHASH_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(_MINHASH_PRIME), size=num_perm, dtype=np.uint64)
+
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for idx, text in enumerate(texts):
+        words = _WORD.findall(text.lower())
+        shingles = {" ".join(words[i:i + shingle_size])
+                    for i in range(max(1, len(words) - shingle_size + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        signatures[idx] = ((hashes[:, None] * a + b) % _MINHASH_PRIME).min(axis=0)
+    return signatures
+
+
+def minhash_duplicate_pairs(texts: List[str], threshold: float = 0.8, num_perm: int = 128, bands: int = 32):
+    """
+    Pasangan near-duplicate untuk korpus besar tanpa embeddings: kandidat dari LSH banding
+    atas signature MinHash, lalu diverifikasi dengan estimasi Jaccard >= threshold
+    """
+    signatures = minhash_signatures(texts, num_perm=num_perm)
+    rows = num_perm // bands
+    candidates = set()
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        for idx, key in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+            buckets.setdefault(key.tobytes(), []).append(idx)
+        for members in buckets.values():
+            for pos, i in enumerate(members):
+                candidates.update((i, j) for j in members[pos + 1:])
+
+    for i, j in sorted(candidates):
+        if np.mean(signatures[i] == signatures[j]) >= threshold:
+            yield i, j
+
+
+def deduplicate_chunks(chunks: List[Dict], embeddings: Optional[np.ndarray] = None, threshold: float = 0.95,
+                       method: str = "embedding") -> Tuple[List[Dict], Optional[np.ndarray], Dict]:
+    """
+    Gabungkan chunk near-duplicate menjadi satu representatif (konten terpanjang dalam grup);
+    chunk hanya dibuang jika mirip langsung (>= threshold) dengan representatifnya.
+    Representatif menyimpan semua sumber anggota grup di field 'sources' sehingga filter
+    source_title/source_type tetap menemukannya.
+
+    method="embedding": cosine similarity embeddings >= threshold (butuh embeddings)
+    method="minhash": estimasi Jaccard shingle kata >= threshold (tanpa embeddings, untuk korpus besar)
+
+    Return (chunks, embeddings, report); urutan chunk yang tersisa tetap sama.
+    """
+    texts = [chunk['content'] for chunk in chunks]
+    exact_pairs = list(exact_duplicate_pairs(texts))
+
+    if method == "embedding":
+        if embeddings is None:
+            raise ValueError("method='embedding' membutuhkan embeddings")
+        near_pairs = embedding_duplicate_pairs(embeddings, threshold)
+    elif method == "minhash":
+        near_pairs = minhash_duplicate_pairs(texts, threshold)
+    else:
+        raise ValueError(f"Unknown dedup method: {method}")
+
+    pairs = exact_pairs + list(near_pairs)
+    neighbours: Dict[int, set] = {}
+    for i, j in pairs:
+        neighbours.setdefault(i, set()).add(j)
+        neighbours.setdefault(j, set()).add(i)
+
+    # Komponen union-find hanya kandidat: anggota dibuang jika mirip langsung dengan representatifnya
+    groups = []
+    for component in _group_pairs(len(chunks), pairs):
+        groups.extend(_split_component(component, neighbours, priority=lambda idx: (len(texts[idx]), -idx)))
+
+    dropped = set()
+    representatives = {}
+    for members in groups:
+        representative = members[0]
+        representatives[representative] = members
+        dropped.update(members[1:])
+
+    kept_ids = [idx for idx in range(len(chunks)) if idx not in dropped]
+    deduped = []
+    for idx in kept_ids:
+        chunk = chunks[idx]
+        if idx in representatives:
+            chunk = dict(chunk)
+            chunk['sources'] = merge_sources([chunks[member] for member in representatives[idx]])
+            chunk['duplicate_count'] = len(representatives[idx])
+        deduped.append(chunk)
+
+    kept_embeddings = None
+    if embeddings is not None:
+        kept_embeddings = np.ascontiguousarray(np.asarray(embeddings)[kept_ids], dtype=np.float32)
+
+    report = {
+        'method': method,
+        'threshold': threshold,
+        'chunks_before': len(chunks),
+        'chunks_after': len(deduped),
+        'removed': len(dropped),
+        'exact_duplicates': len(exact_pairs),
+        'groups': len(groups),
+        'largest_group': max((len(members) for members in groups), default=0),
+        'reduction': len(dropped) / len(chunks) if chunks else 0.0,
+        'chars_before': sum(len(text) for text in texts),
+        'chars_after': sum(len(chunk['content']) for chunk in deduped)
+    }
+    if embeddings is not None:
+        report['embedding_bytes_before'] = int(np.asarray(embeddings).nbytes)
+        report['embedding_bytes_after'] = int(kept_embeddings.nbytes)
+    return deduped, kept_embeddings, report
+
+
+def merge_sources(members: List[Dict]) -> List[Dict]:
+    """
+    Gabungkan sumber (judul, url, tipe, chunk_id) semua anggota grup tanpa duplikat
+    """
+    sources = []
+    seen = set()
+    for chunk in members:
+        for source in chunk.get('sources') or [chunk]:
+            entry = {field: source.get(field) for field in ('source_title', 'source_url', 'source_type', 'chunk_id')}
+            key = (entry['source_title'], entry['chunk_id'])
+            if key not in seen:
+                seen.add(key)
+                sources.append(entry)
+    return sources
+
+
+def print_report(report: Dict):
+    print(f"🧹 Dedup ({report['method']}, threshold={report['threshold']}): "
+          f"{report['chunks_before']} -> {report['chunks_after']} chunks "
+          f"(-{report['removed']}, {report['reduction']:.1%})")
+    print(f"   - {report['groups']} duplicate groups (largest {report['largest_group']}), "
+          f"{report['exact_duplicates']} exact duplicates")
+    print(f"   - Text: {report['chars_before']:,} -> {report['chars_after']:,} chars")
+    if 'embedding_bytes_before' in report:
+        print(f"   - Embeddings: {report['embedding_bytes_before'] / 1e6:.2f} MB -> "
+              f"{report['embedding_bytes_after'] / 1e6:.2f} MB")
+
+
+def main():
+    from .vector_store import VectorStore
+
+    parser = argparse.ArgumentParser(description="Deduplikasi chunk near-duplicate pada bundle vector store")
+    parser.add_argument('--vector-store', default="data/vector_db/vector_store")
+    parser.add_argument('--method', choices=['embedding', 'minhash'], default='embedding')
+    parser.add_argument('--threshold', type=float,
+                        help="Default 0.95 (cosine) untuk embedding, 0.8 (Jaccard) untuk minhash")
+    parser.add_argument('--output', help="Simpan bundle hasil dedup ke base path ini (default: hanya laporan)")
+    args = parser.parse_args()
+
+    threshold = args.threshold if args.threshold is not None else (0.95 if args.method == 'embedding' else 0.8)
+
+    vector_store = VectorStore()
+    if not vector_store.load(args.vector_store):
+        print("❌ Could not load vector store! Please run app.py once to build it")
+        return
+
+    chunks, embeddings, report = deduplicate_chunks(list(vector_store.chunks), vector_store.embeddings,
+                                                    threshold=threshold, method=args.method)
+    print_report(report)
+
+    if args.output:
+        vector_store.dedup_threshold = None
+        vector_store.dedup_report = report
+        vector_store.build_index(chunks, embeddings)
+        vector_store.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
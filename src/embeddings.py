@@ -3,68 +3,39 @@ Text processor untuk memotong teks menjadi chunks dan membuat embeddings
 """
 import json
 import os
-import re
 from typing import List, Dict
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from .chunker import SentenceChunker, chunk_articles, clean_text
 
 class TextProcessor:
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         
-        # Setup text splitter
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]
-        )
+        # Chunker native berbasis kalimat (lihat src/chunker.py)
+        self.text_splitter = SentenceChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     
     def clean_text(self, text: str) -> str:
         """
         Bersihkan teks dari karakter yang tidak diinginkan
         """
-        # Hapus referensi Wikipedia seperti [1], [2], dll
-        text = re.sub(r'\[\d+\]', '', text)
-        
-        # Hapus multiple whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Hapus karakter aneh
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\"]', '', text)
-        
-        return text.strip()
+        return clean_text(text)
     
-    def create_chunks(self, articles: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    def create_chunks(self, articles: List[Dict[str, str]], workers: int = None) -> List[Dict[str, str]]:
         """
-        Potong artikel menjadi chunks dengan metadata
+        Potong artikel menjadi chunks dengan metadata (start_char/end_char = offset pada
+        teks artikel yang sudah dibersihkan). Korpus besar diproses paralel di process pool.
         """
         all_chunks = []
         
-        for article in articles:
-            print(f"Processing: {article['title']}")
-            
-            # Bersihkan teks
-            clean_content = self.clean_text(article['content'])
-            
-            # Split menjadi chunks
-            chunks = self.text_splitter.split_text(clean_content)
-            
-            # Tambah metadata ke setiap chunk
-            for i, chunk in enumerate(chunks):
-                chunk_data = {
-                    'content': chunk,
-                    'source_title': article['title'],
-                    'source_url': article['url'],
-                    'source_type': article['source'],
-                    'chunk_id': f"{article['title'].lower().replace(' ', '_')}_chunk_{i}",
-                    'chunk_index': i,
-                    'total_chunks': len(chunks)
-                }
-                all_chunks.append(chunk_data)
-            
-            print(f"  → Created {len(chunks)} chunks")
+        per_article = chunk_articles(articles, self.chunk_size, self.chunk_overlap, workers=workers)
+        for article, chunks in zip(articles, per_article):
+            if len(articles) <= 50:
+                print(f"Processing: {article['title']}")
+                print(f"  → Created {len(chunks)} chunks")
+            all_chunks.extend(chunks)
         
+        print(f"✅ Created {len(all_chunks)} chunks from {len(articles)} articles")
         return all_chunks
     
     def save_chunks(self, chunks: List[Dict[str, str]], output_path: str):
@@ -0,0 +1,98 @@
+"""
+Backend encoder untuk query dan corpus embedding: SentenceTransformer float32 (default) atau
+int8 (dynamic quantization PyTorch pada semua layer Linear) untuk serving CPU-only
+"""
+import argparse
+import json
+import os
+
+import torch
+from sentence_transformers import SentenceTransformer
+
+
+ENCODER_BACKENDS = ('float32', 'int8')
+
+
+def configure_threads(num_threads: int):
+    """
+    Batasi thread PyTorch: intra-op = num_threads, inter-op = 1. Untuk query batch-1 sedikit
+    thread lebih cepat (overhead sinkronisasi antar thread lebih besar dari kerja per thread)
+    dan tidak berebut core dengan request lain yang berjalan bersamaan.
+    Setting ini global untuk seluruh proses, jadi hanya dipanggil dari entry point (app.py, CLI
+    encoder), bukan dari library.
+    """
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Hanya bisa di-set sekali, sebelum ada kerja paralel pertama
+        pass
+
+
+def quantize_encoder(model: SentenceTransformer) -> SentenceTransformer:
+    """
+    Salinan model dengan bobot Linear int8 (aktivasi di-quantize dinamis saat inferensi).
+    API tetap SentenceTransformer (encode, tokenizer, max_seq_length).
+    """
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_encoder(model_name: str, backend: str = "float32") -> SentenceTransformer:
+    """
+    Load encoder dengan backend yang dipilih (lihat ENCODER_BACKENDS)
+    """
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend} (pilih {', '.join(ENCODER_BACKENDS)})")
+
+    model = SentenceTransformer(model_name, device='cpu' if backend == 'int8' else None)
+    if backend == 'int8':
+        model = quantize_encoder(model)
+    return model
+
+
+def main():
+    from .benchmark import (DEFAULT_CHUNKS_PATH, DEFAULT_QUERIES_PATH, benchmark_encoder_agreement,
+                            benchmark_encoder_latency)
+
+    parser = argparse.ArgumentParser(description="Agreement dan latency encoder int8 vs float32")
+    parser.add_argument('--model', default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument('--backend', choices=[b for b in ENCODER_BACKENDS if b != 'float32'], default='int8')
+    parser.add_argument('--queries', default=DEFAULT_QUERIES_PATH)
+    parser.add_argument('--chunks', default=DEFAULT_CHUNKS_PATH)
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--threads', default="1,2,4", help="Jumlah thread intra-op yang dibandingkan untuk query batch-1")
+    parser.add_argument('--output', help="Path file JSON hasil (default: stdout)")
+    args = parser.parse_args()
+
+    with open(args.queries, 'r', encoding='utf-8') as f:
+        queries = json.load(f)
+    with open(args.chunks, 'r', encoding='utf-8') as f:
+        chunks = json.load(f)
+
+    thread_counts = [int(t) for t in args.threads.split(',') if int(t) <= (os.cpu_count() or 1)] or [1]
+    float_model = load_encoder(args.model, backend='float32')
+    encoders = {'float32': float_model, args.backend: quantize_encoder(float_model)}
+
+    # Latency encode query batch-1 per jumlah thread intra-op (agreement cukup dihitung sekali)
+    report = None
+    for num_threads in thread_counts:
+        configure_threads(num_threads)
+        if report is None:
+            report = benchmark_encoder_agreement(float_model, chunks, queries, backend=args.backend, k=args.k,
+                                                 quantized_model=encoders[args.backend])
+        else:
+            report['query_latency'].extend(benchmark_encoder_latency(encoders, [item['query'] for item in queries]))
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"✅ Encoder report saved to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Hot reload index: deteksi bundle vector store versi baru, load + warm-up di background,
+lalu swap secara atomik tanpa restart aplikasi
+"""
+import json
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .vector_store import VectorStore
+
+WARMUP_QUERIES = [
+    "Siapa yang memproklamasikan kemerdekaan Indonesia?",
+    "Kapan Jepang menduduki Indonesia?",
+    "Apa itu Agresi Militer Belanda?"
+]
+
+
+class IndexReloader:
+    """
+    Pantau file metadata bundle; jika versinya berubah, load VectorStore baru
+    (berbagi model dan konfigurasi dengan store lama), warm-up, lalu ganti store di retriever dan RAG chain.
+    Request yang sedang berjalan tetap selesai di store lama.
+    """
+    def __init__(self, retriever, rag_chain, base_path: str = "data/vector_db/vector_store",
+                 poll_interval: float = 10.0, mmap: bool = False,
+                 warmup_queries: List[str] = None):
+        self.retriever = retriever
+        self.rag_chain = rag_chain
+        self.base_path = base_path
+        self.poll_interval = poll_interval
+        self.mmap = mmap
+        self.warmup_queries = warmup_queries if warmup_queries is not None else WARMUP_QUERIES
+        self.metadata_path = f"{base_path}_metadata.json"
+        self.reloads = 0
+
+        # Callback tambahan untuk cache eksternal yang terikat ke versi index lama
+        self.on_swap: List[Callable[[VectorStore, VectorStore], None]] = []
+
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def current_version(self) -> Optional[str]:
+        return getattr(self.retriever.vector_store, 'version', None)
+
+    def _published_version(self) -> Optional[str]:
+        try:
+            with open(self.metadata_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('version')
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def check_now(self) -> bool:
+        """
+        Cek versi yang dipublikasikan dan reload jika berbeda. Return True jika terjadi swap.
+        """
+        version = self._published_version()
+        if version is None or version == self.current_version:
+            return False
+
+        print(f"🔄 New index version detected: {version} (current: {self.current_version})")
+        start = time.perf_counter()
+
+        old_store = self.retriever.vector_store
+        new_store = old_store.clone_config()
+        if not new_store.load(self.base_path, mmap=self.mmap):
+            print("❌ Reload failed, tetap memakai index lama")
+            return False
+
+        # Warm-up: sentuh halaman index dan bangun struktur lazy sebelum menerima traffic
+        for query in self.warmup_queries:
+            new_store.search(query, k=3)
+        new_store.resolve_filters({})
+
+        self.swap(new_store)
+        print(f"✅ Index swapped to version {new_store.version} in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def swap(self, new_store: VectorStore):
+        """
+        Ganti store secara atomik; request baru langsung memakai store baru
+        """
+        with self._swap_lock:
+            old_store = self.retriever.vector_store
+            self.retriever.vector_store = new_store
+            self.rag_chain.vector_store = new_store
+            self.reloads += 1
+
+        # Index chunk di riwayat session menunjuk ke urutan chunk store lama
+        sessions = getattr(self.rag_chain, 'sessions', None)
+        if sessions is not None:
+            sessions.forget_retrieval(old_store)
+
+        for callback in self.on_swap:
+            callback(old_store, new_store)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check_now()
+            except Exception as e:
+                print(f"❌ Error during index reload: {str(e)}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"👀 Watching {self.metadata_path} every {self.poll_interval}s for new index versions")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
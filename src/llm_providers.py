@@ -0,0 +1,648 @@
+"""
+Backend LLM multi-provider (endpoint OpenAI-compatible): health tracking, failover otomatis
+dan hedged request untuk memangkas tail latency
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from .metrics import NULL_TRACE
+
+DEFAULT_GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+
+class ProviderError(Exception):
+    pass
+
+
+class ProviderTimeout(ProviderError):
+    """
+    Provider tidak menjawab dalam batas waktu (timeout provider atau sisa deadline caller)
+    """
+    pass
+
+
+class _Attempt:
+    """
+    Satu request HTTP ke provider; cancel() menutup socket agar request yang kalah hedge berhenti
+    """
+    def __init__(self, provider: "LLMProvider"):
+        self.provider = provider
+        self.cancelled = False
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def attach(self, conn):
+        with self._lock:
+            self._conn = conn
+            if self.cancelled:
+                raise ProviderError(f"{self.provider.name}: cancelled")
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            sock = self._conn.sock if self._conn is not None else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class LLMProvider:
+    """
+    Satu endpoint chat completions OpenAI-compatible (Groq, OpenAI, server lokal, dll)
+    beserta statistik latency dan status health (circuit breaker)
+    """
+    def __init__(self, name: str, api_url: str, model_name: str, api_key: str = None,
+                 timeout: float = 30.0, latency_window: int = 200):
+        self.name = name
+        self.api_url = api_url
+        self.model_name = model_name
+        self.api_key = api_key
+        self.timeout = timeout
+        self.latencies = deque(maxlen=latency_window)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+        # Koneksi keep-alive idle untuk client async: (event loop, reader, writer)
+        self.max_idle_connections = 64
+        self._idle_connections = []
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def latency_percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self.latencies:
+                return None
+            return float(np.percentile(list(self.latencies), q))
+
+    def record_success(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+
+    def record_failure(self, failure_threshold: int, cooldown: float):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            # Circuit terbuka: provider dilewati selama cooldown, lalu dicoba lagi (half-open)
+            if self.consecutive_failures >= failure_threshold:
+                self.open_until = time.monotonic() + cooldown
+
+    def _open(self, payload: Dict, attempt: _Attempt = None, timeout: float = None):
+        url = urlparse(self.api_url)
+        connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        timeout = self.timeout if timeout is None else min(self.timeout, max(timeout, 0.001))
+        conn = connection_class(url.hostname, url.port, timeout=timeout)
+        if attempt is not None:
+            attempt.attach(conn)
+
+        body = json.dumps(dict(payload, model=self.model_name)).encode('utf-8')
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        try:
+            conn.request("POST", url.path or "/", body=body, headers=headers)
+            response = conn.getresponse()
+        except TimeoutError as e:
+            conn.close()
+            raise ProviderTimeout(f"{self.name}: timeout") from e
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise ProviderError(f"{self.name}: {e}") from e
+
+        if response.status >= 400:
+            detail = response.read()[:200].decode('utf-8', 'replace')
+            conn.close()
+            raise ProviderError(f"{self.name}: HTTP {response.status} {detail}")
+        return conn, response
+
+    def complete(self, payload: Dict, attempt: _Attempt = None, timeout: float = None) -> Dict:
+        """
+        Kirim payload chat completions, return JSON response.
+        timeout (opsional, mis. sisa deadline request) memperketat timeout provider.
+        """
+        conn, response = self._open(payload, attempt, timeout)
+        try:
+            return json.loads(response.read())
+        except TimeoutError as e:
+            raise ProviderTimeout(f"{self.name}: timeout") from e
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            raise ProviderError(f"{self.name}: {e}") from e
+        finally:
+            conn.close()
+
+    def stream(self, payload: Dict) -> Iterator[Dict]:
+        """
+        Versi streaming: yield event JSON dari server-sent events sampai "data: [DONE]"
+        """
+        conn, response = self._open(dict(payload, stream=True))
+        try:
+            for raw in response:
+                line = raw.decode('utf-8').strip()
+                if not line.startswith("data: "):
+                    continue
+                event = line[len("data: "):]
+                if event == "[DONE]":
+                    break
+                yield json.loads(event)
+        finally:
+            conn.close()
+
+    async def _aconnect(self):
+        """
+        Ambil koneksi idle milik event loop ini, atau buka koneksi baru (TCP + TLS)
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            while self._idle_connections:
+                owner, reader, writer = self._idle_connections.pop()
+                if owner is loop and not writer.is_closing() and not reader.at_eof():
+                    return reader, writer, True
+                try:
+                    writer.close()
+                except RuntimeError:
+                    # Event loop pemilik koneksi sudah ditutup
+                    pass
+
+        url = urlparse(self.api_url)
+        port = url.port or (443 if url.scheme == 'https' else 80)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(url.hostname, port, ssl=(url.scheme == 'https') or None),
+            self.timeout)
+        return reader, writer, False
+
+    def _arelease(self, reader, writer):
+        with self._lock:
+            if len(self._idle_connections) < self.max_idle_connections:
+                self._idle_connections.append((asyncio.get_running_loop(), reader, writer))
+                return
+        writer.close()
+
+    async def awarmup(self):
+        """
+        Buka satu koneksi keep-alive lebih awal (mis. selagi retrieval berjalan)
+        """
+        try:
+            reader, writer, reused = await self._aconnect()
+        except (OSError, asyncio.TimeoutError):
+            return
+        self._arelease(reader, writer)
+
+    async def _aread_body(self, reader, headers: Dict[str, str]) -> bytes:
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = b''
+            while True:
+                size = int((await reader.readline()).split(b';')[0].strip(), 16)
+                if size == 0:
+                    await reader.readline()
+                    return body
+                body += await reader.readexactly(size)
+                await reader.readline()
+        if 'content-length' in headers:
+            return await reader.readexactly(int(headers['content-length']))
+        return await reader.read()
+
+    async def _arequest(self, payload: Dict) -> Dict:
+        url = urlparse(self.api_url)
+        body = json.dumps(dict(payload, model=self.model_name)).encode('utf-8')
+        head = [f"POST {url.path or '/'} HTTP/1.1", f"Host: {url.netloc}",
+                "Content-Type: application/json", f"Content-Length: {len(body)}", "Connection: keep-alive"]
+        if self.api_key:
+            head.append(f"Authorization: Bearer {self.api_key}")
+        request = ("\r\n".join(head) + "\r\n\r\n").encode('utf-8') + body
+
+        # Koneksi keep-alive bisa sudah ditutup server; coba sekali lagi dengan koneksi baru
+        while True:
+            reader, writer, reused = await self._aconnect()
+            released = False
+            try:
+                try:
+                    writer.write(request)
+                    await writer.drain()
+                    status_line = await reader.readline()
+                except (OSError, asyncio.IncompleteReadError):
+                    status_line = b''
+                if not status_line and reused:
+                    continue
+                if not status_line:
+                    raise ProviderError(f"{self.name}: connection closed")
+
+                status = int(status_line.split()[1])
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                data = await self._aread_body(reader, headers)
+
+                if headers.get('connection', '').lower() != 'close':
+                    self._arelease(reader, writer)
+                    released = True
+                break
+            finally:
+                # Semua jalur selain kembali ke pool (error, timeout, cancel karena kalah hedge) menutup socket
+                if not released:
+                    writer.close()
+
+        if status >= 400:
+            raise ProviderError(f"{self.name}: HTTP {status} {data[:200].decode('utf-8', 'replace')}")
+        return json.loads(data)
+
+    async def acomplete(self, payload: Dict, timeout: float = None) -> Dict:
+        """
+        Versi async dari complete() dengan connection pool keep-alive per event loop.
+        timeout (opsional, mis. sisa deadline request) memperketat timeout provider.
+        """
+        timeout = self.timeout if timeout is None else min(self.timeout, max(timeout, 0.001))
+        try:
+            return await asyncio.wait_for(self._arequest(payload), timeout)
+        except asyncio.TimeoutError as e:
+            raise ProviderTimeout(f"{self.name}: timeout") from e
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+            raise ProviderError(f"{self.name}: {e!r}") from e
+
+    def stats(self) -> Dict:
+        return {
+            'name': self.name,
+            'healthy': self.healthy,
+            'successes': self.successes,
+            'failures': self.failures,
+            'p50_ms': (self.latency_percentile(50) or 0.0) * 1000.0,
+            'p95_ms': (self.latency_percentile(95) or 0.0) * 1000.0
+        }
+
+
+class ProviderPool:
+    """
+    Urutan provider = prioritas. Request dikirim ke provider sehat pertama; jika gagal,
+    failover ke provider berikutnya. Dengan hedge=True, jika provider pertama belum menjawab
+    setelah hedge_delay (default p95 latency-nya), request kedua dikirim ke provider berikutnya
+    dan yang kalah dibatalkan.
+    """
+    def __init__(self, providers: List[LLMProvider], hedge: bool = False, hedge_delay: float = None,
+                 hedge_percentile: float = 95.0, default_hedge_delay: float = 1.0,
+                 failure_threshold: int = 3, cooldown: float = 30.0, max_workers: int = 32):
+        if not providers:
+            raise ValueError("ProviderPool membutuhkan minimal satu provider")
+        self.providers = providers
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+
+    def candidates(self) -> List[LLMProvider]:
+        """
+        Provider sehat sesuai prioritas; provider dengan circuit terbuka hanya sebagai upaya terakhir
+        """
+        healthy = [p for p in self.providers if p.healthy]
+        return healthy + [p for p in self.providers if not p.healthy]
+
+    def _hedge_delay_for(self, provider: LLMProvider) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        observed = provider.latency_percentile(self.hedge_percentile)
+        return observed if observed is not None else self.default_hedge_delay
+
+    def _run(self, attempt: _Attempt, payload: Dict, deadline_at: float = None) -> Dict:
+        provider = attempt.provider
+        timeout = None if deadline_at is None else deadline_at - time.monotonic()
+        if timeout is not None and timeout <= 0:
+            raise ProviderError(f"{provider.name}: deadline exceeded")
+        start = time.perf_counter()
+        try:
+            result = provider.complete(payload, attempt, timeout)
+        except ProviderTimeout:
+            # Timeout karena sisa deadline caller lebih pendek dari timeout provider bukan kegagalan
+            # provider; hanya melewati timeout provider sendiri yang dihitung circuit breaker
+            if not attempt.cancelled and (timeout is None or timeout >= provider.timeout):
+                provider.record_failure(self.failure_threshold, self.cooldown)
+            raise
+        except Exception:
+            # Request yang dibatalkan karena kalah hedge bukan kegagalan provider
+            if not attempt.cancelled:
+                provider.record_failure(self.failure_threshold, self.cooldown)
+            raise
+        provider.record_success(time.perf_counter() - start)
+        result['provider'] = provider.name
+        return result
+
+    def complete(self, payload: Dict, trace=NULL_TRACE, timeout: float = None) -> Dict:
+        """
+        Jalankan request dengan failover (dan hedging jika aktif); return JSON response
+        ditambah key 'provider'. timeout = total waktu untuk semua percobaan (sisa deadline).
+        """
+        candidates = self.candidates()
+        errors = []
+        deadline_at = None if timeout is None else time.monotonic() + timeout
+
+        while candidates:
+            if self.hedge and len(candidates) >= 2:
+                result = self._complete_hedged(payload, candidates[0], candidates[1], errors, trace, deadline_at)
+                candidates = candidates[2:]
+            else:
+                try:
+                    result = self._run(_Attempt(candidates[0]), payload, deadline_at)
+                except Exception as e:
+                    errors.append(str(e))
+                    result = None
+                candidates = candidates[1:]
+
+            if result is not None:
+                trace.incr(f"llm_provider_{result['provider']}")
+                return result
+            if candidates:
+                trace.incr('llm_failover')
+
+        raise ProviderError("semua provider gagal: " + "; ".join(errors))
+
+    def _complete_hedged(self, payload: Dict, primary: LLMProvider, backup: LLMProvider,
+                         errors: List[str], trace=NULL_TRACE, deadline_at: float = None) -> Optional[Dict]:
+        attempts = {self._executor.submit(self._run, attempt, payload, deadline_at): attempt
+                    for attempt in [_Attempt(primary)]}
+        done, pending = wait(attempts, timeout=self._hedge_delay_for(primary))
+
+        # Primary belum selesai (atau sudah gagal): kirim request kedua ke backup
+        if not done or next(iter(done)).exception() is not None:
+            backup_attempt = _Attempt(backup)
+            attempts[self._executor.submit(self._run, backup_attempt, payload, deadline_at)] = backup_attempt
+            if not done:
+                trace.incr('llm_hedged')
+
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    errors.append(str(future.exception()))
+                    continue
+                # Pemenang: batalkan request lain yang masih berjalan
+                for other in pending:
+                    attempts[other].cancel()
+                    trace.incr('llm_hedge_cancelled')
+                if attempts[future].provider is backup and len(attempts) > 1:
+                    trace.incr('llm_hedge_won')
+                return future.result()
+        return None
+
+    def stream(self, payload: Dict, trace=NULL_TRACE) -> Iterator[Dict]:
+        """
+        Streaming dengan failover sebelum event pertama diterima (tanpa hedging)
+        """
+        errors = []
+        for position, provider in enumerate(self.candidates()):
+            if position > 0:
+                trace.incr('llm_failover')
+            start = time.perf_counter()
+            events = provider.stream(payload)
+            try:
+                first = next(events)
+            except StopIteration:
+                first = None
+            except Exception as e:
+                provider.record_failure(self.failure_threshold, self.cooldown)
+                errors.append(str(e))
+                continue
+
+            trace.incr(f"llm_provider_{provider.name}")
+            if first is not None:
+                yield first
+                yield from events
+            provider.record_success(time.perf_counter() - start)
+            return
+
+        raise ProviderError("semua provider gagal: " + "; ".join(errors))
+
+    async def _arun(self, provider: LLMProvider, payload: Dict, deadline_at: float = None) -> Dict:
+        timeout = None if deadline_at is None else deadline_at - time.monotonic()
+        if timeout is not None and timeout <= 0:
+            raise ProviderError(f"{provider.name}: deadline exceeded")
+        start = time.perf_counter()
+        try:
+            result = await provider.acomplete(payload, timeout)
+        except asyncio.CancelledError:
+            raise
+        except ProviderTimeout:
+            # Sama seperti _run: timeout karena sisa deadline caller tidak dihitung circuit breaker
+            if timeout is None or timeout >= provider.timeout:
+                provider.record_failure(self.failure_threshold, self.cooldown)
+            raise
+        except Exception:
+            provider.record_failure(self.failure_threshold, self.cooldown)
+            raise
+        provider.record_success(time.perf_counter() - start)
+        result['provider'] = provider.name
+        return result
+
+    async def acomplete(self, payload: Dict, trace=NULL_TRACE, timeout: float = None) -> Dict:
+        """
+        Versi async dari complete(): failover dan hedging memakai task asyncio
+        (request yang kalah hedge di-cancel). timeout seperti pada complete().
+        """
+        candidates = self.candidates()
+        errors = []
+        deadline_at = None if timeout is None else time.monotonic() + timeout
+
+        while candidates:
+            if self.hedge and len(candidates) >= 2:
+                result = await self._acomplete_hedged(payload, candidates[0], candidates[1], errors, trace,
+                                                      deadline_at)
+                candidates = candidates[2:]
+            else:
+                try:
+                    result = await self._arun(candidates[0], payload, deadline_at)
+                except Exception as e:
+                    errors.append(str(e))
+                    result = None
+                candidates = candidates[1:]
+
+            if result is not None:
+                trace.incr(f"llm_provider_{result['provider']}")
+                return result
+            if candidates:
+                trace.incr('llm_failover')
+
+        raise ProviderError("semua provider gagal: " + "; ".join(errors))
+
+    async def _acomplete_hedged(self, payload: Dict, primary: LLMProvider, backup: LLMProvider,
+                                errors: List[str], trace=NULL_TRACE, deadline_at: float = None) -> Optional[Dict]:
+        tasks = {asyncio.ensure_future(self._arun(primary, payload, deadline_at)): primary}
+        done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay_for(primary))
+
+        if not done or next(iter(done)).exception() is not None:
+            tasks[asyncio.ensure_future(self._arun(backup, payload, deadline_at))] = backup
+            if not done:
+                trace.incr('llm_hedged')
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    errors.append(str(task.exception()))
+                    continue
+                for other in pending:
+                    other.cancel()
+                    trace.incr('llm_hedge_cancelled')
+                if tasks[task] is backup and len(tasks) > 1:
+                    trace.incr('llm_hedge_won')
+                return task.result()
+        return None
+
+    async def awarmup(self):
+        """
+        Siapkan koneksi ke provider yang akan dipakai (provider sehat pertama, plus backup jika hedging)
+        """
+        candidates = self.candidates()[:2 if self.hedge else 1]
+        await asyncio.gather(*(provider.awarmup() for provider in candidates))
+
+    def stats(self) -> List[Dict]:
+        return [p.stats() for p in self.providers]
+
+
+class RateLimiter:
+    """
+    Token bucket thread-safe: rata-rata `rate` request per detik dengan burst maksimal `burst`
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blok sampai satu token tersedia
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait_seconds = (1.0 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+def providers_from_env() -> List[LLMProvider]:
+    """
+    Provider utama dari GROQ_API_KEY / LLM_API_URL / LLM_MODEL, ditambah fallback dari
+    LLM_FALLBACK_PROVIDERS (JSON list: [{"name", "url", "model", "api_key_env"}])
+    """
+    providers = [LLMProvider(
+        name="groq",
+        api_url=os.getenv("LLM_API_URL", DEFAULT_GROQ_URL),
+        model_name=os.getenv("LLM_MODEL", "llama3-8b-8192"),
+        api_key=os.getenv("GROQ_API_KEY")
+    )]
+    for spec in json.loads(os.getenv("LLM_FALLBACK_PROVIDERS", "[]")):
+        providers.append(LLMProvider(
+            name=spec['name'],
+            api_url=spec['url'],
+            model_name=spec.get('model', 'default'),
+            api_key=os.getenv(spec['api_key_env']) if spec.get('api_key_env') else None,
+            timeout=float(spec.get('timeout', 30.0))
+        ))
+    return providers
+
+
+def benchmark_hedging(num_requests: int = 200, latency: float = 0.2, tail_rate: float = 0.05,
+                      tail_latency: float = 2.0, concurrency: int = 8) -> Dict:
+    """
+    Bandingkan latency tanpa dan dengan hedging memakai dua stub LLM server lokal
+    yang sesekali sangat lambat (tail_rate), plus skenario failover saat provider utama mati
+    """
+    from .stub_llm_server import StubLLMServer
+
+    payload = {'messages': [{'role': 'user', 'content': 'Siapa proklamator Indonesia?'}], 'max_tokens': 50}
+    report = {}
+
+    def measure(pool: ProviderPool) -> Dict:
+        latencies = []
+        errors = 0
+
+        def one(_):
+            start = time.perf_counter()
+            try:
+                pool.complete(payload)
+            except ProviderError:
+                return None
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for seconds in executor.map(one, range(num_requests)):
+                if seconds is None:
+                    errors += 1
+                else:
+                    latencies.append(seconds)
+        latencies_ms = np.array(latencies) * 1000.0
+        return {
+            'p50_ms': float(np.percentile(latencies_ms, 50)) if latencies else 0.0,
+            'p95_ms': float(np.percentile(latencies_ms, 95)) if latencies else 0.0,
+            'p99_ms': float(np.percentile(latencies_ms, 99)) if latencies else 0.0,
+            'error_rate': errors / num_requests,
+            'providers': pool.stats()
+        }
+
+    for name, hedge in (('no_hedge', False), ('hedge', True)):
+        servers = [StubLLMServer(latency=latency, jitter=latency * 0.1, tail_rate=tail_rate,
+                                 tail_latency=tail_latency, seed=seed) for seed in (1, 2)]
+        providers = [LLMProvider(f"stub{i}", server.start(), "stub") for i, server in enumerate(servers)]
+        report[name] = measure(ProviderPool(providers, hedge=hedge))
+        for server in servers:
+            report[name].setdefault('upstream_requests', 0)
+            report[name]['upstream_requests'] += server.requests
+            server.stop()
+
+    # Failover: provider utama selalu error
+    servers = [StubLLMServer(latency=latency, jitter=0.0, error_rate=1.0), StubLLMServer(latency=latency, jitter=0.0)]
+    providers = [LLMProvider(f"stub{i}", server.start(), "stub") for i, server in enumerate(servers)]
+    report['failover'] = measure(ProviderPool(providers, failure_threshold=3, cooldown=60.0))
+    report['failover']['primary_requests'] = servers[0].requests
+    for server in servers:
+        server.stop()
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hedging dan failover provider LLM dengan stub server")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--tail-rate', type=float, default=0.05)
+    parser.add_argument('--tail-latency', type=float, default=2.0)
+    args = parser.parse_args()
+
+    print("🚀 LLM provider hedging/failover benchmark...")
+    report = benchmark_hedging(args.requests, args.latency, args.tail_rate, args.tail_latency)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Load generator: replay log pertanyaan (JSONL) ke RAGChain.query atau ke HTTP API
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import numpy as np
+import requests
+
+from .stub_llm_server import StubLLMServer
+
+DEFAULT_LOG_PATH = "data/benchmark/query_log.jsonl"
+
+
+def load_query_log(path: str) -> List[str]:
+    """
+    Baca file JSONL; setiap baris berisi {"question": "..."}
+    """
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                questions.append(json.loads(line)['question'])
+    return questions
+
+
+def make_inprocess_target(rag_chain) -> Callable[[str], Dict]:
+    """
+    Target yang memanggil RAGChain.query langsung di proses ini
+    """
+    from .admission import DeadlineExceeded, Overloaded
+    from .llm_providers import ProviderError
+
+    def target(question: str) -> Dict:
+        try:
+            result = rag_chain.query(question)
+        except (Overloaded, DeadlineExceeded):
+            return {'ok': False, 'shed': True, 'metrics': {}}
+        except ProviderError:
+            return {'ok': False, 'shed': False, 'metrics': {}}
+        metrics = result['metrics']
+        return {'ok': metrics['counters'].get('llm_errors', 0) == 0, 'status': result['status'], 'metrics': metrics}
+    return target
+
+
+def make_http_target(base_url: str, timeout: float = 60.0) -> Callable[[str], Dict]:
+    """
+    Target yang mengirim POST /query ke HTTP API (app.py --serve)
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=256)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    url = base_url.rstrip('/') + '/query'
+
+    def target(question: str) -> Dict:
+        response = session.post(url, json={'question': question}, timeout=timeout)
+        if response.status_code != 200:
+            # 503 juga dipakai untuk LLM tidak tersedia (status 'llm_unavailable'), bukan shed
+            status = response.json().get('status') if response.status_code in (503, 504) else None
+            return {'ok': False, 'shed': status in ('shed', 'deadline_exceeded'), 'metrics': {}}
+        body = response.json()
+        metrics = body.get('metrics', {})
+        return {'ok': metrics.get('counters', {}).get('llm_errors', 0) == 0, 'status': body.get('status'),
+                'metrics': metrics}
+    return target
+
+
+def _call(target: Callable[[str], Dict], question: str, scheduled_at: float) -> Dict:
+    """
+    Jalankan satu request; latency dihitung dari waktu terjadwal (hindari coordinated omission)
+    """
+    try:
+        outcome = target(question)
+    except Exception as e:
+        outcome = {'ok': False, 'metrics': {}, 'error': str(e)}
+    outcome['latency'] = time.perf_counter() - scheduled_at
+    return outcome
+
+
+def run_closed_loop(target, questions: List[str], concurrency: int, num_requests: int) -> List[Dict]:
+    """
+    N user paralel, masing-masing langsung mengirim request berikutnya setelah selesai
+    """
+    source = itertools.cycle(questions)
+    lock = threading.Lock()
+    outcomes = []
+    remaining = [num_requests]
+
+    def user():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+                question = next(source)
+            outcome = _call(target, question, time.perf_counter())
+            with lock:
+                outcomes.append(outcome)
+
+    threads = [threading.Thread(target=user) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def run_open_loop(target, questions: List[str], rate: float, num_requests: int,
+                  max_workers: int = 256, seed: int = 0) -> List[Dict]:
+    """
+    Kedatangan Poisson dengan rata-rata `rate` request/detik, tidak menunggu response
+    """
+    rng = random.Random(seed)
+    source = itertools.cycle(questions)
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        next_at = time.perf_counter()
+        for _ in range(num_requests):
+            next_at += rng.expovariate(rate)
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(_call, target, next(source), next_at))
+
+    return [f.result() for f in futures]
+
+
+def summarize(outcomes: List[Dict], elapsed: float) -> Dict:
+    """
+    Ringkas hasil: throughput, persentil latency, error rate dan breakdown per tahap
+    """
+    latencies_ms = np.array([o['latency'] for o in outcomes]) * 1000.0
+    shed = sum(1 for o in outcomes if o.get('shed'))
+    errors = sum(1 for o in outcomes if not o['ok']) - shed
+    admitted_ms = np.array([o['latency'] for o in outcomes if not o.get('shed')]) * 1000.0
+    degraded = sum(1 for o in outcomes if o.get('status') in ('degraded', 'retrieval_only'))
+    coalesced = sum(o['metrics'].get('counters', {}).get('llm_coalesced', 0) for o in outcomes)
+
+    stage_totals: Dict[str, float] = {}
+    stage_counts: Dict[str, int] = {}
+    for o in outcomes:
+        for stage, seconds in o['metrics'].get('stages', {}).items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+            stage_counts[stage] = stage_counts.get(stage, 0) + 1
+
+    return {
+        'requests': len(outcomes),
+        'elapsed_seconds': elapsed,
+        'throughput_rps': len(outcomes) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'error_rate': errors / len(outcomes),
+        'shed_rate': shed / len(outcomes),
+        'degraded_rate': degraded / len(outcomes),
+        'admitted_p99_ms': float(np.percentile(admitted_ms, 99)) if len(admitted_ms) else 0.0,
+        'llm_calls_saved': coalesced,
+        'stage_mean_ms': {stage: stage_totals[stage] / stage_counts[stage] * 1000.0 for stage in stage_totals}
+    }
+
+
+def _build_inprocess_chain(chunks_path: str, llm_url: str, max_concurrency: int = None,
+                           max_queue: int = None, timeout: float = None):
+    from .retriever import RAGRetriever
+    from .rag_chain import RAGChain
+    from .benchmark import build_vector_store
+    from .llm_providers import LLMProvider
+    from .admission import AdmissionController
+
+    vector_store = build_vector_store(chunks_path)
+    retriever = RAGRetriever(vector_store)
+    providers = [LLMProvider("loadgen", llm_url, os.getenv("LLM_MODEL", "stub"),
+                             api_key=os.getenv("GROQ_API_KEY", "stub"))]
+    admission = AdmissionController(max_concurrency, max_queue if max_queue is not None else max_concurrency * 4) \
+        if max_concurrency else None
+    return RAGChain(vector_store, retriever, providers=providers, admission=admission, default_timeout=timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test RAG Chatbot dengan replay query log")
+    parser.add_argument('--log', default=DEFAULT_LOG_PATH, help="File JSONL berisi {\"question\": ...}")
+    parser.add_argument('--url', help="Base URL HTTP API (mis. http://localhost:8000); default in-process")
+    parser.add_argument('--chunks', default="data/processed/text_chunks.json")
+    parser.add_argument('--concurrency', default="1,5,10,25,50",
+                        help="Daftar level concurrency (closed loop), dipisah koma")
+    parser.add_argument('--rate', help="Daftar arrival rate req/s (open loop), dipisah koma")
+    parser.add_argument('--requests', type=int, default=200, help="Jumlah request per level")
+    parser.add_argument('--llm-url', help="Endpoint LLM; default: stub server lokal")
+    parser.add_argument('--llm-latency', type=float, default=0.5)
+    parser.add_argument('--llm-jitter', type=float, default=0.1)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--max-concurrency', type=int, help="Admission control in-process: query paralel maksimal")
+    parser.add_argument('--max-queue', type=int, help="Admission control in-process: panjang antrean maksimal")
+    parser.add_argument('--timeout', type=float, help="Deadline per query in-process (detik)")
+    parser.add_argument('--output', help="Path file JSON hasil")
+    args = parser.parse_args()
+
+    questions = load_query_log(args.log)
+
+    stub = None
+    if args.url:
+        target = make_http_target(args.url)
+        mode = 'http'
+    else:
+        llm_url = args.llm_url
+        if not llm_url:
+            stub = StubLLMServer(latency=args.llm_latency, jitter=args.llm_jitter,
+                                 error_rate=args.llm_error_rate)
+            llm_url = stub.start()
+            print(f"🧪 Stub LLM: {llm_url}")
+        target = make_inprocess_target(_build_inprocess_chain(args.chunks, llm_url, args.max_concurrency,
+                                                              args.max_queue, args.timeout))
+        mode = 'in-process'
+
+    if args.rate:
+        levels = [('rate', float(r)) for r in args.rate.split(',')]
+    else:
+        levels = [('concurrency', int(c)) for c in args.concurrency.split(',')]
+
+    curve = []
+    for kind, value in levels:
+        print(f"🔄 Running {kind}={value} ({args.requests} requests, {mode})...")
+        start = time.perf_counter()
+        if kind == 'rate':
+            outcomes = run_open_loop(target, questions, value, args.requests)
+        else:
+            outcomes = run_closed_loop(target, questions, value, args.requests)
+        summary = summarize(outcomes, time.perf_counter() - start)
+        summary[kind] = value
+        curve.append(summary)
+        print(f"  {summary['throughput_rps']:.1f} req/s | p50 {summary['p50_ms']:.0f} ms | "
+              f"p95 {summary['p95_ms']:.0f} ms | p99 {summary['p99_ms']:.0f} ms | "
+              f"errors {summary['error_rate']:.1%} | shed {summary['shed_rate']:.1%} | "
+              f"degraded {summary['degraded_rate']:.1%} | LLM calls saved {summary['llm_calls_saved']}")
+
+    if stub is not None:
+        stub.stop()
+
+    report = {'mode': mode, 'log': args.log, 'curve': curve}
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ Load test results saved to {args.output}")
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
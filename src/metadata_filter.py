@@ -0,0 +1,116 @@
+"""
+Filter metadata untuk search: index nilai metadata -> index chunk, resolve filters
+menjadi index chunk yang diizinkan, dan cache hasil resolve yang dibatasi ukuran byte
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+def build_metadata_index(chunks: List[Dict], fields: Iterable[str]) -> Dict[str, Dict[object, np.ndarray]]:
+    """
+    Precompute daftar index chunk (terurut) per nilai metadata untuk setiap field
+    """
+    metadata_index = {field: {} for field in fields}
+    for idx, chunk in enumerate(chunks):
+        # Chunk hasil dedup juga terdaftar di semua sumber duplikatnya
+        sources = chunk.get('sources') or [chunk]
+        for field in metadata_index:
+            for value in {source.get(field) for source in sources} - {None}:
+                metadata_index[field].setdefault(value, []).append(idx)
+
+    return {
+        field: {value: np.array(ids, dtype=np.int64) for value, ids in values.items()}
+        for field, values in metadata_index.items()
+    }
+
+
+def resolve_filters(metadata_index: Dict[str, Dict[object, np.ndarray]], filters: Dict, total: int) -> np.ndarray:
+    """
+    Ubah filters metadata menjadi array index chunk yang diizinkan (terurut).
+    Nilai dalam list digabung OR, antar field digabung AND.
+    """
+    allowed = None
+    for field, values in filters.items():
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        field_index = metadata_index.get(field, {})
+        parts = [field_index[v] for v in values if v in field_index]
+        ids = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        allowed = ids if allowed is None else np.intersect1d(allowed, ids, assume_unique=True)
+
+    return allowed if allowed is not None else np.arange(total, dtype=np.int64)
+
+
+_SCALAR_TYPES = (str, int, float, bool)
+
+
+def validate_filters(filters: Dict):
+    """
+    Filters harus berupa dict {field (string): nilai skalar atau list nilai skalar};
+    ValueError jika tidak (mis. nilai berupa dict/list bersarang yang tidak bisa di-hash)
+    """
+    if not isinstance(filters, dict):
+        raise ValueError("filters harus berupa object {field: nilai}")
+    for field, values in filters.items():
+        if not isinstance(field, str):
+            raise ValueError(f"nama field filter harus string: {field!r}")
+        if isinstance(values, (list, tuple, set)):
+            if not all(isinstance(value, _SCALAR_TYPES) for value in values):
+                raise ValueError(f"nilai filter '{field}' harus berupa string/angka atau list string/angka")
+        elif not isinstance(values, _SCALAR_TYPES):
+            raise ValueError(f"nilai filter '{field}' harus berupa string/angka atau list string/angka")
+
+
+def filter_key(filters: Dict) -> Tuple:
+    """
+    Key cache yang sama untuk filters yang ekuivalen (urutan field dan nilai tidak berpengaruh)
+    """
+    validate_filters(filters)
+    # Nilai campuran (mis. string dan angka) diurutkan per tipe agar tidak TypeError
+    return tuple(sorted(
+        (field, tuple(sorted(set(values), key=lambda value: (type(value).__name__, value)))
+         if isinstance(values, (list, tuple, set)) else (values,))
+        for field, values in filters.items()
+    ))
+
+
+class FilterCache:
+    """
+    Cache LRU hasil resolve filter yang dibatasi total ukuran array (byte), bukan jumlah entri
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[Tuple, Tuple[object, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Tuple, value, nbytes: int):
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            # Entri yang lebih besar dari seluruh batas tidak di-cache
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                self.bytes -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
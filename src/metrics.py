@@ -0,0 +1,210 @@
+"""
+Instrumentasi latency per tahap untuk pipeline RAG dan export metrics format Prometheus
+"""
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Bucket default (detik) untuk histogram latency
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Trace:
+    """
+    Rekaman satu request: durasi per tahap, counter (mis. cache hit) dan token usage LLM
+    """
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.tokens: Dict[str, int] = {}
+        self.total_seconds: Optional[float] = None
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        Ukur durasi satu tahap; tahap yang dipanggil berulang kali dijumlahkan
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - start)
+            self.counters[f"{name}_calls"] = self.counters.get(f"{name}_calls", 0) + 1
+
+    def incr(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_usage(self, usage: Optional[Dict]):
+        """
+        Tambah token usage dari response LLM (format OpenAI-compatible)
+        """
+        if not usage:
+            return
+        for key in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+            if key in usage:
+                self.tokens[key] = self.tokens.get(key, 0) + int(usage[key])
+
+    def finish(self):
+        """
+        Bekukan durasi total request
+        """
+        if self.total_seconds is None:
+            self.total_seconds = time.perf_counter() - self._start
+
+    def to_dict(self) -> Dict:
+        total = self.total_seconds if self.total_seconds is not None else time.perf_counter() - self._start
+        return {
+            'total_seconds': total,
+            'stages': dict(self.stages),
+            'counters': dict(self.counters),
+            'tokens': dict(self.tokens)
+        }
+
+
+class _NullTrace:
+    """
+    Trace kosong: dipakai saat tidak ada yang merekam, hampir tanpa overhead
+    """
+    _null_span = nullcontext()
+
+    def span(self, name: str):
+        return self._null_span
+
+    def incr(self, name: str, value: int = 1):
+        pass
+
+    def add_usage(self, usage: Optional[Dict]):
+        pass
+
+    def finish(self):
+        pass
+
+    def to_dict(self) -> Dict:
+        return {}
+
+
+NULL_TRACE = _NullTrace()
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsCollector:
+    """
+    Agregasi Trace dari banyak request menjadi histogram dan counter
+    """
+    def __init__(self, namespace: str = "rag", buckets=DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = buckets
+        self.stage_histograms: Dict[str, Histogram] = {}
+        self.total_histogram = Histogram(buckets)
+        self.counters: Dict[str, int] = {}
+        self.tokens: Dict[str, int] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def record(self, trace: Trace):
+        """
+        Masukkan hasil satu Trace ke agregat
+        """
+        data = trace.to_dict()
+        with self._lock:
+            self.requests += 1
+            self.total_histogram.observe(data['total_seconds'])
+            for stage, seconds in data['stages'].items():
+                if stage not in self.stage_histograms:
+                    self.stage_histograms[stage] = Histogram(self.buckets)
+                self.stage_histograms[stage].observe(seconds)
+            for name, value in data['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for name, value in data['tokens'].items():
+                self.tokens[name] = self.tokens.get(name, 0) + value
+
+    def export_prometheus(self) -> str:
+        """
+        Export semua metrics dalam Prometheus text exposition format
+        """
+        ns = self.namespace
+        lines: List[str] = []
+
+        with self._lock:
+            lines.append(f"# HELP {ns}_requests_total Jumlah query RAG yang direkam")
+            lines.append(f"# TYPE {ns}_requests_total counter")
+            lines.append(f"{ns}_requests_total {self.requests}")
+
+            lines.append(f"# HELP {ns}_query_duration_seconds Latency total query RAG")
+            lines.append(f"# TYPE {ns}_query_duration_seconds histogram")
+            lines.extend(self._histogram_lines(f"{ns}_query_duration_seconds", self.total_histogram))
+
+            lines.append(f"# HELP {ns}_stage_duration_seconds Latency per tahap pipeline RAG")
+            lines.append(f"# TYPE {ns}_stage_duration_seconds histogram")
+            for stage in sorted(self.stage_histograms):
+                lines.extend(self._histogram_lines(f"{ns}_stage_duration_seconds",
+                                                   self.stage_histograms[stage], f'stage="{stage}"'))
+
+            lines.append(f"# HELP {ns}_events_total Counter event pipeline (calls, cache hit, dll)")
+            lines.append(f"# TYPE {ns}_events_total counter")
+            for name in sorted(self.counters):
+                lines.append(f'{ns}_events_total{{event="{name}"}} {self.counters[name]}')
+
+            lines.append(f"# HELP {ns}_llm_tokens_total Token usage dari response LLM")
+            lines.append(f"# TYPE {ns}_llm_tokens_total counter")
+            for name in sorted(self.tokens):
+                lines.append(f'{ns}_llm_tokens_total{{type="{name}"}} {self.tokens[name]}')
+
+        return "\n".join(lines) + "\n"
+
+    def _histogram_lines(self, metric: str, histogram: Histogram, labels: str = "") -> List[str]:
+        prefix = f"{labels}," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{metric}_sum{suffix} {histogram.sum}")
+        lines.append(f"{metric}_count{suffix} {histogram.count}")
+        return lines
+
+
+def serve_metrics(collector: MetricsCollector, host: str = "0.0.0.0", port: int = 9100) -> ThreadingHTTPServer:
+    """
+    Jalankan endpoint GET /metrics di background thread
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = collector.export_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"📈 Metrics endpoint aktif di http://{host}:{port}/metrics")
+    return server
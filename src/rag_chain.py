@@ -2,31 +2,54 @@
 RAG Chain yang menggabungkan retrieval dan generation
 """
 import os
-from typing import Dict, List
-import requests
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import Dict, Iterator, List
 import json
 
+from .admission import (FULL, NO_EXPANSION, REDUCED_K, RETRIEVAL_ONLY, AdmissionController,
+                           Deadline, DeadlineExceeded, Overloaded)
+from .conversation import SessionStore, Turn
+from .llm_providers import LLMProvider, ProviderError, ProviderPool, RateLimiter, providers_from_env
+from .metrics import NULL_TRACE, Trace
+from .single_flight import SingleFlight
+
 class RAGChain:
-    def __init__(self, vector_store, retriever, llm_provider="groq"):
+    def __init__(self, vector_store, retriever, llm_provider="groq", metrics_collector=None,
+                 compressor=None, coalesce: bool = True, providers: List[LLMProvider] = None,
+                 hedge: bool = None, admission: AdmissionController = None, default_timeout: float = None,
+                 sessions: SessionStore = None):
         self.vector_store = vector_store
         self.retriever = retriever
         self.llm_provider = llm_provider
+        # Opsional: MetricsCollector untuk agregasi histogram latency per tahap
+        self.metrics_collector = metrics_collector
+        # Opsional: ContextCompressor untuk memangkas konteks menjadi kalimat relevan saja
+        self.compressor = compressor
+        # Request LLM identik yang sedang in-flight digabung menjadi satu panggilan upstream
+        self.single_flight = SingleFlight() if coalesce else None
+        # Opsional: batas concurrency/antrean + load shedding, dan deadline default per query (detik)
+        self.admission = admission
+        self.default_timeout = default_timeout
+        # Riwayat percakapan per session_id (pertanyaan lanjutan memakai ulang retrieval turn sebelumnya)
+        self.sessions = sessions if sessions is not None else SessionStore()
         
-        # Setup LLM API
-        if llm_provider == "groq":
-            self.api_key = os.getenv("GROQ_API_KEY")
-            self.api_url = "https://api.groq.com/openai/v1/chat/completions"
-            self.model_name = "llama3-8b-8192"
-    
-    def generate_response(self, prompt: str) -> str:
-        """Generate response using LLM"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": self.model_name,
+        # Setup LLM API: provider utama + fallback (lihat src/llm_providers.py)
+        if providers is None:
+            if llm_provider != "groq":
+                raise ValueError(f"Unknown llm_provider: {llm_provider}")
+            # LLM_API_URL bisa diarahkan ke server lokal (mis. src.stub_llm_server)
+            providers = providers_from_env()
+        if hedge is None:
+            hedge = os.getenv("LLM_HEDGE", "0") == "1"
+        self.providers = ProviderPool(providers, hedge=hedge)
+    
+    def _build_payload(self, prompt: str) -> Dict:
+        return {
             "messages": [
                 {
                     "role": "system",
@@ -40,32 +63,462 @@ class RAGChain:
             "max_tokens": 500,
             "temperature": 0.1
         }
+    
+    def _request_key(self, prompt: str, stream: bool = False) -> str:
+        """Key coalescing: provider (endpoint + model) + prompt final + parameter model"""
+        providers = [(p.api_url, p.model_name) for p in self.providers.providers]
+        payload = dict(self._build_payload(prompt), stream=stream, providers=providers)
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    
+    def generate_response(self, prompt: str, trace=NULL_TRACE, timeout: float = None) -> str:
+        """Generate response using LLM (request identik yang bersamaan berbagi satu panggilan)"""
+        try:
+            return self._generate(prompt, trace=trace, deadline=Deadline(timeout) if timeout is not None else None)
+            
+        except Exception as e:
+            trace.incr('llm_errors')
+            return f"Error generating response: {str(e)}"
+    
+    def _generate(self, prompt: str, trace=NULL_TRACE, deadline: Deadline = None) -> str:
+        """
+        Seperti generate_response, tetapi kegagalan diteruskan ke caller: DeadlineExceeded jika
+        deadline habis selama panggilan LLM, ProviderError jika semua provider gagal
+        """
+        timeout = deadline.remaining() if deadline is not None else None
+        try:
+            if self.single_flight is None:
+                return self._call_llm(prompt, trace=trace, timeout=timeout)
+            
+            def call_llm():
+                # Sisa waktu dihitung saat dipanggil: follower yang mengulang setelah leader gagal
+                # menjadi leader baru dengan budget yang tersisa
+                return self._call_llm(prompt, trace=trace,
+                                      timeout=deadline.remaining() if deadline is not None else None)
+            
+            response, shared = self.single_flight.do(self._request_key(prompt), call_llm, timeout=timeout)
+            if shared:
+                trace.incr('llm_coalesced')
+            return response
         
+        except (ProviderError, TimeoutError) as e:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded('llm') from e
+            raise
+    
+    def _call_llm(self, prompt: str, trace=NULL_TRACE, timeout: float = None) -> str:
+        result = self.providers.complete(self._build_payload(prompt), trace=trace, timeout=timeout)
+        trace.add_usage(result.get('usage'))
+        return result['choices'][0]['message']['content']
+    
+    async def agenerate_response(self, prompt: str, trace=NULL_TRACE, deadline: Deadline = None) -> str:
+        """
+        Versi async dari _generate (client HTTP asyncio, tanpa thread per request): DeadlineExceeded
+        jika deadline habis selama panggilan LLM, ProviderError jika semua provider gagal
+        """
+        timeout = deadline.remaining() if deadline is not None else None
         try:
-            response = requests.post(self.api_url, headers=headers, json=data)
-            response.raise_for_status()
+            if self.single_flight is None:
+                return await self._acall_llm(prompt, trace=trace, timeout=timeout)
             
-            result = response.json()
-            return result['choices'][0]['message']['content']
+            def call_llm():
+                return self._acall_llm(prompt, trace=trace,
+                                       timeout=deadline.remaining() if deadline is not None else None)
+            
+            response, shared = await self.single_flight.ado(self._request_key(prompt), call_llm, timeout=timeout)
+            if shared:
+                trace.incr('llm_coalesced')
+            return response
+        
+        except (ProviderError, TimeoutError) as e:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded('llm') from e
+            raise
+    
+    async def _acall_llm(self, prompt: str, trace=NULL_TRACE, timeout: float = None) -> str:
+        result = await self.providers.acomplete(self._build_payload(prompt), trace=trace, timeout=timeout)
+        trace.add_usage(result.get('usage'))
+        return result['choices'][0]['message']['content']
+    
+    def generate_response_stream(self, prompt: str, trace=NULL_TRACE) -> Iterator[str]:
+        """Generate response secara streaming (potongan teks), dengan coalescing yang sama"""
+        try:
+            if self.single_flight is None:
+                yield from self._stream_llm(prompt, trace=trace)
+                return
+            
+            chunks, shared = self.single_flight.stream(self._request_key(prompt, stream=True),
+                                                       lambda: self._stream_llm(prompt, trace=trace))
+            if shared:
+                trace.incr('llm_coalesced')
+            yield from chunks
             
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            trace.incr('llm_errors')
+            yield f"Error generating response: {str(e)}"
+    
+    def _stream_llm(self, prompt: str, trace=NULL_TRACE) -> Iterator[str]:
+        for event in self.providers.stream(self._build_payload(prompt), trace=trace):
+            trace.add_usage(event.get('usage') or (event.get('x_groq') or {}).get('usage'))
+            delta = event['choices'][0].get('delta', {}).get('content') if event.get('choices') else None
+            if delta:
+                yield delta
+    
+    def query(self, question: str, filters: Dict = None, timeout: float = None, session_id: str = None) -> Dict:
+        """
+        Main query method untuk RAG
+
+        timeout (default self.default_timeout) = deadline request dalam detik, diteruskan ke
+        retrieval dan LLM. Dengan admission controller, request bisa ditolak (Overloaded) atau
+        dijalankan dalam mode degradasi; status ada di result['status']. Deadline yang habis
+        (termasuk selama panggilan LLM) menghasilkan DeadlineExceeded, dan ProviderError jika
+        semua provider LLM gagal.
+        session_id (opsional) mengaktifkan riwayat percakapan: pertanyaan lanjutan memakai ulang
+        kandidat dan embedding turn sebelumnya, dan turn terakhir ikut masuk prompt.
+        """
+        trace = Trace()
+        timeout = timeout if timeout is not None else self.default_timeout
+        deadline = Deadline(timeout) if timeout else None
+        
+        try:
+            if self.admission is None:
+                return self._run_query(question, filters, trace, deadline, FULL, session_id)
+            queued_at = time.perf_counter()
+            with self.admission.admit(deadline) as level:
+                trace.stages['queue'] = time.perf_counter() - queued_at
+                return self._run_query(question, filters, trace, deadline, level, session_id)
+        
+        except Overloaded:
+            trace.incr('shed')
+            self._record(trace)
+            raise
+        except DeadlineExceeded:
+            trace.incr('deadline_exceeded')
+            self._record(trace)
+            raise
+        except ProviderError:
+            trace.incr('llm_errors')
+            self._record(trace)
+            raise
+    
+    def _run_query(self, question: str, filters: Dict, trace: Trace, deadline: Deadline, level: int,
+                   session_id: str = None) -> Dict:
+        if level > FULL:
+            trace.incr(f'degrade_level_{level}')
+        
+        state = self.sessions.get(session_id) if session_id is not None else None
+        if state is not None:
+            with state.lock:
+                return self._run_session_query(question, filters, trace, deadline, level, state)
+        
+        # 1. Retrieve relevant context (mode degradasi: tanpa expansion, k lebih kecil)
+        context = self.retriever.retrieve_context(question, k=1 if level >= REDUCED_K else 3, filters=filters,
+                                                  expand=level < NO_EXPANSION, deadline=deadline, trace=trace)
+        return self._answer(question, context, trace, deadline, level)
+    
+    def _run_session_query(self, question: str, filters: Dict, trace: Trace, deadline: Deadline, level: int,
+                           state) -> Dict:
+        context, query_embedding, store, history = self._session_context(question, filters, trace, deadline,
+                                                                         level, state)
+        result = self._answer(question, context, trace, deadline, level, history=history)
+        self._add_turn(state, question, result, context, query_embedding, store)
+        return result
+    
+    def _session_context(self, question: str, filters: Dict, trace: Trace, deadline: Deadline, level: int,
+                         state):
+        """
+        Retrieval untuk query dengan session; return (context, query_embedding, store, history)
+        """
+        k = 1 if level >= REDUCED_K else 3
+        previous = state.last_turn
+        store = self.retriever.vector_store
+        # Reuse hanya untuk store dengan matriks embedding lokal (bukan sharded) dan tanpa filter,
+        # karena kandidat lama tidak dicek ulang terhadap filter. Index chunk turn sebelumnya hanya
+        # berlaku untuk store yang menjawabnya (setelah hot reload index-nya bisa menunjuk chunk lain).
+        if previous is not None and filters is None and state.is_follow_up(question) and \
+                previous.vector_store is store and getattr(store, 'embeddings', None) is not None:
+            context = self.retriever.retrieve_followup(question, previous.chunk_indices, previous.query_embedding,
+                                                       k=k, vector_store=store, trace=trace)
+            query_embedding = context.pop('query_embedding')
+        else:
+            context = self.retriever.retrieve_context(question, k=k, filters=filters, expand=level < NO_EXPANSION,
+                                                      deadline=deadline, trace=trace)
+            # Embedding query bersih sudah ada di cache dari variant pertama retrieval
+            query_embedding = store.encode_query(self.retriever.preprocess_query(question))
+        
+        history = [{'question': turn.question, 'response': turn.response} for turn in state.turns]
+        return context, query_embedding, store, history[-2:]
+    
+    def _add_turn(self, state, question: str, result: Dict, context: Dict, query_embedding, store):
+        # Store di-swap selagi retrieval berjalan: index chunk tidak bisa dipastikan milik store mana
+        chunk_indices = [part['index'] for part in context['context_parts'] if part.get('index') is not None] \
+            if self.retriever.vector_store is store else []
+        state.add_turn(Turn(question, result['response'], chunk_indices, query_embedding, vector_store=store))
     
-    def query(self, question: str) -> Dict:
-        """Main query method untuk RAG"""
-        # 1. Retrieve relevant context
-        context = self.retriever.retrieve_context(question, k=3)
+    def _answer(self, question: str, context: Dict, trace: Trace, deadline: Deadline, level: int,
+                history: List[Dict] = None) -> Dict:
+        
+        level = self._answer_level(trace, deadline, level)
+        if level >= RETRIEVAL_ONLY:
+            return self._retrieval_only(trace, question, context)
+        
+        # 1b. Kompresi ekstraktif (opsional)
+        if self.compressor is not None:
+            with trace.span('compress'):
+                context = self.compressor.compress(question, context, self.vector_store, trace=trace)
+        
+        # 2. Format prompt
+        with trace.span('prompt'):
+            prompt = self.retriever.format_prompt(question, context, history=history)
+        
+        # 3. Generate response
+        with trace.span('llm'):
+            response = self._generate(prompt, trace=trace, deadline=deadline)
+        
+        return self._finish(trace, question, context, response, prompt,
+                            status='degraded' if level > FULL else 'ok')
+    
+    async def _aanswer(self, question: str, context: Dict, trace: Trace, deadline: Deadline, level: int,
+                       history: List[Dict] = None, warmup: asyncio.Future = None) -> Dict:
+        """Versi async dari _answer: kompresi (CPU) di executor, LLM lewat client asyncio"""
+        level = self._answer_level(trace, deadline, level)
+        if level >= RETRIEVAL_ONLY:
+            return self._retrieval_only(trace, question, context)
+        
+        # 1b. Kompresi ekstraktif (opsional)
+        if self.compressor is not None:
+            with trace.span('compress'):
+                context = await asyncio.get_running_loop().run_in_executor(
+                    None, partial(self.compressor.compress, question, context, self.vector_store, trace=trace))
         
         # 2. Format prompt
-        prompt = self.retriever.format_prompt(question, context)
+        with trace.span('prompt'):
+            prompt = self.retriever.format_prompt(question, context, history=history)
         
         # 3. Generate response
-        response = self.generate_response(prompt)
+        if warmup is not None:
+            await warmup
+        with trace.span('llm'):
+            response = await self.agenerate_response(prompt, trace=trace, deadline=deadline)
+        
+        return self._finish(trace, question, context, response, prompt,
+                            status='degraded' if level > FULL else 'ok')
+    
+    def _answer_level(self, trace: Trace, deadline: Deadline, level: int) -> int:
+        # Sisa deadline tidak cukup untuk LLM: langsung jawab dari konteks
+        if level < RETRIEVAL_ONLY and deadline is not None and \
+                deadline.remaining() < self._expected_llm_seconds():
+            trace.incr('degrade_deadline')
+            return RETRIEVAL_ONLY
+        return level
+    
+    def _retrieval_only(self, trace: Trace, question: str, context: Dict) -> Dict:
+        with trace.span('prompt'):
+            response = self._retrieval_only_response(context)
+        return self._finish(trace, question, context, response, "", status='retrieval_only')
+    
+    def _expected_llm_seconds(self) -> float:
+        """Perkiraan latency LLM (p50 provider utama yang sehat); 0 jika belum ada data"""
+        candidates = self.providers.candidates()
+        observed = candidates[0].latency_percentile(50) if candidates else None
+        return observed or 0.0
+    
+    def _retrieval_only_response(self, context: Dict) -> str:
+        if not context['context_parts']:
+            return "Maaf, layanan sedang sibuk dan tidak ditemukan konteks yang relevan. Silakan coba lagi."
+        top = context['context_parts'][0]
+        excerpt = top['content'].split("\n", 1)[-1][:500]
+        return f"Layanan sedang sibuk; berikut kutipan sumber paling relevan ({top['source']}):\n{excerpt}"
+    
+    async def aquery(self, question: str, filters: Dict = None, timeout: float = None,
+                     session_id: str = None) -> Dict:
+        """
+        Versi async dari query dengan semantik yang sama (timeout, admission, session, error):
+        retrieval (CPU) di executor, LLM lewat client asyncio
+        """
+        trace = Trace()
+        timeout = timeout if timeout is not None else self.default_timeout
+        deadline = Deadline(timeout) if timeout else None
+        
+        try:
+            if self.admission is None:
+                return await self._arun_query(question, filters, trace, deadline, FULL, session_id)
+            queued_at = time.perf_counter()
+            async with self.admission.aadmit(deadline) as level:
+                trace.stages['queue'] = time.perf_counter() - queued_at
+                return await self._arun_query(question, filters, trace, deadline, level, session_id)
+        
+        except Overloaded:
+            trace.incr('shed')
+            self._record(trace)
+            raise
+        except DeadlineExceeded:
+            trace.incr('deadline_exceeded')
+            self._record(trace)
+            raise
+        except ProviderError:
+            trace.incr('llm_errors')
+            self._record(trace)
+            raise
+    
+    async def _arun_query(self, question: str, filters: Dict, trace: Trace, deadline: Deadline, level: int,
+                          session_id: str = None) -> Dict:
+        if level > FULL:
+            trace.incr(f'degrade_level_{level}')
+        loop = asyncio.get_running_loop()
+        
+        # Buka koneksi ke LLM selagi retrieval berjalan
+        warmup = loop.create_task(self._awarmup())
+        try:
+            state = self.sessions.get(session_id) if session_id is not None else None
+            if state is None:
+                # 1. Retrieve relevant context (mode degradasi: tanpa expansion, k lebih kecil)
+                context = await self.retriever.aretrieve_context(question, k=1 if level >= REDUCED_K else 3,
+                                                                 filters=filters, expand=level < NO_EXPANSION,
+                                                                 deadline=deadline, trace=trace)
+                return await self._aanswer(question, context, trace, deadline, level, warmup=warmup)
+            
+            # Lock session dipegang sampai turn tercatat; diambil di executor agar event loop tidak terblokir
+            await loop.run_in_executor(None, state.lock.acquire)
+            try:
+                context, query_embedding, store, history = await loop.run_in_executor(
+                    None, partial(self._session_context, question, filters, trace, deadline, level, state))
+                result = await self._aanswer(question, context, trace, deadline, level, history=history,
+                                             warmup=warmup)
+                self._add_turn(state, question, result, context, query_embedding, store)
+                return result
+            finally:
+                state.lock.release()
+        finally:
+            if not warmup.done():
+                warmup.cancel()
+    
+    async def _awarmup(self):
+        await self.providers.awarmup()
+    
+    async def agather(self, questions: List[str], filters: Dict = None, max_concurrency: int = 100,
+                      timeout: float = None, return_exceptions: bool = False) -> List[Dict]:
+        """
+        Jalankan aquery untuk banyak pertanyaan secara konkuren; urutan hasil = urutan input.
+        Kegagalan (Overloaded, DeadlineExceeded, ProviderError) diteruskan seperti query();
+        dengan return_exceptions=True exception-nya dikembalikan di posisi pertanyaan tersebut.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def run(question: str) -> Dict:
+            async with semaphore:
+                return await self.aquery(question, filters=filters, timeout=timeout)
+        
+        return await asyncio.gather(*(run(question) for question in questions), return_exceptions=return_exceptions)
+    
+    def query_batch(self, questions: List[str], output_path: str = None, filters: Dict = None,
+                    max_concurrency: int = 8, requests_per_second: float = None,
+                    retrieval_batch_size: int = 256) -> List[Dict]:
+        """
+        Jawab banyak pertanyaan sekaligus (evaluasi offline, FAQ): retrieval dalam batch besar,
+        panggilan LLM paralel dengan batas concurrency dan rate limit.
+        Dengan output_path setiap hasil langsung ditulis ke JSONL begitu selesai; jika file sudah ada,
+        pertanyaan yang sudah berhasil dijawab dilewati (resume).
+        Return record per pertanyaan sesuai urutan input.
+        """
+        records: Dict[int, Dict] = {}
+        if output_path and os.path.exists(output_path):
+            with open(output_path, 'rb+') as f:
+                data = f.read()
+                # Baris terakhir bisa terpotong jika proses sebelumnya mati saat menulis: buang,
+                # supaya record berikutnya tidak tersambung ke potongan itu
+                complete = data.rfind(b"\n") + 1
+                if complete < len(data):
+                    f.truncate(complete)
+            for line in data[:complete].decode('utf-8').splitlines():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                index = record.get('index')
+                if isinstance(index, int) and index < len(questions) and \
+                        record.get('question') == questions[index] and not record.get('error'):
+                    records[index] = record
+            print(f"📂 Resuming: {len(records)}/{len(questions)} questions already answered")
+        
+        pending = [i for i in range(len(questions)) if i not in records]
+        if not pending:
+            return [records[i] for i in range(len(questions))]
+        
+        rate_limiter = RateLimiter(requests_per_second, burst=max_concurrency) if requests_per_second else None
+        write_lock = threading.Lock()
+        output = open(output_path, 'a', encoding='utf-8') if output_path else None
+        
+        def answer(index: int, context: Dict, retrieval_seconds: float) -> Dict:
+            trace = Trace()
+            trace.stages['retrieve_batch'] = retrieval_seconds
+            question = questions[index]
+            
+            if self.compressor is not None:
+                with trace.span('compress'):
+                    context = self.compressor.compress(question, context, self.vector_store, trace=trace)
+            with trace.span('prompt'):
+                prompt = self.retriever.format_prompt(question, context)
+            if rate_limiter is not None:
+                with trace.span('rate_limit_wait'):
+                    rate_limiter.acquire()
+            with trace.span('llm'):
+                response = self.generate_response(prompt, trace=trace)
+            
+            result = self._finish(trace, question, context, response, prompt)
+            record = {
+                'index': index,
+                'question': question,
+                'response': response,
+                'sources': context['used_sources'],
+                'chunk_ids': [part['chunk_id'] for part in context['context_parts']],
+                'error': trace.counters.get('llm_errors', 0) > 0,
+                'metrics': result['metrics']
+            }
+            if output is not None:
+                with write_lock:
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+            return record
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                futures = []
+                # Retrieval per batch; LLM untuk batch ini sudah berjalan selagi batch berikutnya di-retrieve
+                for start in range(0, len(pending), retrieval_batch_size):
+                    batch = pending[start:start + retrieval_batch_size]
+                    retrieval_start = time.perf_counter()
+                    contexts = self.retriever.retrieve_context_batch(
+                        [questions[i] for i in batch], k=3, filters=filters, batch_size=retrieval_batch_size)
+                    retrieval_seconds = (time.perf_counter() - retrieval_start) / len(batch)
+                    futures.extend(executor.submit(answer, index, context, retrieval_seconds)
+                                   for index, context in zip(batch, contexts))
+                
+                for done, future in enumerate(as_completed(futures), 1):
+                    record = future.result()
+                    records[record['index']] = record
+                    if done % 100 == 0 or done == len(futures):
+                        print(f"   - {done}/{len(futures)} answered")
+        finally:
+            if output is not None:
+                output.close()
+        
+        return [records[i] for i in range(len(questions))]
+    
+    def _record(self, trace: Trace):
+        trace.finish()
+        if self.metrics_collector is not None:
+            self.metrics_collector.record(trace)
+    
+    def _finish(self, trace: Trace, question: str, context: Dict, response: str, prompt: str,
+                status: str = 'ok') -> Dict:
+        self._record(trace)
         
         # 4. Return hasil lengkap
         return {
             "question": question,
             "context": context,
             "response": response,
-            "prompt": prompt
+            "prompt": prompt,
+            "status": status,
+            "metrics": trace.to_dict()
         }
\ No newline at end of file
@@ -2,10 +2,16 @@
 Retriever untuk menggabungkan query processing dan context retrieval
 """
 import re
+import asyncio
+from functools import partial
 from typing import List, Dict
 import os
+import numpy as np
 from dotenv import load_dotenv
 
+from .admission import DeadlineExceeded
+from .metrics import NULL_TRACE
+
 # Load environment variables
 load_dotenv()
 
@@ -53,29 +59,178 @@ class RAGRetriever:
         
         return enhanced_queries
     
-    def retrieve_context(self, query: str, k: int = 5, min_score: float = 0.2) -> Dict:
+    def retrieve_context(self, query: str, k: int = 5, min_score: float = 0.2, filters: Dict = None,
+                         adaptive: bool = False, max_results: int = 20, high_confidence: float = 0.5,
+                         expand: bool = True, deadline=None, trace=NULL_TRACE) -> Dict:
         """
         Retrieve relevant context untuk RAG
+
+        filters (opsional) membatasi search ke metadata tertentu, mis. {'source_title': 'Mohammad Hatta'}
+
+        adaptive=True memakai range search (semua chunk dengan score >= min_score, maksimal
+        max_results per variant) sebagai ganti fixed k, dan berhenti mencari variant berikutnya
+        begitu chunk dengan score >= high_confidence sudah memenuhi max_context_length. Mode ini hanya
+        dipakai benchmark (retrieve_context_adaptive); RAGChain.query tetap memakai fixed k.
+        candidates_examined = k per variant untuk fixed k, dan jumlah vector yang di-scan range search
+        untuk mode adaptif.
+
+        expand=False melewati query expansion (mode degradasi saat beban tinggi). Jika deadline
+        habis di tengah jalan, variant sisanya dilewati; jika habis sebelum ada hasil,
+        DeadlineExceeded dilempar.
         """
         # Preprocess query
-        clean_query = self.preprocess_query(query)
+        with trace.span('preprocess'):
+            clean_query = self.preprocess_query(query)
         
         # Enhance query untuk search yang lebih baik
-        enhanced_queries = self.enhance_query(clean_query)
+        with trace.span('expand'):
+            enhanced_queries = self.enhance_query(clean_query) if expand else [clean_query]
+        trace.incr('query_variants', len(enhanced_queries))
+        
+        # Ambil referensi store sekali: jika index di-swap (hot reload) di tengah request,
+        # request ini tetap selesai di store lama
+        vector_store = self.vector_store
         
         # Collect results dari semua query variants
         all_results = []
         seen_chunks = set()
         
+        candidates_examined = 0
+        variants_searched = 0
+        confident_length = 0
+        
         for eq in enhanced_queries:
-            results = self.vector_store.search(eq, k=k, min_score=min_score)
+            if deadline is not None and deadline.expired():
+                if variants_searched == 0:
+                    raise DeadlineExceeded('retrieval')
+                trace.incr('deadline_truncated')
+                break
+            variants_searched += 1
+            if adaptive:
+                results, num_scanned = vector_store.range_search(
+                    eq, min_score=min_score, max_results=max_results, filters=filters, trace=trace)
+                candidates_examined += num_scanned
+            else:
+                results = vector_store.search(eq, k=k, min_score=min_score, filters=filters, trace=trace)
+                candidates_examined += k
             
             for result in results:
                 chunk_id = result['chunk']['chunk_id']
                 if chunk_id not in seen_chunks:
                     all_results.append(result)
                     seen_chunks.add(chunk_id)
-        
+                    if result['score'] >= high_confidence:
+                        confident_length += len(result['chunk']['content'])
+            
+            # Pertanyaan mudah: konteks sudah penuh dengan chunk yang sangat relevan
+            if adaptive and confident_length >= self.max_context_length:
+                break
+        
+        trace.incr('candidates', len(all_results))
+        trace.incr('candidates_examined', candidates_examined)
+        trace.incr('variants_searched', variants_searched)
+        
+        with trace.span('pack'):
+            # Mode adaptif: jumlah chunk dibatasi budget konteks, bukan k
+            context = self._build_context(all_results, max_results * variants_searched if adaptive else k)
+        context['candidates_examined'] = candidates_examined
+        context['variants_searched'] = variants_searched
+        return context
+    
+    def retrieve_followup(self, query: str, previous_indices: List[int], previous_embedding: np.ndarray,
+                          k: int = 5, min_score: float = 0.2, filters: Dict = None, history_weight: float = 0.5,
+                          vector_store=None, trace=NULL_TRACE) -> Dict:
+        """
+        Retrieval inkremental untuk pertanyaan lanjutan: query di-encode sekali (tanpa expansion)
+        dan digabung dengan embedding turn sebelumnya agar rujukan seperti "perannya" tetap
+        mengarah ke topik yang sama. Kandidat turn sebelumnya di-skor ulang, hanya k kandidat
+        baru yang dicari, lalu gabungannya di-rank ulang.
+        Return context (format sama dengan retrieve_context) + 'query_embedding' gabungan.
+        vector_store (default self.vector_store) harus store yang menghasilkan previous_indices.
+        """
+        vector_store = vector_store if vector_store is not None else self.vector_store
+        
+        with trace.span('preprocess'):
+            clean_query = self.preprocess_query(query)
+        query_embedding = vector_store.encode_query(clean_query, trace=trace)
+        
+        combined = query_embedding + history_weight * previous_embedding
+        combined = (combined / max(np.linalg.norm(combined), 1e-12)).astype(np.float32)
+        
+        # Kandidat baru: satu search dengan embedding gabungan
+        all_results = vector_store.search_by_embedding(combined, k=k, min_score=min_score,
+                                                       filters=filters, trace=trace)
+        seen = {result['index'] for result in all_results}
+        
+        # Kandidat lama: cukup skor ulang terhadap embedding gabungan (tanpa search)
+        reused = [idx for idx in previous_indices if idx not in seen]
+        if reused:
+            scores = np.asarray(vector_store.embeddings[reused]) @ combined[0]
+            for idx, score in zip(reused, scores):
+                if score >= min_score:
+                    all_results.append({'chunk': vector_store.chunks[idx], 'score': float(score),
+                                        'rank': 0, 'index': int(idx)})
+        
+        trace.incr('followup_retrievals')
+        trace.incr('candidates_reused', len(reused))
+        trace.incr('candidates', len(all_results))
+        
+        with trace.span('pack'):
+            context = self._build_context(all_results, k)
+        context['candidates_examined'] = k + len(reused)
+        context['variants_searched'] = 1
+        context['query_embedding'] = combined
+        return context
+    
+    def retrieve_context_batch(self, queries: List[str], k: int = 5, min_score: float = 0.2,
+                               filters: Dict = None, batch_size: int = 256, trace=NULL_TRACE) -> List[Dict]:
+        """
+        Versi batch dari retrieve_context: semua query dan variant-nya di-encode dalam batch besar
+        lalu dicari dengan satu matrix search FAISS
+        """
+        with trace.span('expand'):
+            variants = [self.enhance_query(self.preprocess_query(query)) for query in queries]
+        flat_variants = [variant for query_variants in variants for variant in query_variants]
+        trace.incr('query_variants', len(flat_variants))
+        
+        vector_store = self.vector_store
+        embeddings = vector_store.encode_queries(flat_variants, batch_size=batch_size, trace=trace)
+        flat_results = vector_store.search_batch_by_embedding(embeddings, k=k, min_score=min_score,
+                                                              filters=filters, trace=trace)
+        
+        contexts = []
+        position = 0
+        with trace.span('pack'):
+            for query_variants in variants:
+                all_results = []
+                seen_chunks = set()
+                for results in flat_results[position:position + len(query_variants)]:
+                    for result in results:
+                        chunk_id = result['chunk']['chunk_id']
+                        if chunk_id not in seen_chunks:
+                            all_results.append(result)
+                            seen_chunks.add(chunk_id)
+                position += len(query_variants)
+                
+                context = self._build_context(all_results, k)
+                context['candidates_examined'] = k * len(query_variants)
+                context['variants_searched'] = len(query_variants)
+                contexts.append(context)
+        
+        return contexts
+    
+    async def aretrieve_context(self, query: str, executor=None, **kwargs) -> Dict:
+        """
+        Versi async dari retrieve_context: encode + search (CPU) dijalankan di executor
+        agar event loop tetap bebas melayani request lain
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(self.retrieve_context, query, **kwargs))
+    
+    def _build_context(self, all_results: List[Dict], k: int) -> Dict:
+        """
+        Ambil top k hasil dan susun menjadi context dalam batas max_context_length
+        """
         # Sort by score dan ambil top k
         all_results.sort(key=lambda x: x['score'], reverse=True)
         top_results = all_results[:k]
@@ -97,15 +252,19 @@ class RAGRetriever:
             source_info = f"[Sumber: {chunk['source_title']}]"
             content = f"{source_info}\n{chunk['content']}"
             
+            # Chunk hasil dedup mewakili beberapa artikel sumber
+            sources = [source['source_title'] for source in chunk.get('sources') or [chunk]]
             context_parts.append({
                 'content': content,
                 'score': score,
                 'source': chunk['source_title'],
-                'chunk_id': chunk['chunk_id']
+                'sources': sources,
+                'chunk_id': chunk['chunk_id'],
+                'index': result['index']
             })
             
             total_length += len(content)
-            used_sources.add(chunk['source_title'])
+            used_sources.update(sources)
         
         # Gabungkan semua context
         full_context = "\n\n---\n\n".join([part['content'] for part in context_parts])
@@ -119,13 +278,21 @@ class RAGRetriever:
             'avg_score': sum([part['score'] for part in context_parts]) / len(context_parts) if context_parts else 0
         }
     
-    def format_prompt(self, query: str, context_data: Dict) -> str:
+    def format_prompt(self, query: str, context_data: Dict, history: List[Dict] = None) -> str:
         """
         Format prompt untuk LLM dengan context yang telah di-retrieve
+
+        history (opsional): turn sebelumnya [{'question', 'response'}] untuk pertanyaan lanjutan
         """
         context = context_data['context']
         sources = context_data['used_sources']
         
+        conversation = ""
+        if history:
+            exchanges = "\n".join(f"Pengguna: {turn['question']}\nAsisten: {turn['response'][:300]}"
+                                  for turn in history)
+            conversation = f"\nPERCAKAPAN SEBELUMNYA:\n{exchanges}\n"
+        
         # System instruction
         system_prompt = """Anda adalah asisten AI yang ahli dalam sejarah kemerdekaan Indonesia. 
 Tugas Anda adalah menjawab pertanyaan berdasarkan konteks sejarah yang diberikan dengan akurat dan informatif.
@@ -144,7 +311,7 @@ KONTEKS SEJARAH:
 {context}
 
 SUMBER REFERENSI: {', '.join(sources)}
-
+{conversation}
 PERTANYAAN: {query}
 
 JAWABAN: Berdasarkan informasi sejarah di atas,"""
@@ -0,0 +1,406 @@
+"""
+Sharded vector store: chunks dipartisi ke beberapa worker process (atau node lokal via RPC)
+dan search dijalankan paralel dengan scatter-gather
+"""
+import argparse
+import hashlib
+import heapq
+import itertools
+import multiprocessing as mp
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from .metadata_filter import FilterCache, build_metadata_index, filter_key, resolve_filters
+from .metrics import NULL_TRACE
+
+
+def _build_shard_index(embeddings: np.ndarray) -> faiss.Index:
+    # Satu thread per shard: paralelisme datang dari jumlah shard
+    faiss.omp_set_num_threads(1)
+    index = faiss.IndexFlatIP(embeddings.shape[1])
+    index.add(np.ascontiguousarray(embeddings, dtype=np.float32))
+    return index
+
+
+def _shard_loop(conn, embeddings: np.ndarray, global_ids: np.ndarray, index: faiss.Index = None):
+    """
+    Loop worker shard: terima query embedding, balas top-k (score, global id)
+    """
+    if index is None:
+        index = _build_shard_index(embeddings)
+    # Global id dikirim sekali agar client bisa menerjemahkan filter ke id lokal shard ini
+    conn.send(('ready', global_ids))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+
+        if message[0] == 'stop':
+            break
+
+        _, request_id, query_embedding, k, allowed_local = message
+        if allowed_local is None:
+            scores, local_ids = index.search(query_embedding, min(k, index.ntotal))
+        else:
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(allowed_local))
+            scores, local_ids = index.search(query_embedding, min(k, index.ntotal), params=params)
+
+        valid = local_ids[0] >= 0
+        conn.send((request_id, scores[0][valid], global_ids[local_ids[0][valid]]))
+
+    conn.close()
+
+
+def serve_shard(address: Tuple[str, int], authkey: bytes, embeddings: np.ndarray, global_ids: np.ndarray):
+    """
+    Jalankan satu shard sebagai node RPC (multiprocessing.connection) di address tertentu.
+    Node terus menerima koneksi (satu thread per client, index dibangun sekali) sehingga client
+    yang restart bisa connect ulang; 'stop' dari client hanya menutup koneksi client tersebut.
+    Node berhenti dengan Ctrl+C.
+    """
+    index = _build_shard_index(embeddings)
+    with Listener(address, authkey=authkey) as listener:
+        print(f"🧩 Shard node listening on {address[0]}:{address[1]} ({len(global_ids)} vectors)")
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError) as e:
+                # Handshake gagal (mis. authkey salah): tunggu client berikutnya
+                print(f"⚠️ Shard connection rejected: {e}")
+                continue
+            threading.Thread(target=_serve_connection, args=(conn, embeddings, global_ids, index),
+                             daemon=True).start()
+
+
+def _serve_connection(conn, embeddings: np.ndarray, global_ids: np.ndarray, index: faiss.Index):
+    with conn:
+        _shard_loop(conn, embeddings, global_ids, index)
+
+
+class ShardedVectorStore:
+    """
+    Drop-in pengganti VectorStore untuk search: encode di proses utama,
+    FAISS search paralel di shard, hasil per shard digabung dengan heap
+    """
+    def __init__(self, encoder, num_shards: int = 4, partition: str = "source",
+                 shard_timeout: float = 0.5, startup_timeout: float = 60.0):
+        # encoder: VectorStore yang dipakai untuk encode query (model SentenceTransformer)
+        self.encoder = encoder
+        self.num_shards = num_shards
+        self.partition = partition
+        self.shard_timeout = shard_timeout
+        # Batas waktu semua shard mengirim 'ready' saat build/connect
+        self.startup_timeout = startup_timeout
+        self.chunks = []
+        self._shards: List[Dict] = []
+        # Filter metadata di-resolve di sini (index metadata + cache) menjadi id lokal per shard
+        self.filterable_fields = ('source_title', 'source_type')
+        self._metadata_index = None
+        self._filter_cache = FilterCache()
+        # Balasan shard dirutekan ke request yang menunggu lewat request_id (tanpa lock global)
+        self._request_ids = itertools.count(1)
+
+    def _assign_shard(self, chunk: Dict, idx: int) -> int:
+        if self.partition == "source":
+            key = chunk['source_title']
+        else:
+            key = chunk.get('chunk_id', str(idx))
+        digest = hashlib.md5(key.encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'little') % self.num_shards
+
+    def build(self, chunks: List[Dict], embeddings: np.ndarray):
+        """
+        Partisi chunks ke shard dan jalankan satu worker process per shard
+        """
+        self.close()
+        self.chunks = chunks
+        self._reset_filters()
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        assignments = np.array([self._assign_shard(c, i) for i, c in enumerate(chunks)])
+        ctx = mp.get_context('spawn')
+
+        for shard_id in range(self.num_shards):
+            global_ids = np.nonzero(assignments == shard_id)[0].astype(np.int64)
+            if len(global_ids) == 0:
+                continue
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_shard_loop, args=(child_conn, embeddings[global_ids], global_ids),
+                                  daemon=True)
+            process.start()
+            # Ujung child hanya milik worker: jika worker mati, pembaca di sini langsung mendapat EOF
+            child_conn.close()
+            self._shards.append({'id': shard_id, 'conn': parent_conn, 'process': process, 'size': len(global_ids)})
+
+        self._wait_ready()
+        print(f"✅ Sharded store ready: {len(self._shards)} shards, "
+              f"sizes {[s['size'] for s in self._shards]} (partition={self.partition})")
+
+    def connect(self, chunks: List[Dict], addresses: List[Tuple[str, int]], authkey: bytes):
+        """
+        Hubungkan ke shard node yang dijalankan dengan serve_shard (RPC lokal/jaringan)
+        """
+        self.close()
+        self.chunks = chunks
+        self._reset_filters()
+        for shard_id, address in enumerate(addresses):
+            conn = Client(address, authkey=authkey)
+            self._shards.append({'id': shard_id, 'conn': conn, 'process': None, 'size': None})
+        self._wait_ready()
+
+    def _wait_ready(self):
+        """
+        Tunggu pesan 'ready' dari semua shard dalam startup_timeout; shard yang hang atau mati
+        membatalkan build/connect (semua shard ditutup) dengan error yang menyebut shard-nya
+        """
+        deadline = time.perf_counter() + self.startup_timeout
+        for shard in self._shards:
+            try:
+                if not shard['conn'].poll(max(deadline - time.perf_counter(), 0)):
+                    raise TimeoutError(f"shard {shard['id']} tidak siap dalam {self.startup_timeout}s")
+                status, global_ids = shard['conn'].recv()
+            except TimeoutError:
+                self.close()
+                raise
+            except (EOFError, OSError) as e:
+                self.close()
+                raise RuntimeError(f"shard {shard['id']} mati sebelum siap: {e!r}") from e
+            shard['global_ids'] = global_ids
+            shard['size'] = len(global_ids)
+            # Pesan ke shard dikirim dari banyak thread; satu thread pembaca per shard
+            # meneruskan setiap balasan ke Future milik request yang sesuai
+            shard['send_lock'] = threading.Lock()
+            shard['pending'] = {}
+            shard['pending_lock'] = threading.Lock()
+            shard['reader'] = threading.Thread(target=self._read_replies, args=(shard,), daemon=True,
+                                               name=f"shard-{shard['id']}-reader")
+            shard['reader'].start()
+
+    def _read_replies(self, shard: Dict):
+        conn = shard['conn']
+        while True:
+            try:
+                response_id, scores, ids = conn.recv()
+            except (EOFError, OSError):
+                break
+            with shard['pending_lock']:
+                future = shard['pending'].pop(response_id, None)
+            # Balasan terlambat (request-nya sudah timeout) dibuang
+            if future is not None:
+                future.set_result((scores, ids))
+
+        # Shard mati/ditutup: request yang masih menunggu langsung dianggap hilang
+        with shard['pending_lock']:
+            pending, shard['pending'] = shard['pending'], {}
+        for future in pending.values():
+            future.set_result(None)
+
+    @property
+    def ntotal(self) -> int:
+        return sum(s['size'] or 0 for s in self._shards)
+
+    @property
+    def model(self):
+        return self.encoder.model
+
+    def encode_query(self, query: str, trace=NULL_TRACE) -> np.ndarray:
+        return self.encoder.encode_query(query, trace=trace)
+
+    def encode_queries(self, queries: List[str], batch_size: int = 256, trace=NULL_TRACE) -> np.ndarray:
+        return self.encoder.encode_queries(queries, batch_size=batch_size, trace=trace)
+
+    def clear_query_cache(self):
+        self.encoder.clear_query_cache()
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.1, filters: Dict = None,
+               trace=NULL_TRACE) -> List[Dict]:
+        query_embedding = self.encode_query(query, trace=trace)
+        return self.search_by_embedding(query_embedding, k=k, min_score=min_score, filters=filters, trace=trace)
+
+    def search_by_embedding(self, query_embedding: np.ndarray, k: int = 5, min_score: float = 0.1,
+                            filters: Dict = None, trace=NULL_TRACE) -> List[Dict]:
+        """
+        Scatter query ke semua shard, gather dalam batas shard_timeout, merge top-k dengan heap.
+        Shard yang lambat/mati dilewati (hasil parsial) dan dicatat di trace.
+        """
+        if not self._shards:
+            print("❌ Sharded store has no shards!")
+            return []
+
+        allowed = self._resolve_filters(filters) if filters else None
+
+        with trace.span('search'):
+            request_id = next(self._request_ids)
+            pending = []
+            for position, shard in enumerate(self._shards):
+                allowed_local = allowed[position] if allowed is not None else None
+                # Shard tanpa chunk yang lolos filter tidak perlu ditanya
+                if allowed_local is not None and len(allowed_local) == 0:
+                    continue
+                message = ('search', request_id, query_embedding, k, allowed_local)
+                future = Future()
+                with shard['pending_lock']:
+                    shard['pending'][request_id] = future
+                try:
+                    with shard['send_lock']:
+                        shard['conn'].send(message)
+                    pending.append((shard, future))
+                except (OSError, BrokenPipeError):
+                    self._discard(shard, request_id)
+                    trace.incr('shards_missing')
+
+            candidates = []
+            deadline = time.perf_counter() + self.shard_timeout
+            for shard, future in pending:
+                try:
+                    response = future.result(timeout=max(deadline - time.perf_counter(), 0))
+                except FutureTimeout:
+                    self._discard(shard, request_id)
+                    response = None
+                if response is None:
+                    trace.incr('shards_missing')
+                    continue
+                scores, ids = response
+                candidates.extend(zip(scores.tolist(), ids.tolist()))
+
+        results = []
+        for rank, (score, idx) in enumerate(heapq.nlargest(k, candidates), 1):
+            if score >= min_score:
+                results.append({
+                    'chunk': self.chunks[idx],
+                    'score': float(score),
+                    'rank': rank,
+                    'index': int(idx)
+                })
+        return results
+
+    def search_batch_by_embedding(self, query_embeddings: np.ndarray, k: int = 5, min_score: float = 0.1,
+                                  filters: Dict = None, trace=NULL_TRACE) -> List[List[Dict]]:
+        # Protokol shard melayani satu query per pesan
+        return [self.search_by_embedding(query_embeddings[i:i + 1], k=k, min_score=min_score,
+                                         filters=filters, trace=trace)
+                for i in range(len(query_embeddings))]
+
+    def range_search(self, query: str, min_score: float = 0.2, max_results: int = 20,
+                     filters: Dict = None, trace=NULL_TRACE) -> Tuple[List[Dict], int]:
+        """
+        Shard hanya melayani top-k, jadi range search diaproksimasi dengan k=max_results + threshold.
+        Jumlah yang di-scan tetap semua vector (yang lolos filter) di semua shard.
+        """
+        query_embedding = self.encode_query(query, trace=trace)
+        results = self.search_by_embedding(query_embedding, k=max_results, min_score=min_score,
+                                           filters=filters, trace=trace)
+        num_scanned = sum(len(ids) for ids in self._resolve_filters(filters)) if filters else len(self.chunks)
+        return results, num_scanned
+
+    def _discard(self, shard: Dict, request_id: int):
+        with shard['pending_lock']:
+            shard['pending'].pop(request_id, None)
+
+    def _reset_filters(self):
+        self._metadata_index = None
+        self._filter_cache.clear()
+
+    def _resolve_filters(self, filters: Dict) -> List[np.ndarray]:
+        """
+        Resolve filters menjadi id lokal yang diizinkan untuk setiap shard (urutan self._shards),
+        dengan cache sehingga filter yang sering dipakai tidak di-resolve ulang per query
+        """
+        key = filter_key(filters)
+        allowed = self._filter_cache.get(key)
+        if allowed is None:
+            if self._metadata_index is None:
+                self._metadata_index = build_metadata_index(self.chunks, self.filterable_fields)
+            mask = np.zeros(len(self.chunks), dtype=bool)
+            mask[resolve_filters(self._metadata_index, filters, len(self.chunks))] = True
+            allowed = [np.nonzero(mask[shard['global_ids']])[0].astype(np.int64) for shard in self._shards]
+            self._filter_cache.put(key, allowed, sum(ids.nbytes for ids in allowed))
+        return allowed
+
+    def close(self):
+        for shard in self._shards:
+            try:
+                with shard.get('send_lock') or threading.Lock():
+                    shard['conn'].send(('stop',))
+            except (OSError, BrokenPipeError):
+                pass
+            if shard['process'] is not None:
+                shard['process'].join(timeout=1)
+                if shard['process'].is_alive():
+                    shard['process'].terminate()
+            # Shard menutup koneksinya setelah 'stop' sehingga thread pembaca berhenti (EOF)
+            if shard.get('reader') is not None:
+                shard['reader'].join(timeout=1)
+            shard['conn'].close()
+        self._shards = []
+
+
+def benchmark_scaling(num_vectors: int = 200000, dimension: int = 384, shard_counts=(1, 2, 4, 8),
+                      num_queries: int = 200, k: int = 5, concurrency: int = 16) -> List[Dict]:
+    """
+    Ukur search untuk berbagai jumlah shard dengan data sintetis: latency query tunggal
+    (sequential) dan throughput (query/s) dengan `concurrency` client thread bersamaan
+    """
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((num_vectors, dimension)).astype(np.float32)
+    faiss.normalize_L2(embeddings)
+    chunks = [{'chunk_id': f"chunk_{i}", 'source_title': f"article_{i % 1000}"} for i in range(num_vectors)]
+    queries = embeddings[rng.integers(0, num_vectors, num_queries)]
+
+    report = []
+    for num_shards in shard_counts:
+        store = ShardedVectorStore(encoder=None, num_shards=num_shards, partition="hash", shard_timeout=5.0)
+        store.build(chunks, embeddings)
+
+        def search(q):
+            return store.search_by_embedding(q[None, :], k=k, min_score=-1.0)
+
+        start = time.perf_counter()
+        for q in queries:
+            search(q)
+        sequential = time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start = time.perf_counter()
+            list(executor.map(search, queries))
+            concurrent = time.perf_counter() - start
+        store.close()
+
+        report.append({'shards': num_shards, 'mean_ms': sequential / num_queries * 1000.0,
+                       'qps_sequential': num_queries / sequential,
+                       'concurrency': concurrency, 'qps': num_queries / concurrent})
+        print(f"  shards={num_shards}: {report[-1]['mean_ms']:.2f} ms/query, "
+              f"{report[-1]['qps']:.1f} q/s with {concurrency} concurrent clients")
+
+    base = report[0]['qps']
+    for row in report:
+        row['speedup'] = row['qps'] / base
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scaling sharded vector store")
+    parser.add_argument('--vectors', type=int, default=200000)
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--shards', default="1,2,4,8")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16, help="Jumlah client thread bersamaan")
+    args = parser.parse_args()
+
+    print("🚀 Sharded search scaling benchmark...")
+    report = benchmark_scaling(args.vectors, args.dimension, [int(s) for s in args.shards.split(',')],
+                               num_queries=args.queries, concurrency=args.concurrency)
+    for row in report:
+        print(f"shards={row['shards']}: throughput speedup {row['speedup']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
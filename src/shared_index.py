@@ -0,0 +1,210 @@
+"""
+Index read-only berbasis mmap agar banyak worker process berbagi satu salinan fisik
+(embeddings dan teks chunk) lewat page cache, plus alat ukur RSS/startup per worker
+"""
+import argparse
+import json
+import mmap
+import multiprocessing as mp
+import os
+import queue
+import time
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+# Jumlah baris embeddings per blok perkalian di MmapFlatIndex.search_subset
+SEARCH_BLOCK = 16384
+
+
+class MmapFlatIndex:
+    """
+    Exact inner-product search di atas matrix embeddings yang di-mmap (setara IndexFlatIP)
+    """
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+        self.ntotal = embeddings.shape[0]
+        self.d = embeddings.shape[1]
+
+    def search(self, queries: np.ndarray, k: int):
+        return self.search_subset(queries, k, None)
+
+    def search_subset(self, queries: np.ndarray, k: int, allowed_ids: np.ndarray = None):
+        """
+        Top-k per query; allowed_ids (opsional) membatasi ke subset baris. Score dihitung per blok
+        SEARCH_BLOCK baris dan digabung dengan top-k berjalan, sehingga subset besar tidak pernah
+        disalin utuh dari mmap
+        """
+        n = self.ntotal if allowed_ids is None else len(allowed_ids)
+        k = min(k, n)
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        if k == 0:
+            return out_scores, out_ids
+
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        for start in range(0, n, SEARCH_BLOCK):
+            if allowed_ids is None:
+                ids = np.arange(start, min(start + SEARCH_BLOCK, n), dtype=np.int64)
+                block = self.embeddings[start:start + SEARCH_BLOCK]
+            else:
+                ids = np.asarray(allowed_ids[start:start + SEARCH_BLOCK], dtype=np.int64)
+                block = self.embeddings[ids]
+            scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+            candidates = np.concatenate([best_ids, np.broadcast_to(ids, (len(queries), len(ids)))], axis=1)
+            keep = min(k, scores.shape[1])
+            top = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_ids = np.take_along_axis(candidates, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        out_scores[:] = np.take_along_axis(best_scores, order, axis=1)
+        out_ids[:] = np.take_along_axis(best_ids, order, axis=1)
+        return out_scores, out_ids
+
+    def range_search(self, queries: np.ndarray, threshold: float):
+        """
+        Semua hasil dengan score >= threshold, format sama dengan faiss (lims, D, I)
+        """
+        lims = [0]
+        all_scores, all_ids = [], []
+        for query in queries:
+            scores = self.embeddings @ query
+            ids = np.nonzero(scores >= threshold)[0]
+            all_scores.append(scores[ids].astype(np.float32))
+            all_ids.append(ids.astype(np.int64))
+            lims.append(lims[-1] + len(ids))
+        return np.array(lims, dtype=np.int64), np.concatenate(all_scores), np.concatenate(all_ids)
+
+    def add(self, vectors: np.ndarray):
+        raise RuntimeError("MmapFlatIndex read-only: rebuild dan save ulang index untuk menambah dokumen")
+
+
+class MmapChunks:
+    """
+    List chunk read-only: teks chunk dibaca dari file JSONL yang di-mmap, di-decode saat diakses
+    """
+    def __init__(self, jsonl_path: str, offsets_path: str):
+        self._file = open(jsonl_path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = np.load(offsets_path, mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx) -> Dict:
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        start, end = int(self._offsets[idx]), int(self._offsets[idx + 1])
+        return json.loads(self._mmap[start:end])
+
+    def __iter__(self) -> Iterator[Dict]:
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def append(self, chunk: Dict):
+        raise RuntimeError("MmapChunks read-only")
+
+
+def write_chunks_jsonl(chunks: List[Dict], jsonl_path: str, offsets_path: str):
+    """
+    Tulis chunks sebagai JSONL + array byte offset untuk random access via mmap
+    """
+    offsets = [0]
+    with open(jsonl_path, 'wb') as f:
+        for chunk in chunks:
+            line = (json.dumps(chunk, ensure_ascii=False) + "\n").encode('utf-8')
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    with open(offsets_path, 'wb') as f:
+        np.save(f, np.array(offsets, dtype=np.int64))
+
+
+def read_memory_stats() -> Dict[str, float]:
+    """
+    RSS (total/anon/file) dari /proc/self/status dan PSS dari smaps_rollup, dalam MB
+    """
+    stats = {}
+    fields = {'VmRSS': 'rss_mb', 'RssAnon': 'rss_anon_mb', 'RssFile': 'rss_file_mb'}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key = line.split(':')[0]
+            if key in fields:
+                stats[fields[key]] = int(line.split()[1]) / 1024.0
+    if os.path.exists('/proc/self/smaps_rollup'):
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    stats['pss_mb'] = int(line.split()[1]) / 1024.0
+    return stats
+
+
+def _worker(base_path: str, use_mmap: bool, started_at: float, results, release):
+    from .vector_store import VectorStore
+
+    vector_store = VectorStore()
+    vector_store.load(base_path, mmap=use_mmap)
+    vector_store.search("Siapa yang memproklamasikan kemerdekaan Indonesia?", k=3)
+    ready_seconds = time.perf_counter() - started_at
+
+    stats = read_memory_stats()
+    stats['startup_seconds'] = ready_seconds
+    stats['pid'] = os.getpid()
+    results.put(stats)
+
+    # Tetap hidup sampai semua worker selesai diukur agar PSS mencerminkan berbagi halaman
+    release.wait()
+
+
+def measure_workers(base_path: str, num_workers: int, use_mmap: bool) -> List[Dict]:
+    """
+    Fork N worker yang masing-masing load vector store lalu laporkan RSS/PSS dan waktu startup
+    """
+    ctx = mp.get_context('fork')
+    results = ctx.Queue()
+    release = ctx.Event()
+
+    processes = []
+    for _ in range(num_workers):
+        process = ctx.Process(target=_worker, args=(base_path, use_mmap, time.perf_counter(), results, release))
+        process.start()
+        processes.append(process)
+
+    reports = []
+    while len(reports) < num_workers:
+        try:
+            reports.append(results.get(timeout=1.0))
+        except queue.Empty:
+            # Sebelum release worker tidak pernah exit, jadi exitcode terisi = crash (mis. OOM)
+            crashed = [p.exitcode for p in processes if p.exitcode is not None]
+            if len(reports) + len(crashed) >= num_workers:
+                print(f"❌ {len(crashed)} worker gagal start (exit codes: {crashed})")
+                break
+    release.set()
+    for process in processes:
+        process.join()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ukur memori dan startup worker yang berbagi index")
+    parser.add_argument('--base', default="data/vector_db/vector_store")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    for use_mmap in (False, True):
+        mode = "mmap" if use_mmap else "copy"
+        reports = measure_workers(args.base, args.workers, use_mmap)
+        print(f"\n📊 {args.workers} workers, load mode = {mode}")
+        for r in reports:
+            print(f"  pid {r['pid']}: startup {r['startup_seconds']:.2f}s | RSS {r['rss_mb']:.0f} MB "
+                  f"(anon {r.get('rss_anon_mb', 0):.0f}, file {r.get('rss_file_mb', 0):.0f}) | "
+                  f"PSS {r.get('pss_mb', 0):.0f} MB")
+        total_pss = sum(r.get('pss_mb', 0) for r in reports)
+        print(f"  Total PSS (memori fisik sebenarnya): {total_pss:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
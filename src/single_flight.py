@@ -0,0 +1,224 @@
+"""
+Single-flight: request identik yang sedang berjalan bersamaan digabung menjadi satu panggilan upstream
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, Tuple
+
+
+class _Call:
+    """
+    Satu panggilan upstream yang sedang berjalan, beserta hasil/chunk stream-nya
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Deadline absolut (time.monotonic) leader; None = tanpa batas
+        self.deadline = None
+        # Untuk stream: semua chunk yang sudah diterima (follower yang terlambat ikut replay)
+        self.chunks = []
+        self.cond = threading.Condition()
+
+
+class SingleFlight:
+    """
+    Caller pertama untuk suatu key (leader) menjalankan fungsi upstream; caller lain dengan key
+    yang sama selama panggilan masih berjalan (follower) menunggu dan memakai hasil yang sama.
+    Statistik per key mencatat berapa panggilan upstream yang dihemat.
+
+    Kegagalan leader (termasuk timeout karena deadline leader sendiri) hanya diteruskan ke follower
+    yang deadline-nya juga sudah habis atau tidak lebih lama dari deadline leader; follower lain
+    mengulang sebagai leader baru selama waktunya masih ada.
+    """
+    def __init__(self, max_tracked_keys: int = 1000):
+        self.max_tracked_keys = max_tracked_keys
+        self._calls: Dict[str, _Call] = {}
+        # Versi async: (event loop, key) -> (task hasil leader, deadline leader)
+        self._async_calls: Dict[Tuple[int, str], Tuple[asyncio.Task, float]] = {}
+        self._lock = threading.Lock()
+        self._key_stats: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self.requests = 0
+        self.upstream_calls = 0
+        self.retries = 0
+
+    def _join(self, key: str, deadline: float = None, retry: bool = False) -> Tuple[_Call, bool]:
+        """
+        Return (call, is_leader) dan catat statistik
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                call.deadline = deadline
+                self._calls[key] = call
+            self._record(key, is_leader, retry)
+        return call, is_leader
+
+    def _record(self, key: str, is_leader: bool, retry: bool = False):
+        # Dipanggil dengan self._lock dipegang
+        stats = self._key_stats.pop(key, None) or {'requests': 0, 'upstream_calls': 0, 'saved': 0}
+        if retry:
+            # Follower yang mengulang setelah leader gagal: bukan request baru, dan jika menjadi
+            # leader maka panggilannya tidak lagi terhitung dihemat
+            self.retries += 1
+            if is_leader:
+                self.upstream_calls += 1
+                stats['upstream_calls'] += 1
+                stats['saved'] -= 1
+        else:
+            self.requests += 1
+            if is_leader:
+                self.upstream_calls += 1
+            stats['requests'] += 1
+            stats['upstream_calls' if is_leader else 'saved'] += 1
+        self._key_stats[key] = stats
+        if len(self._key_stats) > self.max_tracked_keys:
+            self._key_stats.popitem(last=False)
+
+    def _forget(self, key: str, call: _Call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    @staticmethod
+    def _share_failure(deadline: float, leader_deadline: float) -> bool:
+        """
+        Apakah follower ikut menerima kegagalan leader: ya jika deadline follower sudah habis atau
+        tidak lebih lama dari deadline leader (leader tidak gagal karena budget yang lebih pendek)
+        """
+        if deadline is None:
+            return leader_deadline is None
+        return time.monotonic() >= deadline or (leader_deadline is not None and deadline <= leader_deadline)
+
+    def do(self, key: str, fn: Callable[[], object], timeout: float = None) -> Tuple[object, bool]:
+        """
+        Jalankan fn() sekali per key yang sedang in-flight. Return (hasil, shared);
+        shared=True berarti hasil diambil dari panggilan caller lain.
+        timeout = deadline caller dalam detik: membatasi berapa lama follower menunggu leader
+        (TimeoutError jika lewat) dan menentukan apakah follower mengulang saat leader gagal.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        call, is_leader = self._join(key, deadline)
+        while not is_leader:
+            remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            if not call.done.wait(remaining):
+                raise TimeoutError("menunggu hasil request identik melewati batas waktu")
+            if call.error is None:
+                return call.result, True
+            if self._share_failure(deadline, call.deadline):
+                raise call.error
+            call, is_leader = self._join(key, deadline, retry=True)
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # Lepas key sebelum membangunkan follower: request berikutnya memicu panggilan baru
+            self._forget(key, call)
+            call.done.set()
+        return call.result, False
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable], timeout: float = None) -> Tuple[object, bool]:
+        """
+        Versi async dari do(): panggilan upstream berjalan sebagai task tersendiri dan semua
+        caller di event loop yang sama meng-await task tersebut. timeout seperti pada do().
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        retry = False
+        while True:
+            with self._lock:
+                entry = self._async_calls.get(loop_key)
+                is_leader = entry is None
+                if is_leader:
+                    task = loop.create_task(fn())
+                    entry = (task, deadline)
+                    self._async_calls[loop_key] = entry
+                    task.add_done_callback(lambda done: self._forget_async(loop_key, done))
+                self._record(key, is_leader, retry)
+            task, leader_deadline = entry
+
+            remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            try:
+                # shield: caller yang di-cancel/timeout tidak ikut membatalkan panggilan untuk caller lain
+                return await asyncio.wait_for(asyncio.shield(task), remaining), not is_leader
+            except Exception:
+                if is_leader or not task.done() or self._share_failure(deadline, leader_deadline):
+                    raise
+            retry = True
+
+    def _forget_async(self, loop_key: Tuple[int, str], task: asyncio.Future):
+        if not task.cancelled():
+            # Tandai exception sudah diambil: semua caller bisa saja sudah timeout lebih dulu
+            task.exception()
+        with self._lock:
+            entry = self._async_calls.get(loop_key)
+            if entry is not None and entry[0] is task:
+                del self._async_calls[loop_key]
+
+    def stream(self, key: str, fn: Callable[[], Iterable]) -> Tuple[Iterator, bool]:
+        """
+        Versi streaming: satu iterator upstream, chunk-nya di-fan-out ke semua caller.
+        Upstream dikonsumsi di thread terpisah sehingga caller yang berhenti membaca
+        tidak menahan caller lain. Return (iterator, shared).
+        """
+        call, is_leader = self._join(key)
+        if is_leader:
+            threading.Thread(target=self._pump, args=(key, call, fn), daemon=True).start()
+        return self._subscribe(call), not is_leader
+
+    def _pump(self, key: str, call: _Call, fn: Callable[[], Iterable]):
+        try:
+            for chunk in fn():
+                with call.cond:
+                    call.chunks.append(chunk)
+                    call.cond.notify_all()
+        except Exception as e:
+            call.error = e
+        finally:
+            self._forget(key, call)
+            with call.cond:
+                call.done.set()
+                call.cond.notify_all()
+
+    def _subscribe(self, call: _Call) -> Iterator:
+        position = 0
+        while True:
+            with call.cond:
+                while position >= len(call.chunks) and not call.done.is_set():
+                    call.cond.wait()
+                pending = call.chunks[position:]
+                finished = call.done.is_set()
+            for chunk in pending:
+                yield chunk
+            position += len(pending)
+            if finished and position >= len(call.chunks):
+                if call.error is not None:
+                    raise call.error
+                return
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._async_calls)
+
+    def stats(self, top: int = 20) -> Dict:
+        """
+        Total dan per key (key dengan penghematan terbanyak) jumlah panggilan upstream yang dihemat
+        """
+        with self._lock:
+            keys = sorted(self._key_stats.items(), key=lambda item: item[1]['saved'], reverse=True)[:top]
+            return {
+                'requests': self.requests,
+                'upstream_calls': self.upstream_calls,
+                'saved': self.requests - self.upstream_calls,
+                'retries': self.retries,
+                'in_flight': len(self._calls) + len(self._async_calls),
+                'keys': [dict(stats, key=key) for key, stats in keys]
+            }
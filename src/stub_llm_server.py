@@ -0,0 +1,176 @@
+"""
+Server LLM tiruan (OpenAI-compatible) untuk load test dan benchmark tanpa memanggil Groq
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    # Backlog default (5) terlalu kecil untuk ratusan koneksi konkuren dari load test
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class StubLLMServer:
+    """
+    Endpoint POST /v1/chat/completions (juga "stream": true) dengan latency dan error rate yang bisa diatur
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.5,
+                 jitter: float = 0.1, error_rate: float = 0.0, seed: int = None,
+                 token_delay: float = 0.01, tail_rate: float = 0.0, tail_latency: float = 2.0):
+        self.latency = latency
+        # Sebagian kecil request (tail_rate) sangat lambat, untuk menguji hedging
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        # Jeda antar event pada mode streaming
+        self.token_delay = token_delay
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _StubHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _next_delay_and_error(self):
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            if self._random.random() < self.tail_rate:
+                delay = self.tail_latency
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, failed
+
+    def _make_handler(self):
+        stub = self
+
+        class StubHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+
+                delay, failed = stub._next_delay_and_error()
+                time.sleep(delay)
+
+                if failed:
+                    self._send_json(500, {'error': {'message': 'stub upstream error'}})
+                    return
+
+                prompt = " ".join(m.get('content', '') for m in payload.get('messages', []))
+                prompt_tokens = max(1, len(prompt) // 4)
+                content = "Jawaban stub untuk pertanyaan sejarah."
+                if payload.get('stream'):
+                    self._send_stream(payload, content, prompt_tokens)
+                    return
+                self._send_json(200, {
+                    'id': f"stub-{stub.requests}",
+                    'object': 'chat.completion',
+                    'model': payload.get('model', 'stub'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': content},
+                        'finish_reason': 'stop'
+                    }],
+                    'usage': {
+                        'prompt_tokens': prompt_tokens,
+                        'completion_tokens': 8,
+                        'total_tokens': prompt_tokens + 8
+                    }
+                })
+
+            def _send_json(self, status: int, body: dict):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client sudah memutus koneksi (mis. request yang kalah hedge dibatalkan)
+                    pass
+
+            def _send_stream(self, payload: dict, content: str, prompt_tokens: int):
+                """
+                Server-sent events ala OpenAI: satu event per kata, usage di event terakhir
+                """
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+
+                words = content.split(" ")
+                for i, word in enumerate(words):
+                    event = {
+                        'id': f"stub-{stub.requests}",
+                        'object': 'chat.completion.chunk',
+                        'model': payload.get('model', 'stub'),
+                        'choices': [{'index': 0, 'delta': {'content': word if i == 0 else " " + word}}]
+                    }
+                    if i == len(words) - 1:
+                        event['usage'] = {
+                            'prompt_tokens': prompt_tokens,
+                            'completion_tokens': len(words),
+                            'total_tokens': prompt_tokens + len(words)
+                        }
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+                    time.sleep(stub.token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return StubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub LLM server OpenAI-compatible")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--tail-rate', type=float, default=0.0)
+    parser.add_argument('--tail-latency', type=float, default=2.0)
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                           tail_rate=args.tail_rate, tail_latency=args.tail_latency)
+    print(f"🧪 Stub LLM server aktif di {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
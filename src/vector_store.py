@@ -2,58 +2,178 @@
 Vector store untuk menyimpan embeddings dan melakukan similarity search
 """
 import os
+import sys
 import json
+import time
+import threading
 import numpy as np
-from typing import List, Dict, Tuple
-from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
 import faiss
 import pickle
 from dotenv import load_dotenv
 
+from .dedup import deduplicate_chunks, merge_sources, print_report
+from .encoder import load_encoder
+from .metadata_filter import FilterCache, build_metadata_index, filter_key, resolve_filters
+from .metrics import NULL_TRACE
+from .shared_index import MmapChunks, MmapFlatIndex, write_chunks_jsonl
+
 # Load environment variables
 load_dotenv()
 
 class VectorStore:
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", model=None,
+                 encoder_backend: str = None):
         self.model_name = model_name
-        self.model = SentenceTransformer(model_name)
+        # Backend encoder: float32 (default) atau int8 untuk serving CPU-only (lihat src/encoder.py)
+        self.encoder_backend = encoder_backend or os.getenv('ENCODER_BACKEND', 'float32')
+        # model bisa dibagi antar instance (mis. saat hot reload index)
+        self.model = model if model is not None else load_encoder(model_name, self.encoder_backend)
         self.index = None
         self.chunks = []
         self.embeddings = None
         self.vector_db_path = os.getenv('VECTOR_DB_PATH', './data/vector_db')
+        self.read_only = False
+        self.version = None
+        
+        # Cache LRU untuk embedding query (query variants sering berulang)
+        self.query_cache_size = 1024
+        self._query_cache = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        
+        # Index metadata untuk pre-filtering search (dibangun lazy)
+        self.filterable_fields = ('source_title', 'source_type')
+        self._metadata_index = None
+        # Cache (allowed_ids, blok embeddings subset) per filter, dibatasi total byte
+        self._filter_cache = FilterCache(int(float(os.getenv('FILTER_CACHE_MB', '64')) * 1024 * 1024))
+        
+        # Routing artikel (coarse-to-fine); ROUTE_M=0 berarti flat search.
+        # Router dibangun di build_index/load (dan setelah add_document) sebagai satu snapshot
+        # yang diganti atomik; query membaca snapshot tanpa lock
+        self.route_m = int(os.getenv('ROUTE_M', '0')) or None
+        self._routing = None
+        self._router_lock = threading.Lock()
+        
+        # Dedup near-duplicate saat build index (cosine >= DEDUP_THRESHOLD); 0 berarti nonaktif
+        self.dedup_threshold = float(os.getenv('DEDUP_THRESHOLD', '0')) or None
+        self.dedup_report = None
         
         # Buat direktori jika belum ada
         os.makedirs(self.vector_db_path, exist_ok=True)
         
-    def create_embeddings(self, chunks: List[Dict[str, str]]) -> np.ndarray:
+    def clone_config(self) -> "VectorStore":
+        """
+        VectorStore kosong dengan model dan konfigurasi yang sama (backend encoder, path, cache,
+        filter, routing, dedup), mis. untuk me-load versi index baru saat hot reload
+        """
+        clone = VectorStore(model_name=self.model_name, model=self.model, encoder_backend=self.encoder_backend)
+        clone.vector_db_path = self.vector_db_path
+        clone.query_cache_size = self.query_cache_size
+        clone.filterable_fields = self.filterable_fields
+        clone._filter_cache = FilterCache(self._filter_cache.max_bytes)
+        clone.route_m = self.route_m
+        clone.dedup_threshold = self.dedup_threshold
+        return clone
+    
+    def create_embeddings(self, chunks: List[Dict[str, str]], batch_size: int = 32,
+                          max_batch_tokens: int = 4096, bucketed: bool = True) -> np.ndarray:
         """
         Create embeddings untuk semua chunks
+
+        Dengan bucketed=True chunks diurutkan berdasarkan panjang token dan
+        dikelompokkan sehingga (jumlah chunk x token terpanjang) tiap batch
+        tidak melebihi max_batch_tokens. Urutan hasil tetap sama dengan input.
+        Di CPU batch yang terlalu besar (budget 8192, ratusan chunk pendek) justru lebih lambat.
         """
         print(f"🔄 Creating embeddings for {len(chunks)} chunks...")
         texts = [chunk['content'] for chunk in chunks]
-        
-        embeddings = self.model.encode(
-            texts, 
-            show_progress_bar=True,
-            batch_size=32,
-            normalize_embeddings=True  # Normalize untuk cosine similarity
-        )
-        
-        print(f"✅ Created embeddings with shape: {embeddings.shape}")
+        start = time.perf_counter()
+        
+        if not bucketed or not texts:
+            embeddings = self.model.encode(
+                texts, 
+                show_progress_bar=True,
+                batch_size=batch_size,
+                normalize_embeddings=True  # Normalize untuk cosine similarity
+            )
+        else:
+            dimension = self.model.get_sentence_embedding_dimension()
+            embeddings = np.zeros((len(texts), dimension), dtype=np.float32)
+            
+            lengths = self._token_lengths(texts)
+            batches = self._length_buckets(lengths, max_batch_tokens, max_batch_size=batch_size * 8)
+            
+            for batch in batches:
+                embeddings[batch] = self.model.encode(
+                    [texts[i] for i in batch],
+                    show_progress_bar=False,
+                    batch_size=len(batch),
+                    normalize_embeddings=True
+                )
+            print(f"   - {len(batches)} length-bucketed batches (budget {max_batch_tokens} tokens)")
+        
+        elapsed = time.perf_counter() - start
+        rate = len(texts) / elapsed if elapsed > 0 else 0.0
+        print(f"✅ Created embeddings with shape: {embeddings.shape} ({rate:.1f} chunks/s)")
         return embeddings
     
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        """
+        Hitung panjang token setiap teks, dipotong di max_seq_length model
+        """
+        encoded = self.model.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=self.model.max_seq_length
+        )
+        return [len(ids) for ids in encoded['input_ids']]
+    
+    def _length_buckets(self, lengths: List[int], max_batch_tokens: int,
+                        max_batch_size: int) -> List[List[int]]:
+        """
+        Kelompokkan index teks (terurut dari yang terpanjang) ke batch
+        yang ukuran padding-nya muat dalam anggaran token
+        """
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+        
+        batches = []
+        current = []
+        for idx in order:
+            # Item pertama batch adalah yang terpanjang, jadi padding = lengths[current[0]]
+            if current and ((len(current) + 1) * lengths[current[0]] > max_batch_tokens
+                            or len(current) >= max_batch_size):
+                batches.append(current)
+                current = []
+            current.append(idx)
+        
+        if current:
+            batches.append(current)
+        
+        return batches
+    
     def build_index(self, chunks: List[Dict[str, str]], embeddings: np.ndarray = None):
         """
         Build FAISS index dari chunks dan embeddings
+
+        Dengan self.dedup_threshold, chunk near-duplicate digabung dulu (lihat src/dedup.py)
+        dan laporannya disimpan di self.dedup_report
         """
         print("🔄 Building FAISS index...")
         
-        self.chunks = chunks
-        
         if embeddings is None:
-            self.embeddings = self.create_embeddings(chunks)
-        else:
-            self.embeddings = embeddings
+            embeddings = self.create_embeddings(chunks)
+        
+        if self.dedup_threshold:
+            chunks, embeddings, self.dedup_report = deduplicate_chunks(chunks, embeddings,
+                                                                       threshold=self.dedup_threshold)
+            print_report(self.dedup_report)
+        
+        self.chunks = chunks
+        self._reset_metadata_index()
+        self.embeddings = embeddings
             
         # Pastikan embeddings sudah normalized
         if not np.allclose(np.linalg.norm(self.embeddings, axis=1), 1.0, atol=1e-6):
@@ -66,27 +186,147 @@ class VectorStore:
         
         # Add embeddings ke index
         self.index.add(self.embeddings.astype('float32'))
+        self._build_router()
         
         print(f"✅ FAISS index built with {self.index.ntotal} vectors")
     
-    def search(self, query: str, k: int = 5, min_score: float = 0.1) -> List[Dict]:
+    def encode_query(self, query: str, trace=NULL_TRACE) -> np.ndarray:
+        """
+        Encode query menjadi embedding (1, dim), dengan cache LRU per query
+        """
+        with self._query_cache_lock:
+            cached = self._query_cache.get(query)
+            if cached is not None:
+                self._query_cache.move_to_end(query)
+        if cached is not None:
+            trace.incr('query_embedding_cache_hit')
+            return cached
+        
+        trace.incr('query_embedding_cache_miss')
+        with trace.span('encode'):
+            query_embedding = self.model.encode([query], normalize_embeddings=True).astype('float32')
+        
+        with self._query_cache_lock:
+            self._query_cache[query] = query_embedding
+            if len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        
+        return query_embedding
+    
+    def encode_queries(self, queries: List[str], batch_size: int = 256, trace=NULL_TRACE) -> np.ndarray:
+        """
+        Encode banyak query sekaligus menjadi (n, dim); query yang sudah ada di cache tidak di-encode ulang
+        dan duplikat hanya di-encode sekali
+        """
+        embeddings = [None] * len(queries)
+        with self._query_cache_lock:
+            for i, query in enumerate(queries):
+                cached = self._query_cache.get(query)
+                if cached is not None:
+                    self._query_cache.move_to_end(query)
+                    embeddings[i] = cached[0]
+        
+        missing = list(dict.fromkeys(q for q, e in zip(queries, embeddings) if e is None))
+        trace.incr('query_embedding_cache_hit', len(queries) - sum(1 for e in embeddings if e is None))
+        trace.incr('query_embedding_cache_miss', len(missing))
+        
+        if missing:
+            with trace.span('encode'):
+                encoded = self.model.encode(missing, batch_size=batch_size, show_progress_bar=False,
+                                            normalize_embeddings=True).astype('float32')
+            encoded_by_query = dict(zip(missing, encoded))
+            with self._query_cache_lock:
+                for query, embedding in encoded_by_query.items():
+                    self._query_cache[query] = embedding[None, :]
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+            embeddings = [e if e is not None else encoded_by_query[q] for q, e in zip(queries, embeddings)]
+        
+        if not embeddings:
+            return np.empty((0, self.index.d if self.index is not None else 0), dtype=np.float32)
+        return np.ascontiguousarray(np.vstack(embeddings), dtype=np.float32)
+    
+    def clear_query_cache(self):
+        """
+        Kosongkan cache embedding query
+        """
+        with self._query_cache_lock:
+            self._query_cache.clear()
+    
+    def search(self, query: str, k: int = 5, min_score: float = 0.1, filters: Dict = None,
+               route_m: int = None, trace=NULL_TRACE) -> List[Dict]:
         """
         Search chunks yang mirip dengan query
+
+        filters membatasi pencarian ke subset metadata, mis.
+        {'source_title': 'Mohammad Hatta'} atau {'source_type': ['Wikipedia Indonesia', 'Custom']}
+
+        route_m (default self.route_m) mengaktifkan pencarian hierarkis: query di-route ke
+        route_m artikel dengan centroid terdekat, lalu chunk hanya dicari di artikel tersebut.
         """
         if self.index is None:
             print("❌ Index not built yet!")
             return []
         
         # Create query embedding
-        query_embedding = self.model.encode([query], normalize_embeddings=True)
+        query_embedding = self.encode_query(query, trace=trace)
         
-        # Search dalam index
-        scores, indices = self.index.search(query_embedding.astype('float32'), k)
+        return self.search_by_embedding(query_embedding, k=k, min_score=min_score,
+                                        filters=filters, route_m=route_m, trace=trace)
+    
+    def search_by_embedding(self, query_embedding: np.ndarray, k: int = 5, min_score: float = 0.1,
+                            filters: Dict = None, route_m: int = None, trace=NULL_TRACE) -> List[Dict]:
+        """
+        Search chunks berdasarkan query embedding yang sudah di-encode
+        """
+        if self.index is None:
+            print("❌ Index not built yet!")
+            return []
+        
+        route_m = route_m if route_m is not None else self.route_m
         
+        # Search dalam index
+        with trace.span('search'):
+            if filters:
+                scores, indices = self._search_subset(query_embedding, filters, k)
+            elif route_m:
+                scores, indices = self._search_routed(query_embedding, k, route_m)
+            else:
+                scores, indices = self.index.search(query_embedding, k)
+        
+        return self._to_results(scores[0], indices[0], min_score)
+    
+    def search_batch_by_embedding(self, query_embeddings: np.ndarray, k: int = 5, min_score: float = 0.1,
+                                  filters: Dict = None, route_m: int = None, trace=NULL_TRACE) -> List[List[Dict]]:
+        """
+        Search banyak query embedding (n, dim) dengan satu panggilan FAISS; return hasil per query
+        """
+        if self.index is None:
+            print("❌ Index not built yet!")
+            return [[] for _ in range(len(query_embeddings))]
+        
+        route_m = route_m if route_m is not None else self.route_m
+        
+        with trace.span('search'):
+            if filters:
+                # Subset filter dicari per baris (blok subset sudah di-cache)
+                rows = [self._search_subset(query_embeddings[i:i + 1], filters, k)
+                        for i in range(len(query_embeddings))]
+                scores = [row_scores[0] for row_scores, _ in rows]
+                indices = [row_indices[0] for _, row_indices in rows]
+            elif route_m:
+                scores, indices = self._search_routed(query_embeddings, k, route_m)
+            else:
+                scores, indices = self.index.search(query_embeddings, k)
+        
+        return [self._to_results(row_scores, row_indices, min_score)
+                for row_scores, row_indices in zip(scores, indices)]
+    
+    def _to_results(self, scores: np.ndarray, indices: np.ndarray, min_score: float) -> List[Dict]:
         results = []
-        for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-            # Filter berdasarkan minimum score
-            if score >= min_score:
+        for i, (score, idx) in enumerate(zip(scores, indices)):
+            # Filter berdasarkan minimum score (idx -1 = slot kosong dari FAISS)
+            if idx >= 0 and score >= min_score:
                 results.append({
                     'chunk': self.chunks[idx],
                     'score': float(score),
@@ -96,10 +336,211 @@ class VectorStore:
         
         return results
     
+    def range_search(self, query: str, min_score: float = 0.2, max_results: int = 20,
+                     filters: Dict = None, trace=NULL_TRACE) -> Tuple[List[Dict], int]:
+        """
+        Search semua chunk di atas threshold score (jumlah hasil adaptif, bukan fixed k)
+        """
+        if self.index is None:
+            print("❌ Index not built yet!")
+            return [], 0
+        
+        query_embedding = self.encode_query(query, trace=trace)
+        return self.range_search_by_embedding(query_embedding, min_score=min_score, max_results=max_results,
+                                              filters=filters, trace=trace)
+    
+    def range_search_by_embedding(self, query_embedding: np.ndarray, min_score: float = 0.2,
+                                  max_results: int = 20, filters: Dict = None,
+                                  trace=NULL_TRACE) -> Tuple[List[Dict], int]:
+        """
+        Ambil semua chunk dengan score >= min_score (FAISS range search), dibatasi max_results.
+        Return (results terurut, jumlah vector yang di-scan range search).
+        """
+        if self.index is None:
+            print("❌ Index not built yet!")
+            return [], 0
+        
+        with trace.span('search'):
+            if filters:
+                allowed_ids, block = self._filter_subset(filters)
+                if block is None:
+                    block = self.embeddings[allowed_ids]
+                scores = block @ query_embedding[0] if len(allowed_ids) else np.empty(0, dtype=np.float32)
+                mask = scores >= min_score
+                scores, indices = scores[mask], allowed_ids[mask]
+                num_scanned = len(allowed_ids)
+            else:
+                lims, scores, indices = self.index.range_search(query_embedding, min_score)
+                scores, indices = scores[lims[0]:lims[1]], indices[lims[0]:lims[1]]
+                num_scanned = self.index.ntotal
+            
+            if len(indices) > max_results:
+                top = np.argpartition(-scores, max_results - 1)[:max_results]
+                scores, indices = scores[top], indices[top]
+            order = np.argsort(-scores)
+        
+        results = [{
+            'chunk': self.chunks[int(indices[i])],
+            'score': float(scores[i]),
+            'rank': rank,
+            'index': int(indices[i])
+        } for rank, i in enumerate(order, 1)]
+        
+        return results, num_scanned
+    
+    @property
+    def article_titles(self) -> List[str]:
+        routing = self._routing
+        return routing['titles'] if routing is not None else []
+    
+    @property
+    def article_centroids(self) -> Optional[np.ndarray]:
+        routing = self._routing
+        return routing['centroids'] if routing is not None else None
+    
+    def _build_router(self):
+        """
+        Precompute centroid per artikel (rata-rata embedding chunk, dinormalisasi) dan
+        IVF index dengan satu inverted list per artikel: quantizer = centroid artikel,
+        nprobe = route_m. Chunk dari satu artikel tersimpan contiguous di list-nya.
+        Index mmap hanya menyimpan centroid: IVF akan menyalin semua vektor ke memori privat.
+        """
+        with self._router_lock:
+            if self._metadata_index is None:
+                self._build_metadata_index()
+            
+            groups = self._metadata_index['source_title']
+            # Quantizer harus tetap direferensikan selama router dipakai
+            routing = {'titles': list(groups.keys()), 'groups': groups, 'centroids': None,
+                       'router': None, 'quantizer': None}
+            if routing['titles'] and self.embeddings is not None:
+                centroids = np.stack([np.asarray(self.embeddings[groups[title]], dtype=np.float32).mean(axis=0)
+                                      for title in routing['titles']])
+                centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+                faiss.normalize_L2(centroids)
+                routing['centroids'] = centroids
+                
+                if not isinstance(self.index, MmapFlatIndex):
+                    embeddings = np.ascontiguousarray(self.embeddings, dtype=np.float32)
+                    dimension = embeddings.shape[1]
+                    assignments = np.empty(len(embeddings), dtype=np.int64)
+                    for list_no, title in enumerate(routing['titles']):
+                        assignments[groups[title]] = list_no
+                    ids = np.arange(len(embeddings), dtype=np.int64)
+                    
+                    routing['quantizer'] = faiss.IndexFlatIP(dimension)
+                    routing['quantizer'].add(centroids)
+                    router = faiss.IndexIVFFlat(routing['quantizer'], dimension, len(routing['titles']),
+                                                faiss.METRIC_INNER_PRODUCT)
+                    router.add_core(len(embeddings), faiss.swig_ptr(embeddings), faiss.swig_ptr(ids),
+                                    faiss.swig_ptr(assignments))
+                    routing['router'] = router
+            
+            self._routing = routing
+    
+    def _search_routed(self, query_embedding: np.ndarray, k: int, route_m: int):
+        """
+        Coarse-to-fine: pilih route_m artikel terdekat, lalu exact search di chunk artikel itu saja
+        """
+        routing = self._routing
+        if routing is None or routing['centroids'] is None:
+            # Tidak ada artikel untuk di-route: flat search
+            return self.index.search(query_embedding, k)
+        
+        route_m = min(route_m, len(routing['titles']))
+        if routing['router'] is not None:
+            params = faiss.SearchParametersIVF(nprobe=route_m)
+            return routing['router'].search(query_embedding, k, params=params)
+        
+        # Index mmap: chunk artikel terpilih dicari langsung di atas matrix mmap
+        groups = routing['groups']
+        scores = np.full((len(query_embedding), k), -np.inf, dtype=np.float32)
+        indices = np.full((len(query_embedding), k), -1, dtype=np.int64)
+        for row, query in enumerate(query_embedding):
+            nearest = np.argpartition(-(routing['centroids'] @ query), route_m - 1)[:route_m]
+            allowed_ids = np.sort(np.concatenate([groups[routing['titles'][i]] for i in nearest]))
+            row_scores, row_indices = self.index.search_subset(query[None, :], k, allowed_ids)
+            scores[row, :row_scores.shape[1]] = row_scores[0]
+            indices[row, :row_indices.shape[1]] = row_indices[0]
+        return scores, indices
+    
+    def resolve_filters(self, filters: Dict) -> np.ndarray:
+        """
+        Ubah filters metadata menjadi array index chunk yang diizinkan (terurut).
+        Nilai dalam list digabung OR, antar field digabung AND.
+        """
+        if self._metadata_index is None:
+            self._build_metadata_index()
+        return resolve_filters(self._metadata_index, filters, len(self.chunks))
+    
+    def _reset_metadata_index(self):
+        """
+        Invalidate index metadata, cache filter dan router artikel setelah chunks berubah
+        """
+        with self._router_lock:
+            self._metadata_index = None
+            self._filter_cache.clear()
+            self._routing = None
+    
+    def _build_metadata_index(self):
+        """
+        Precompute daftar index chunk per nilai metadata (source_title, source_type)
+        """
+        self._metadata_index = build_metadata_index(self.chunks, self.filterable_fields)
+    
+    def _filter_subset(self, filters: Dict):
+        """
+        Resolve filters menjadi (allowed_ids, blok embeddings contiguous) dengan cache,
+        sehingga filter yang sering dipakai tidak perlu di-resolve dan di-gather ulang.
+        Index mmap hanya meng-cache allowed_ids (blok akan menjadi salinan privat di tiap worker).
+        """
+        key = filter_key(filters)
+        subset = self._filter_cache.get(key)
+        if subset is None:
+            allowed_ids = self.resolve_filters(filters)
+            block = None
+            # Subset kecil disimpan sebagai blok contiguous untuk matrix product langsung
+            if self.embeddings is not None and not self.read_only and \
+                    0 < len(allowed_ids) <= self.index.ntotal * 0.5:
+                block = np.ascontiguousarray(self.embeddings[allowed_ids], dtype=np.float32)
+            subset = (allowed_ids, block)
+            self._filter_cache.put(key, subset, allowed_ids.nbytes + (block.nbytes if block is not None else 0))
+        return subset
+    
+    def _search_subset(self, query_embedding: np.ndarray, filters: Dict, k: int):
+        """
+        Exact search hanya di subset chunk yang lolos filter.
+        Subset kecil: matrix product pada blok embeddings subset (O(|subset|)),
+        subset besar: FAISS dengan IDSelector agar tidak perlu menyalin embeddings.
+        """
+        allowed_ids, block = self._filter_subset(filters)
+        
+        if len(allowed_ids) == 0:
+            return np.empty((1, 0), dtype=np.float32), np.empty((1, 0), dtype=np.int64)
+        
+        if block is None:
+            if isinstance(self.index, MmapFlatIndex):
+                return self.index.search_subset(query_embedding, k, allowed_ids)
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(allowed_ids))
+            return self.index.search(query_embedding, k, params=params)
+        
+        subset_scores = block @ query_embedding[0]
+        if len(subset_scores) > k:
+            top = np.argpartition(-subset_scores, k - 1)[:k]
+        else:
+            top = np.arange(len(subset_scores))
+        top = top[np.argsort(-subset_scores[top])]
+        
+        return subset_scores[top][None, :], allowed_ids[top][None, :]
+    
     def add_document(self, title: str, content: str, source_type: str = "Custom"):
         """
         Tambah dokumen baru ke vector store
         """
+        if self.read_only:
+            print("❌ Vector store di-load dalam mode mmap (read-only), tidak bisa menambah dokumen")
+            return None
+        
         # Buat chunk baru
         new_chunk = {
             'content': content,
@@ -115,8 +556,24 @@ class VectorStore:
         # Create embedding untuk chunk baru
         new_embedding = self.model.encode([content], normalize_embeddings=True)
         
+        # Dokumen yang (hampir) sama dengan chunk yang sudah ada tidak diindeks ulang:
+        # cukup tambahkan sumbernya ke chunk tersebut
+        if self.dedup_threshold and self.index is not None and self.index.ntotal > 0:
+            scores, indices = self.index.search(new_embedding.astype('float32'), 1)
+            if scores[0][0] >= self.dedup_threshold:
+                existing = int(indices[0][0])
+                chunk = dict(self.chunks[existing])
+                chunk['sources'] = merge_sources([chunk, new_chunk])
+                chunk['duplicate_count'] = chunk.get('duplicate_count', 1) + 1
+                self.chunks[existing] = chunk
+                self._reset_metadata_index()
+                self._build_router()
+                print(f"♻️ Document '{title}' is a near-duplicate of chunk {existing}, merged sources")
+                return existing
+        
         # Add ke chunks dan embeddings
         self.chunks.append(new_chunk)
+        self._reset_metadata_index()
         
         if self.embeddings is None:
             self.embeddings = new_embedding
@@ -129,35 +586,79 @@ class VectorStore:
             self.index = faiss.IndexFlatIP(dimension)
         
         self.index.add(new_embedding.astype('float32'))
+        self._build_router()
         
         print(f"✅ Added new document: {title}")
         return len(self.chunks) - 1  # Return index dari dokumen baru
-    def save(self, base_path: str):
+    def save(self, base_path: str = "vector_store"):
         """
-        Simpan index FAISS dan data chunks.
+        Simpan index FAISS, embeddings, data chunks dan metadata.
         """
+        if self.read_only:
+            print("❌ Vector store di-load dalam mode mmap (read-only), tidak bisa disimpan; load tanpa mmap untuk menyimpan ulang")
+            return
+        
         if self.index is None or not self.chunks:
             print("❌ Index atau chunks kosong, tidak ada yang disimpan.")
             return
 
-        # 1. Pastikan direktori tujuan ada
-        output_dir = os.path.dirname(base_path)
-        os.makedirs(output_dir, exist_ok=True)
+        # 1. Buat path yang benar untuk setiap file
+        paths = self._bundle_paths(base_path)
 
-        # 2. Buat path yang benar untuk setiap file
-        index_path = f"{base_path}.faiss"
-        chunks_path = f"{base_path}_chunks.json"
+        # 2. Pastikan direktori tujuan ada
+        output_dir = os.path.dirname(paths['index'])
+        os.makedirs(output_dir, exist_ok=True)
 
-        # 3. Simpan index FAISS
-        faiss.write_index(self.index, index_path)
-        
-        # 4. Simpan metadata chunks
-        with open(chunks_path, 'w', encoding='utf-8') as f:
-            json.dump(self.chunks, f, ensure_ascii=False, indent=2)
+        # 3. Tulis semua file ke path sementara lalu os.replace, supaya proses lain yang
+        #    sedang memakai (atau me-mmap) bundle lama tidak pernah melihat file setengah jadi
+        tmp = {name: f"{path}.tmp" for name, path in paths.items()}
+        
+        # Simpan index FAISS dan embeddings
+        faiss.write_index(self.index, tmp['index'])
+        with open(tmp['embeddings'], 'wb') as f:
+            np.save(f, np.asarray(self.embeddings, dtype=np.float32))
+        
+        # 4. Simpan metadata chunks (JSON biasa + JSONL dengan offset untuk load mmap)
+        with open(tmp['chunks'], 'w', encoding='utf-8') as f:
+            json.dump(list(self.chunks), f, ensure_ascii=False, indent=2)
+        write_chunks_jsonl(self.chunks, tmp['chunks_jsonl'], tmp['chunk_offsets'])
+        
+        # 5. Simpan metadata bundle (ditulis terakhir: menandai versi baru sudah lengkap)
+        metadata = {
+            'model_name': self.model_name,
+            'encoder_backend': self.encoder_backend,
+            'total_chunks': len(self.chunks),
+            'embedding_dimension': int(self.embeddings.shape[1]),
+            'index_type': 'IndexFlatIP',
+            'version': datetime.now().strftime('%Y%m%d%H%M%S%f')
+        }
+        if self.dedup_report is not None:
+            metadata['dedup'] = self.dedup_report
+        with open(tmp['metadata'], 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        
+        for name in ('index', 'embeddings', 'chunks', 'chunks_jsonl', 'chunk_offsets', 'metadata'):
+            os.replace(tmp[name], paths[name])
+        self.version = metadata['version']
 
         print(f"✅ Vector store berhasil disimpan di '{output_dir}'")
-        print(f"   - Index: {index_path}")
-        print(f"   - Chunks: {chunks_path}")    
+        print(f"   - Index: {paths['index']}")
+        print(f"   - Embeddings: {paths['embeddings']}")
+        print(f"   - Chunks: {paths['chunks']}")    
+    
+    def _bundle_paths(self, filename: str) -> Dict[str, str]:
+        """
+        Path semua file bundle; nama tanpa direktori diletakkan di vector_db_path
+        """
+        base_path = filename if os.path.dirname(filename) else os.path.join(self.vector_db_path, filename)
+        return {
+            'index': f"{base_path}.faiss",
+            'embeddings': f"{base_path}_embeddings.npy",
+            'chunks': f"{base_path}_chunks.json",
+            'chunks_jsonl': f"{base_path}_chunks.jsonl",
+            'chunk_offsets': f"{base_path}_chunk_offsets.npy",
+            'metadata': f"{base_path}_metadata.json"
+        }
         
     # def save(self, filename: str = "vector_store"):
     #     """
@@ -201,18 +702,25 @@ class VectorStore:
     #     print(f"   - Index: {index_path}")
     #     print(f"   - Metadata: {metadata_path}")
     
-    def load(self, filename: str = "vector_store"):
+    def load(self, filename: str = "vector_store", mmap: bool = False):
         """
         Load vector store dari file
+
+        Dengan mmap=True embeddings dan teks chunk di-memory-map read-only, sehingga
+        banyak worker process berbagi satu salinan fisik lewat page cache.
+        Mode ini read-only (add_document tidak tersedia).
         """
         # Path files
-        chunks_path = os.path.join(self.vector_db_path, f"{filename}_chunks.json")
-        embeddings_path = os.path.join(self.vector_db_path, f"{filename}_embeddings.npy")
-        index_path = os.path.join(self.vector_db_path, f"{filename}.faiss")
-        metadata_path = os.path.join(self.vector_db_path, f"{filename}_metadata.json")
+        paths = self._bundle_paths(filename)
+        chunks_path = paths['chunks']
+        embeddings_path = paths['embeddings']
+        index_path = paths['index']
+        metadata_path = paths['metadata']
         
         # Check if all files exist
         required_files = [chunks_path, embeddings_path, index_path, metadata_path]
+        if mmap:
+            required_files = [paths['chunks_jsonl'], paths['chunk_offsets'], embeddings_path, metadata_path]
         missing_files = [f for f in required_files if not os.path.exists(f)]
         
         if missing_files:
@@ -220,21 +728,31 @@ class VectorStore:
             return False
         
         try:
-            # Load chunks
-            with open(chunks_path, 'r', encoding='utf-8') as f:
-                self.chunks = json.load(f)
-            
-            # Load embeddings
-            self.embeddings = np.load(embeddings_path)
-            
-            # Load FAISS index
-            self.index = faiss.read_index(index_path)
+            if mmap:
+                # IndexFlatIP identik dengan matrix embeddings, jadi search langsung di atas mmap
+                self.chunks = MmapChunks(paths['chunks_jsonl'], paths['chunk_offsets'])
+                self.embeddings = np.load(embeddings_path, mmap_mode='r')
+                self.index = MmapFlatIndex(self.embeddings)
+            else:
+                # Load chunks
+                with open(chunks_path, 'r', encoding='utf-8') as f:
+                    self.chunks = json.load(f)
+                
+                # Load embeddings
+                self.embeddings = np.load(embeddings_path)
+                
+                # Load FAISS index
+                self.index = faiss.read_index(index_path)
+            self.read_only = mmap
+            self._reset_metadata_index()
+            self._build_router()
             
             # Load metadata
             with open(metadata_path, 'r', encoding='utf-8') as f:
                 metadata = json.load(f)
+            self.version = metadata.get('version')
             
-            print(f"✅ Vector store loaded successfully!")
+            print(f"✅ Vector store loaded successfully!{' (mmap)' if mmap else ''}")
             print(f"   - Total chunks: {len(self.chunks)}")
             print(f"   - Embedding dimension: {self.embeddings.shape[1]}")
             print(f"   - Model: {metadata.get('model_name', 'Unknown')}")
@@ -268,6 +786,35 @@ class VectorStore:
         
         return stats
 
+def benchmark_embedding_throughput(vector_store: VectorStore, chunks: List[Dict[str, str]],
+                                   batch_size: int = 32, max_batch_tokens: int = 4096,
+                                   repeats: int = 3) -> Dict:
+    """
+    Bandingkan throughput (chunks/s, median dari repeats kali) batching tetap vs length-bucketed
+    """
+    # Warm-up supaya waktu load kernel tidak ikut terhitung
+    vector_store.model.encode([chunk['content'] for chunk in chunks[:batch_size]], batch_size=batch_size)
+    
+    timings = {'fixed': [], 'bucketed': []}
+    for _ in range(repeats):
+        # Bergantian agar noise mesin (frekuensi CPU, proses lain) terbagi rata
+        for name, bucketed in [('fixed', False), ('bucketed', True)]:
+            start = time.perf_counter()
+            vector_store.create_embeddings(chunks, batch_size=batch_size,
+                                           max_batch_tokens=max_batch_tokens, bucketed=bucketed)
+            timings[name].append(time.perf_counter() - start)
+    
+    report = {'num_chunks': len(chunks), 'repeats': repeats}
+    for name, seconds in timings.items():
+        elapsed = float(np.median(seconds))
+        report[name] = {
+            'seconds': elapsed,
+            'chunks_per_second': len(chunks) / elapsed if elapsed > 0 else 0.0
+        }
+    
+    report['speedup'] = report['bucketed']['chunks_per_second'] / max(report['fixed']['chunks_per_second'], 1e-9)
+    return report
+
 def main():
     """
     Main function untuk test vector store
@@ -290,6 +837,14 @@ def main():
     # Initialize vector store
     vector_store = VectorStore()
     
+    if '--bench-embeddings' in sys.argv:
+        report = benchmark_embedding_throughput(vector_store, chunks)
+        print(f"\n📊 EMBEDDING THROUGHPUT ({report['num_chunks']} chunks):")
+        print(f"Fixed batch_size=32: {report['fixed']['chunks_per_second']:.1f} chunks/s")
+        print(f"Length-bucketed: {report['bucketed']['chunks_per_second']:.1f} chunks/s")
+        print(f"Speedup: {report['speedup']:.2f}x")
+        return
+    
     # Check if vector store already exists
     if vector_store.load():
         print("📂 Using existing vector store")
@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from src.admission import FULL, NO_EXPANSION, AdmissionController, Deadline, DeadlineExceeded, Overloaded
+
+
+def hold_slot(controller, entered, release):
+    with controller.admit():
+        entered.set()
+        release.wait(2)
+
+
+def start_holder(controller):
+    entered, release = threading.Event(), threading.Event()
+    thread = threading.Thread(target=hold_slot, args=(controller, entered, release))
+    thread.start()
+    assert entered.wait(2)
+    return thread, release
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return condition()
+
+
+def test_sheds_when_queue_is_full():
+    controller = AdmissionController(max_concurrency=1, max_queue=0)
+    holder, release = start_holder(controller)
+    try:
+        with pytest.raises(Overloaded):
+            with controller.admit():
+                pass
+    finally:
+        release.set()
+        holder.join(2)
+
+    stats = controller.stats()
+    assert stats['shed'] == 1 and stats['admitted'] == 1 and stats['active'] == 0
+
+
+def test_sheds_when_deadline_expires_in_queue():
+    controller = AdmissionController(max_concurrency=1, max_queue=4)
+    holder, release = start_holder(controller)
+    try:
+        start = time.monotonic()
+        with pytest.raises(Overloaded):
+            with controller.admit(Deadline(0.05)):
+                pass
+        assert time.monotonic() - start < 1.0
+    finally:
+        release.set()
+        holder.join(2)
+
+    assert controller.stats()['shed'] == 1
+    assert controller.stats()['waiting'] == 0
+
+
+def test_queued_request_runs_when_slot_frees():
+    controller = AdmissionController(max_concurrency=1, max_queue=4)
+    holder, release = start_holder(controller)
+    levels = []
+
+    def queued():
+        with controller.admit() as level:
+            levels.append(level)
+
+    waiter = threading.Thread(target=queued)
+    waiter.start()
+    assert wait_until(lambda: controller.stats()['waiting'] == 1)
+    assert levels == []
+
+    release.set()
+    holder.join(2)
+    waiter.join(2)
+
+    assert levels == [FULL]
+    assert controller.stats()['admitted'] == 2
+
+
+def test_degrades_as_queue_fills():
+    controller = AdmissionController(max_concurrency=1, max_queue=4, degrade_thresholds=(0.25, 0.5, 0.9))
+    holder, release = start_holder(controller)
+    levels = []
+
+    def queued():
+        with controller.admit() as level:
+            levels.append(level)
+
+    first = threading.Thread(target=queued)
+    first.start()
+    assert wait_until(lambda: controller.stats()['waiting'] == 1)
+    second = threading.Thread(target=queued)
+    second.start()
+    assert wait_until(lambda: controller.stats()['waiting'] == 2)
+
+    release.set()
+    for thread in (holder, first, second):
+        thread.join(2)
+
+    # Request pertama masuk saat antrean kosong, kedua saat 1/4 terisi
+    assert sorted(levels) == [FULL, NO_EXPANSION]
+    assert controller.stats()['degraded'] == 1
+
+
+def test_counts_admitted_requests_that_miss_their_deadline():
+    controller = AdmissionController(max_concurrency=2, max_queue=2)
+
+    with pytest.raises(DeadlineExceeded):
+        with controller.admit():
+            raise DeadlineExceeded('llm')
+
+    stats = controller.stats()
+    assert stats['deadline_exceeded'] == 1 and stats['active'] == 0
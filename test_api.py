@@ -0,0 +1,114 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.admission import DeadlineExceeded, Overloaded
+from src.api import create_api_server
+from src.conversation import SessionStore
+from src.llm_providers import ProviderError
+
+
+class FakeChain:
+    """
+    Pengganti RAGChain: query() menjalankan outcome yang diset test
+    """
+    admission = None
+    single_flight = None
+
+    def __init__(self):
+        self.sessions = SessionStore()
+        self.outcome = None
+        self.calls = []
+
+    def query(self, question, filters=None, timeout=None, session_id=None):
+        self.calls.append({'question': question, 'filters': filters, 'timeout': timeout, 'session_id': session_id})
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return {'question': question, 'response': "jawaban", 'status': 'ok',
+                'context': {'used_sources': ["Soekarno"]}, 'metrics': {'counters': {}}}
+
+
+@pytest.fixture
+def api():
+    chain = FakeChain()
+    server = create_api_server(chain, host="127.0.0.1", port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield chain, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body):
+    request = urllib.request.Request(url + "/query", json.dumps(body).encode('utf-8'),
+                                     {'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, dict(response.headers), json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), json.load(e)
+
+
+def test_query_ok(api):
+    chain, url = api
+    status, _, body = post(url, {'question': "Siapa Soekarno?", 'filters': {'source_title': ["Soekarno"]},
+                                 'timeout': 2, 'session_id': "s1"})
+
+    assert status == 200
+    assert body['response'] == "jawaban" and body['sources'] == ["Soekarno"]
+    assert chain.calls == [{'question': "Siapa Soekarno?", 'filters': {'source_title': ["Soekarno"]},
+                            'timeout': 2, 'session_id': "s1"}]
+
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'question': "  "},
+    {'question': "Siapa?", 'filters': ["Soekarno"]},
+    {'question': "Siapa?", 'filters': {'source_title': {'nested': 1}}},
+    {'question': "Siapa?", 'filters': {'source_title': [["Soekarno"]]}},
+    {'question': "Siapa?", 'timeout': 0},
+    {'question': "Siapa?", 'timeout': True},
+    ["Siapa Soekarno?"],
+    "Siapa Soekarno?",
+    {'question': "Siapa?", 'session_id': 1},
+])
+def test_invalid_requests_are_rejected(api, body):
+    chain, url = api
+    status, _, response = post(url, body)
+
+    assert status == 400
+    assert 'error' in response
+    assert chain.calls == []
+
+
+@pytest.mark.parametrize('error, status, label', [
+    (Overloaded("antrean penuh"), 503, 'shed'),
+    (DeadlineExceeded('llm'), 504, 'deadline_exceeded'),
+    (ProviderError("semua provider gagal"), 503, 'llm_unavailable'),
+    (RuntimeError("bug"), 500, 'error'),
+])
+def test_failures_map_to_status_codes(api, error, status, label):
+    chain, url = api
+    chain.outcome = error
+
+    code, headers, body = post(url, {'question': "Siapa Hatta?"})
+
+    assert code == status
+    assert body['status'] == label
+    if status == 503:
+        assert headers.get('Retry-After') == '1'
+
+
+def test_delete_session(api):
+    chain, url = api
+    chain.sessions.get("s1")
+
+    request = urllib.request.Request(url + "/sessions/s1", method='DELETE')
+    with urllib.request.urlopen(request, timeout=5) as response:
+        assert response.status == 200
+    with pytest.raises(urllib.error.HTTPError) as missing:
+        urllib.request.urlopen(request, timeout=5)
+    assert missing.value.code == 404
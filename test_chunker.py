@@ -0,0 +1,83 @@
+import pytest
+
+from src.chunker import SentenceChunker, chunk_articles, clean_text
+
+
+def make_article(title="Proklamasi", sentences=30):
+    content = " ".join(f"Kalimat nomor {i} tentang sejarah kemerdekaan Indonesia [{i}]." for i in range(sentences))
+    return {'title': title, 'url': f"https://example.org/{title}", 'source': "Test", 'content': content}
+
+
+def test_offsets_point_into_cleaned_text():
+    article = make_article()
+    clean = clean_text(article['content'])
+    chunks = SentenceChunker(200, 60).chunk_article(article)
+
+    assert chunks
+    for i, chunk in enumerate(chunks):
+        assert chunk['content'] == clean[chunk['start_char']:chunk['end_char']]
+        assert chunk['chunk_index'] == i
+        assert chunk['total_chunks'] == len(chunks)
+        assert chunk['chunk_id'] == f"proklamasi_chunk_{i}"
+
+
+def test_chunks_respect_size_and_overlap():
+    chunker = SentenceChunker(200, 60)
+    text = clean_text(make_article()['content'])
+    spans = chunker.split_spans(text)
+
+    for start, end in spans:
+        assert end - start <= 200
+    for (prev_start, prev_end), (start, end) in zip(spans, spans[1:]):
+        # Chunk berikutnya mulai di dalam chunk sebelumnya (overlap) tapi tetap maju
+        assert prev_start < start < prev_end
+        assert prev_end - start <= 60
+        assert end > prev_end
+
+
+def test_every_sentence_is_covered():
+    text = clean_text(make_article()['content'])
+    chunks = SentenceChunker(200, 60).split_text(text)
+
+    for i in range(30):
+        assert any(f"Kalimat nomor {i} " in chunk for chunk in chunks)
+
+
+def test_long_sentence_is_split_by_words():
+    text = " ".join(["kata"] * 100)
+    spans = SentenceChunker(50, 10).split_spans(text)
+
+    assert len(spans) > 1
+    for start, end in spans:
+        assert end - start <= 50
+        # Batas chunk tidak memotong kata
+        assert text[start:end].split() == ["kata"] * len(text[start:end].split())
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        SentenceChunker(100, 100)
+
+
+def test_parallel_chunking_matches_serial():
+    articles = [make_article(f"Artikel {i}", sentences=10 + i) for i in range(4)]
+
+    serial = chunk_articles(articles, 200, 60, workers=1)
+    parallel = chunk_articles(articles, 200, 60, workers=2)
+
+    assert parallel == serial
+
+
+def test_clean_text_removes_unwanted_unicode_and_ascii():
+    text = "Soekarno – Hatta\n\n“proklamasi” #17 Agustus [3] 1945 ✓ Jakarta, é."
+
+    assert clean_text(text) == "Soekarno  Hatta proklamasi 17 Agustus 1945  Jakarta, é."
+
+
+def test_chunk_boundaries_match_langchain_splitter():
+    pytest.importorskip('langchain')
+    from src.chunker import _boundary_agreement
+
+    articles = [make_article(f"Artikel {i}", sentences=20 + 7 * i) for i in range(4)]
+
+    assert _boundary_agreement(articles, 200, 60)['agreement'] >= 0.9
@@ -0,0 +1,71 @@
+import numpy as np
+
+from src.dedup import deduplicate_chunks, embedding_duplicate_pairs, minhash_duplicate_pairs
+
+
+def make_chunk(content, title, chunk_id=None):
+    return {'content': content, 'source_title': title, 'source_url': f"https://example.org/{title}",
+            'source_type': "Test", 'chunk_id': chunk_id or f"{title}_chunk_0"}
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_tiled_pairs_match_brute_force():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((300, 16)).astype(np.float32)
+    embeddings[250] = embeddings[3]
+    embeddings[120] = embeddings[7]
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    scores = embeddings @ embeddings.T
+    expected = {(int(i), int(j)) for i, j in zip(*np.nonzero(scores >= 0.95)) if j > i}
+
+    assert set(embedding_duplicate_pairs(embeddings, 0.95, block_size=64)) == expected
+    assert {(3, 250), (7, 120)} <= expected
+
+
+def test_exact_duplicates_merge_sources():
+    chunks = [make_chunk("Soekarno membacakan proklamasi.", "Soekarno"),
+              make_chunk("Hatta lahir di Bukittinggi.", "Hatta"),
+              make_chunk("SOEKARNO membacakan proklamasi.", "Proklamasi")]
+    embeddings = np.stack([unit(1, 0, 0), unit(0, 1, 0), unit(1, 0, 0)])
+
+    deduped, kept_embeddings, report = deduplicate_chunks(chunks, embeddings, threshold=0.95)
+
+    assert [chunk['source_title'] for chunk in deduped] == ["Soekarno", "Hatta"]
+    assert {source['source_title'] for source in deduped[0]['sources']} == {"Soekarno", "Proklamasi"}
+    assert deduped[0]['duplicate_count'] == 2
+    assert kept_embeddings.shape == (2, 3)
+    assert report['removed'] == 1 and report['groups'] == 1 and report['exact_duplicates'] == 1
+
+
+def test_chain_does_not_merge_dissimilar_ends():
+    # A~B dan B~C di atas threshold, tapi A dan C tidak mirip: C tidak boleh dibuang demi A
+    a, c = unit(1, 0, 0), unit(0, 1, 0)
+    b = unit(1, 1, 0)
+    chunks = [make_chunk("A" * 30, "A"), make_chunk("B" * 20, "B"), make_chunk("C" * 10, "C")]
+
+    deduped, _, report = deduplicate_chunks(chunks, np.stack([a, b, c]), threshold=0.7)
+
+    assert [chunk['source_title'] for chunk in deduped] == ["A", "C"]
+    assert report['removed'] == 1
+
+
+def test_representative_is_longest_member():
+    chunks = [make_chunk("pendek", "A"), make_chunk("jauh lebih panjang", "B")]
+    embeddings = np.stack([unit(1, 0.01, 0), unit(1, 0, 0)])
+
+    deduped, _, _ = deduplicate_chunks(chunks, embeddings, threshold=0.95)
+
+    assert len(deduped) == 1
+    assert deduped[0]['content'] == "jauh lebih panjang"
+
+
+def test_minhash_finds_near_duplicate_text():
+    base = " ".join(f"kata{i}" for i in range(60))
+    texts = [base, base + " tambahan", " ".join(f"lain{i}" for i in range(60))]
+
+    assert list(minhash_duplicate_pairs(texts, threshold=0.8)) == [(0, 1)]
@@ -0,0 +1,72 @@
+import re
+
+import numpy as np
+import pytest
+import torch
+
+from conftest import ARTICLES, make_chunks
+from src.benchmark import benchmark_encoder_agreement
+from src.encoder import ENCODER_BACKENDS, load_encoder
+
+QUERIES = [
+    {'query': "Siapa presiden pertama Republik Indonesia?", 'expected_chunk_ids': ["soekarno_chunk_0"]},
+    {'query': "Di mana Mohammad Hatta lahir?", 'expected_chunk_ids': ["hatta_chunk_0"]},
+    {'query': "Kapan Sumpah Pemuda diikrarkan?", 'expected_chunk_ids': ["sumpah_pemuda_chunk_0"]},
+    {'query': "Apa itu romusha pada masa pendudukan Jepang?", 'expected_chunk_ids': ["pendudukan_jepang_chunk_1"]},
+]
+
+
+@pytest.fixture(scope='module')
+def saved_model(tmp_path_factory):
+    """
+    SentenceTransformer kecil (BERT 2 layer) dengan bobot fixed-seed yang disimpan ke disk, supaya
+    agreement diukur pada model yang di-load lewat load_encoder seperti model asli
+    """
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    base = tmp_path_factory.mktemp("encoder")
+    texts = [sentence for sentences in ARTICLES.values() for sentence in sentences] + [q['query'] for q in QUERIES]
+    words = sorted({word for text in texts for word in re.findall(r'\w+|[^\w\s]', text.lower())})
+    (base / "vocab.txt").write_text("\n".join(['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + words))
+    BertTokenizerFast(str(base / "vocab.txt"), do_lower_case=True).save_pretrained(str(base / "bert"))
+
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=len(words) + 5, hidden_size=64, num_hidden_layers=2, num_attention_heads=4,
+                        intermediate_size=128, max_position_embeddings=128)
+    BertModel(config).save_pretrained(str(base / "bert"))
+
+    transformer = models.Transformer(str(base / "bert"), max_seq_length=128)
+    model = SentenceTransformer(modules=[transformer, models.Pooling(transformer.get_word_embedding_dimension())])
+    model.save(str(base / "model"))
+    return str(base / "model")
+
+
+def test_saved_model_loads_the_same_weights(saved_model):
+    texts = [chunk['content'] for chunk in make_chunks()]
+
+    first = load_encoder(saved_model).encode(texts, normalize_embeddings=True)
+    second = load_encoder(saved_model).encode(texts, normalize_embeddings=True)
+
+    np.testing.assert_array_equal(first, second)
+
+
+@pytest.mark.parametrize('backend', [backend for backend in ENCODER_BACKENDS if backend != 'float32'])
+def test_quantized_encoder_agrees_with_float32(saved_model, backend):
+    threads = torch.get_num_threads()
+
+    report = benchmark_encoder_agreement(load_encoder(saved_model, backend='float32'), make_chunks(), QUERIES,
+                                         backend=backend, k=3, repeats=1)
+
+    assert report['cosine']['chunk_min'] >= 0.99 and report['cosine']['query_min'] >= 0.99
+    assert report['retrieval'][backend]['topk_overlap_vs_float32'] >= 0.9
+    assert report['retrieval'][f'{backend}_query_only']['topk_overlap_vs_float32'] >= 0.9
+    # Benchmark tidak mengubah setting thread global proses
+    assert torch.get_num_threads() == threads
+    assert {row['threads'] for row in report['query_latency']} == {threads}
+
+    # Backend yang sama lewat load_encoder (jalur VectorStore dengan ENCODER_BACKEND)
+    texts = [chunk['content'] for chunk in make_chunks()]
+    float_embeddings = load_encoder(saved_model, backend='float32').encode(texts, normalize_embeddings=True)
+    embeddings = load_encoder(saved_model, backend=backend).encode(texts, normalize_embeddings=True)
+    assert np.min(np.sum(float_embeddings * embeddings, axis=1)) >= 0.99
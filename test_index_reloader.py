@@ -0,0 +1,56 @@
+import numpy as np
+
+from src.conversation import SessionStore, Turn
+from src.index_reloader import IndexReloader
+
+
+class FakeStore:
+    version = None
+
+
+class FakeComponent:
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
+
+
+def test_swap_forgets_session_chunks_of_old_store():
+    old_store, new_store = FakeStore(), FakeStore()
+    retriever = FakeComponent(old_store)
+    rag_chain = FakeComponent(old_store)
+    rag_chain.sessions = SessionStore()
+    state = rag_chain.sessions.get("s1")
+    state.add_turn(Turn("Siapa Soekarno?", "Presiden pertama.", [3, 7], np.zeros(4), vector_store=old_store))
+    swapped = []
+
+    reloader = IndexReloader(retriever, rag_chain)
+    reloader.on_swap.append(lambda old, new: swapped.append((old, new)))
+    reloader.swap(new_store)
+
+    assert retriever.vector_store is new_store and rag_chain.vector_store is new_store
+    assert swapped == [(old_store, new_store)]
+    turn = state.last_turn
+    # Riwayat tanya-jawab tetap, tapi index chunk store lama tidak lagi dipakai ulang
+    assert turn.question == "Siapa Soekarno?"
+    assert turn.chunk_indices == [] and turn.vector_store is None
+
+
+def test_reload_keeps_store_configuration(make_store, tmp_path):
+    old_store = make_store(encoder_backend='int8')
+    old_store.route_m = 2
+    old_store.dedup_threshold = 0.95
+    old_store.query_cache_size = 16
+    old_store.filterable_fields = ('source_title',)
+    old_store.save("vector_store")
+    old_store.version = "old"
+    retriever, rag_chain = FakeComponent(old_store), FakeComponent(old_store)
+    rag_chain.sessions = SessionStore()
+
+    reloader = IndexReloader(retriever, rag_chain, base_path=str(tmp_path / "vector_store"), warmup_queries=[])
+    assert reloader.check_now()
+
+    new_store = retriever.vector_store
+    assert new_store is not old_store and new_store.version != "old"
+    assert new_store.model is old_store.model and new_store.encoder_backend == 'int8'
+    assert new_store.route_m == 2 and new_store.dedup_threshold == 0.95
+    assert new_store.query_cache_size == 16 and new_store.filterable_fields == ('source_title',)
+    assert new_store.vector_db_path == old_store.vector_db_path
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import pytest
+
+from src.llm_providers import LLMProvider, ProviderError, ProviderPool, RateLimiter
+from src.metrics import Trace
+from src.stub_llm_server import StubLLMServer
+
+PAYLOAD = {'messages': [{'role': 'user', 'content': "Siapa proklamator Indonesia?"}], 'max_tokens': 20}
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**kwargs):
+        server = StubLLMServer(**dict({'latency': 0.01, 'jitter': 0.0}, **kwargs))
+        server.start()
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.stop()
+
+
+def test_failover_and_circuit_breaker(servers):
+    broken, healthy = servers(error_rate=1.0), servers()
+    primary, backup = LLMProvider("broken", broken.url, "stub"), LLMProvider("healthy", healthy.url, "stub")
+    pool = ProviderPool([primary, backup], failure_threshold=2, cooldown=60.0)
+
+    for _ in range(2):
+        trace = Trace()
+        result = pool.complete(PAYLOAD, trace=trace)
+        assert result['provider'] == "healthy"
+        assert trace.counters['llm_failover'] == 1
+
+    # Setelah failure_threshold kegagalan berturut-turut, circuit provider utama terbuka
+    assert not primary.healthy
+    assert pool.candidates() == [backup, primary]
+    result = pool.complete(PAYLOAD)
+    assert result['provider'] == "healthy"
+    assert broken.requests == 2 and healthy.requests == 3
+    assert primary.stats()['failures'] == 2 and backup.stats()['successes'] == 3
+
+
+def test_all_providers_failing_raises(servers):
+    pool = ProviderPool([LLMProvider(f"broken{i}", servers(error_rate=1.0).url, "stub") for i in range(2)])
+
+    with pytest.raises(ProviderError, match="semua provider gagal"):
+        pool.complete(PAYLOAD)
+
+
+def test_hedged_request_returns_fast_answer(servers):
+    slow, fast = servers(latency=1.0), servers(latency=0.01)
+    pool = ProviderPool([LLMProvider("slow", slow.url, "stub"), LLMProvider("fast", fast.url, "stub")],
+                        hedge=True, hedge_delay=0.05)
+    trace = Trace()
+
+    start = time.perf_counter()
+    result = pool.complete(PAYLOAD, trace=trace)
+    elapsed = time.perf_counter() - start
+
+    assert result['provider'] == "fast"
+    assert elapsed < 0.5
+    assert trace.counters['llm_hedged'] == 1 and trace.counters['llm_hedge_won'] == 1
+    assert trace.counters['llm_hedge_cancelled'] == 1
+    # Request yang kalah hedge dibatalkan, bukan dihitung sebagai kegagalan provider
+    assert pool.providers[0].failures == 0
+
+
+def test_async_hedge_loser_is_cancelled_and_closed(servers):
+    slow, fast = servers(latency=1.0), servers(latency=0.01)
+    primary, backup = LLMProvider("slow", slow.url, "stub"), LLMProvider("fast", fast.url, "stub")
+    pool = ProviderPool([primary, backup], hedge=True, hedge_delay=0.05)
+    opened = []
+    connect = primary._aconnect
+
+    async def tracked_connect():
+        reader, writer, reused = await connect()
+        opened.append(writer)
+        return reader, writer, reused
+
+    primary._aconnect = tracked_connect
+
+    async def run():
+        trace = Trace()
+        result = await pool.acomplete(PAYLOAD, trace=trace)
+        # Beri kesempatan task yang kalah memproses cancel
+        await asyncio.sleep(0.05)
+        return result, trace
+
+    result, trace = asyncio.run(run())
+
+    assert result['provider'] == "fast"
+    assert trace.counters['llm_hedge_cancelled'] == 1
+    assert len(opened) == 1 and opened[0].is_closing()
+    assert primary._idle_connections == [] and primary.failures == 0
+
+
+def test_rate_limiter_allows_burst_then_paces():
+    limiter = RateLimiter(rate=20.0, burst=3)
+
+    start = time.perf_counter()
+    for _ in range(3):
+        limiter.acquire()
+    burst_seconds = time.perf_counter() - start
+    for _ in range(4):
+        limiter.acquire()
+    elapsed = time.perf_counter() - start
+
+    assert burst_seconds < 0.02
+    # 4 token setelah burst habis butuh ~4 / rate detik
+    assert 0.18 <= elapsed < 0.5
@@ -0,0 +1,51 @@
+from src.metrics import MetricsCollector, Trace
+
+
+def make_trace(total, stages, counters=None, tokens=None):
+    trace = Trace()
+    trace.total_seconds = total
+    trace.stages.update(stages)
+    trace.counters.update(counters or {})
+    trace.tokens.update(tokens or {})
+    return trace
+
+
+def test_export_prometheus():
+    collector = MetricsCollector(namespace="rag", buckets=(0.1, 1.0))
+    collector.record(make_trace(0.05, {'retrieve': 0.02, 'llm': 0.5}, {'cache_hit': 1},
+                                {'prompt_tokens': 100, 'completion_tokens': 20}))
+    collector.record(make_trace(2.0, {'retrieve': 0.2, 'llm': 1.5}, {'cache_hit': 2, 'llm_errors': 1},
+                                {'prompt_tokens': 50}))
+
+    assert collector.export_prometheus() == "\n".join([
+        "# HELP rag_requests_total Jumlah query RAG yang direkam",
+        "# TYPE rag_requests_total counter",
+        "rag_requests_total 2",
+        "# HELP rag_query_duration_seconds Latency total query RAG",
+        "# TYPE rag_query_duration_seconds histogram",
+        'rag_query_duration_seconds_bucket{le="0.1"} 1',
+        'rag_query_duration_seconds_bucket{le="1.0"} 1',
+        'rag_query_duration_seconds_bucket{le="+Inf"} 2',
+        "rag_query_duration_seconds_sum 2.05",
+        "rag_query_duration_seconds_count 2",
+        "# HELP rag_stage_duration_seconds Latency per tahap pipeline RAG",
+        "# TYPE rag_stage_duration_seconds histogram",
+        'rag_stage_duration_seconds_bucket{stage="llm",le="0.1"} 0',
+        'rag_stage_duration_seconds_bucket{stage="llm",le="1.0"} 1',
+        'rag_stage_duration_seconds_bucket{stage="llm",le="+Inf"} 2',
+        'rag_stage_duration_seconds_sum{stage="llm"} 2.0',
+        'rag_stage_duration_seconds_count{stage="llm"} 2',
+        'rag_stage_duration_seconds_bucket{stage="retrieve",le="0.1"} 1',
+        'rag_stage_duration_seconds_bucket{stage="retrieve",le="1.0"} 2',
+        'rag_stage_duration_seconds_bucket{stage="retrieve",le="+Inf"} 2',
+        'rag_stage_duration_seconds_sum{stage="retrieve"} 0.22',
+        'rag_stage_duration_seconds_count{stage="retrieve"} 2',
+        "# HELP rag_events_total Counter event pipeline (calls, cache hit, dll)",
+        "# TYPE rag_events_total counter",
+        'rag_events_total{event="cache_hit"} 3',
+        'rag_events_total{event="llm_errors"} 1',
+        "# HELP rag_llm_tokens_total Token usage dari response LLM",
+        "# TYPE rag_llm_tokens_total counter",
+        'rag_llm_tokens_total{type="completion_tokens"} 20',
+        'rag_llm_tokens_total{type="prompt_tokens"} 150',
+    ]) + "\n"
@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+import pytest
+
+from src.admission import AdmissionController, DeadlineExceeded, Overloaded
+from src.llm_providers import LLMProvider, ProviderError
+from src.rag_chain import RAGChain
+from src.retriever import RAGRetriever
+from src.stub_llm_server import StubLLMServer
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(**kwargs):
+        server = StubLLMServer(**dict({'latency': 0.01, 'jitter': 0.0}, **kwargs))
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def make_chain(make_store):
+    def make(server, **kwargs):
+        store = make_store()
+        return RAGChain(store, RAGRetriever(store), providers=[LLMProvider("stub", server.url, "stub")], **kwargs)
+    return make
+
+
+def test_sync_and_async_query_raise_provider_error(stub_server, make_chain):
+    chain = make_chain(stub_server(error_rate=1.0))
+
+    with pytest.raises(ProviderError):
+        chain.query("Siapa presiden pertama Indonesia?")
+    with pytest.raises(ProviderError):
+        asyncio.run(chain.aquery("Siapa presiden pertama Indonesia?"))
+
+
+def test_async_query_deadline_during_llm(stub_server, make_chain):
+    chain = make_chain(stub_server(latency=1.0))
+
+    with pytest.raises(DeadlineExceeded) as error:
+        asyncio.run(chain.aquery("Siapa presiden pertama Indonesia?", timeout=0.3))
+    assert error.value.stage == 'llm'
+
+
+def test_async_query_with_session_records_turns(stub_server, make_chain):
+    chain = make_chain(stub_server())
+
+    async def conversation():
+        first = await chain.aquery("Siapa presiden pertama Indonesia?", session_id="s1")
+        second = await chain.aquery("Kapan dia membacakan proklamasi?", session_id="s1")
+        return first, second
+
+    first, second = asyncio.run(conversation())
+
+    assert first['response'] == "Jawaban stub untuk pertanyaan sejarah."
+    assert second['metrics']['counters'].get('followup_retrievals') == 1
+    assert len(chain.sessions.get("s1").turns) == 2
+
+
+def test_async_query_is_shed_by_admission(stub_server, make_chain):
+    chain = make_chain(stub_server(latency=0.3), admission=AdmissionController(max_concurrency=1, max_queue=0))
+
+    async def burst():
+        return await chain.agather(["Siapa Hatta?", "Siapa Hatta lagi?"], return_exceptions=True)
+
+    results = asyncio.run(burst())
+
+    assert sum(isinstance(result, Overloaded) for result in results) == 1
+    assert sum(isinstance(result, dict) for result in results) == 1
+    assert chain.admission.stats()['shed'] == 1 and chain.admission.stats()['active'] == 0
+
+
+class Killed(Exception):
+    pass
+
+
+def test_query_batch_resumes_without_duplicates(stub_server, make_chain, tmp_path):
+    chain = make_chain(stub_server())
+    questions = [f"Siapa tokoh sejarah nomor {i}?" for i in range(8)]
+    output_path = tmp_path / "answers.jsonl"
+    generate = chain.generate_response
+    calls = []
+
+    def dies_after_three(prompt, **kwargs):
+        if len(calls) == 3:
+            raise Killed()
+        calls.append(prompt)
+        return generate(prompt, **kwargs)
+
+    chain.generate_response = dies_after_three
+    with pytest.raises(Killed):
+        chain.query_batch(questions, output_path=str(output_path), max_concurrency=1)
+    # Proses mati saat menulis record berikutnya
+    with open(output_path, 'a', encoding='utf-8') as f:
+        f.write('{"index": 3, "question": "Siapa')
+
+    calls.clear()
+    chain.generate_response = lambda prompt, **kwargs: calls.append(prompt) or generate(prompt, **kwargs)
+    records = chain.query_batch(questions, output_path=str(output_path), max_concurrency=4)
+
+    assert len(calls) == len(questions) - 3
+    assert [record['index'] for record in records] == list(range(len(questions)))
+    assert [record['question'] for record in records] == questions
+    with open(output_path, 'r', encoding='utf-8') as f:
+        written = [json.loads(line)['index'] for line in f]
+    assert sorted(written) == list(range(len(questions)))
+
+
+def test_followup_reuses_previous_chunks(stub_server, make_chain):
+    chain = make_chain(stub_server())
+    encoder = chain.vector_store.model
+
+    first = chain.query("Siapa presiden pertama Indonesia?", session_id="s1")
+    previous = chain.sessions.get("s1").last_turn.chunk_indices
+    encoded = len(encoder.encode_calls)
+    second = chain.query("Kapan dia membacakan proklamasi?", session_id="s1")
+    followup_encodes = len(encoder.encode_calls) - encoded
+    fresh = chain.query("Kapan Jepang menduduki Hindia Belanda?", session_id="s1")
+
+    assert previous and 'followup_retrievals' not in first['metrics']['counters']
+    counters = second['metrics']['counters']
+    assert counters['followup_retrievals'] == 1 and 'query_variants' not in counters
+    # Follow-up meng-encode query sekali (tanpa expansion); kandidat lama hanya di-skor ulang
+    assert followup_encodes == 1
+    assert set(previous) & {part['index'] for part in second['context']['context_parts']}
+    assert 'followup_retrievals' not in fresh['metrics']['counters']
@@ -0,0 +1,50 @@
+import argparse
+
+import pytest
+
+from src.benchmark import DEFAULT_CHUNKS_PATH, DEFAULT_QUERIES_PATH, check_quality, run_benchmarks
+from src.encoder import load_encoder
+
+
+def make_report(hit_rate=0.9, recall=0.8, adaptive_recall=0.8, coverage=0.7, compressed_coverage=0.7, k=5):
+    return {
+        'vector_store_search': {f'hit_rate@{k}': hit_rate},
+        'retrieve_context': {f'hit_rate@{k}': hit_rate, f'recall@{k}': recall},
+        'retrieve_context_adaptive': {f'recall@{k}': adaptive_recall},
+        'end_to_end_stub_llm': {'keyword_coverage': coverage},
+        'end_to_end_compressed': {'keyword_coverage': compressed_coverage},
+    }
+
+
+def test_check_quality_passes_healthy_report():
+    assert check_quality(make_report(), k=5) == []
+
+
+@pytest.mark.parametrize('overrides, metric', [
+    ({'hit_rate': 0.5}, 'vector_store_search.hit_rate@5'),
+    ({'coverage': 0.3, 'compressed_coverage': 0.3}, 'end_to_end_stub_llm.keyword_coverage'),
+    ({'adaptive_recall': 0.6}, 'retrieve_context_adaptive.recall@5'),
+    ({'compressed_coverage': 0.5}, 'end_to_end_compressed.keyword_coverage'),
+])
+def test_check_quality_reports_regressions(overrides, metric):
+    failures = check_quality(make_report(**overrides), k=5)
+
+    assert any(failure.startswith(metric) for failure in failures)
+
+
+@pytest.fixture(scope='module')
+def model():
+    try:
+        return load_encoder("sentence-transformers/all-MiniLM-L6-v2", backend='float32')
+    except Exception as e:
+        pytest.skip(f"Model embedding tidak tersedia: {e}")
+
+
+def test_retrieval_quality_regression(model):
+    args = argparse.Namespace(queries=DEFAULT_QUERIES_PATH, chunks=DEFAULT_CHUNKS_PATH, k=5, repeats=1,
+                              llm_latency=0.0, llm_seconds_per_token=0.0, compress_budget=300,
+                              compare_encoder=None)
+
+    report = run_benchmarks(args, model=model)
+
+    assert check_quality(report, k=args.k) == []
@@ -0,0 +1,83 @@
+import socket
+import threading
+import time
+from multiprocessing.connection import Listener
+
+import numpy as np
+import pytest
+
+from src.sharded_store import ShardedVectorStore, serve_shard
+
+AUTHKEY = b"test-shard"
+
+
+def free_address():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()
+
+
+def fake_node(behaviour):
+    """
+    Node shard palsu yang menerima satu koneksi lalu diam (hang) atau langsung menutupnya (crash)
+    """
+    listener = Listener(("127.0.0.1", 0), authkey=AUTHKEY)
+    release = threading.Event()
+
+    def run():
+        with listener.accept() as conn:
+            if behaviour == 'hang':
+                release.wait(5)
+        listener.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return listener.address, release
+
+
+def make_corpus(n=40, dimension=8):
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((n, dimension)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    chunks = [{'chunk_id': f"chunk_{i}", 'source_title': f"article_{i % 4}"} for i in range(n)]
+    return chunks, embeddings
+
+
+def test_connect_times_out_on_hung_shard():
+    address, release = fake_node('hang')
+    store = ShardedVectorStore(encoder=None, startup_timeout=0.2)
+    try:
+        start = time.perf_counter()
+        with pytest.raises(TimeoutError, match="shard 0"):
+            store.connect([], [address], AUTHKEY)
+        assert time.perf_counter() - start < 2.0
+        assert store._shards == []
+    finally:
+        release.set()
+
+
+def test_connect_fails_on_crashed_shard():
+    address, _ = fake_node('crash')
+    store = ShardedVectorStore(encoder=None, startup_timeout=2.0)
+
+    with pytest.raises(RuntimeError, match="shard 0"):
+        store.connect([], [address], AUTHKEY)
+
+
+def test_shard_node_accepts_reconnect_after_client_restart():
+    chunks, embeddings = make_corpus()
+    address = free_address()
+    threading.Thread(target=serve_shard, args=(address, AUTHKEY, embeddings, np.arange(len(chunks))),
+                     daemon=True).start()
+
+    expected = int(np.argmax(embeddings @ embeddings[7]))
+    for _ in range(2):
+        store = ShardedVectorStore(encoder=None, shard_timeout=2.0)
+        for attempt in range(50):
+            try:
+                store.connect(chunks, [address], AUTHKEY)
+                break
+            except ConnectionRefusedError:
+                time.sleep(0.05)
+        results = store.search_by_embedding(embeddings[7:8], k=3, min_score=-1.0)
+        assert results[0]['index'] == expected
+        store.close()
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.single_flight import SingleFlight
+
+
+def run_in_thread(fn):
+    result = {}
+
+    def target():
+        try:
+            result['value'] = fn()
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, result
+
+
+def wait_for_followers(flight, requests, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while flight.requests < requests and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_followers_share_leader_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        release.wait(2)
+        return "jawaban"
+
+    leader, leader_result = run_in_thread(lambda: flight.do("key", upstream))
+    wait_for_followers(flight, 1)
+    followers = [run_in_thread(lambda: flight.do("key", upstream)) for _ in range(3)]
+    wait_for_followers(flight, 4)
+    release.set()
+    for thread, _ in [(leader, leader_result)] + followers:
+        thread.join(2)
+
+    assert len(calls) == 1
+    assert leader_result['value'] == ("jawaban", False)
+    assert all(result['value'] == ("jawaban", True) for _, result in followers)
+    stats = flight.stats()
+    assert stats['requests'] == 4 and stats['upstream_calls'] == 1 and stats['saved'] == 3
+    assert flight.in_flight() == 0
+
+
+def test_key_is_released_after_completion():
+    flight = SingleFlight()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("key", upstream) == (1, False)
+    assert flight.do("key", upstream) == (2, False)
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+
+    assert flight.do("a", lambda: "a") == ("a", False)
+    assert flight.do("b", lambda: "b") == ("b", False)
+    assert flight.stats()['saved'] == 0
+
+
+def test_follower_times_out_waiting_for_leader():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    leader, leader_result = run_in_thread(lambda: flight.do("key", lambda: release.wait(2) and "ok"))
+    wait_for_followers(flight, 1)
+    try:
+        with pytest.raises(TimeoutError):
+            flight.do("key", lambda: "tidak dipanggil", timeout=0.05)
+    finally:
+        release.set()
+        leader.join(2)
+
+    assert leader_result['value'] == ("ok", False)
+
+
+def test_follower_with_later_deadline_retries_after_leader_timeout():
+    flight = SingleFlight()
+    started = threading.Event()
+    calls = []
+
+    def leader_upstream():
+        calls.append('leader')
+        started.set()
+        time.sleep(0.1)
+        raise TimeoutError("deadline leader habis")
+
+    def follower_upstream():
+        calls.append('follower')
+        return "jawaban"
+
+    leader, leader_result = run_in_thread(lambda: flight.do("key", leader_upstream, timeout=0.1))
+    assert started.wait(2)
+    follower, follower_result = run_in_thread(lambda: flight.do("key", follower_upstream, timeout=5))
+    leader.join(2)
+    follower.join(2)
+
+    assert isinstance(leader_result['error'], TimeoutError)
+    # Follower tidak ikut gagal karena deadline-nya lebih lama; ia menjadi leader baru
+    assert follower_result['value'] == ("jawaban", False)
+    assert calls == ['leader', 'follower']
+    stats = flight.stats()
+    assert stats['requests'] == 2 and stats['upstream_calls'] == 2 and stats['saved'] == 0
+    assert stats['retries'] == 1
+
+
+def test_leader_error_is_shared_with_followers_without_more_time():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        release.wait(2)
+        raise RuntimeError("provider gagal")
+
+    leader, leader_result = run_in_thread(lambda: flight.do("key", upstream, timeout=5))
+    wait_for_followers(flight, 1)
+    follower, follower_result = run_in_thread(lambda: flight.do("key", upstream, timeout=1))
+    wait_for_followers(flight, 2)
+    release.set()
+    leader.join(2)
+    follower.join(2)
+
+    assert isinstance(leader_result['error'], RuntimeError)
+    assert follower_result['error'] is leader_result['error']
+    assert len(calls) == 1
+
+
+def test_async_follower_retries_after_leader_failure():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def leader_upstream():
+            calls.append('leader')
+            await asyncio.sleep(0.05)
+            raise TimeoutError("deadline leader habis")
+
+        async def follower_upstream():
+            calls.append('follower')
+            return "jawaban"
+
+        leader = asyncio.create_task(flight.ado("key", leader_upstream, timeout=0.5))
+        await asyncio.sleep(0.01)
+        follower = await flight.ado("key", follower_upstream, timeout=5)
+        with pytest.raises(TimeoutError):
+            await leader
+        return follower, calls
+
+    follower, calls = asyncio.run(scenario())
+
+    assert follower == ("jawaban", False)
+    assert calls == ['leader', 'follower']
@@ -0,0 +1,183 @@
+import numpy as np
+import pytest
+
+from src import shared_index
+from src.retriever import RAGRetriever
+from src.vector_store import VectorStore
+
+
+def clustered_corpus(articles=8, chunks_per_article=15, dimension=32, seed=0):
+    """
+    Chunk per artikel berkumpul di sekitar pusat artikel: routing ke artikel terdekat cukup untuk top-k
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((articles, dimension)).astype(np.float32)
+    chunks, embeddings = [], []
+    for article in range(articles):
+        for i in range(chunks_per_article):
+            chunks.append({'content': f"artikel {article} chunk {i}", 'source_title': f"Artikel {article}",
+                           'source_url': f"https://example.org/{article}", 'source_type': "Test",
+                           'chunk_id': f"artikel_{article}_chunk_{i}"})
+            embeddings.append(centers[article] + 0.3 * rng.standard_normal(dimension).astype(np.float32))
+    embeddings = np.array(embeddings, dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    queries = centers + 0.3 * rng.standard_normal(centers.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return chunks, embeddings, queries
+
+
+@pytest.fixture
+def clustered_store(encoder, tmp_path, monkeypatch):
+    monkeypatch.setenv('VECTOR_DB_PATH', str(tmp_path))
+    chunks, embeddings, queries = clustered_corpus()
+    store = VectorStore(model=encoder)
+    store.build_index(chunks, embeddings.copy())
+    return store, queries
+
+
+def search_ids(store, query, k, route_m):
+    results = store.search_by_embedding(query[None, :], k=k, min_score=-1.0, route_m=route_m)
+    return [r['index'] for r in results], [r['score'] for r in results]
+
+
+def test_router_is_built_with_the_index(clustered_store):
+    store, _ = clustered_store
+
+    assert len(store.article_titles) == 8
+    assert store.article_centroids.shape == (8, 32)
+
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_routed_search_matches_flat_search(clustered_store, encoder, mmap):
+    store, queries = clustered_store
+    if mmap:
+        store.save("routing")
+        store = VectorStore(model=encoder)
+        assert store.load("routing", mmap=True)
+
+    for query in queries:
+        flat_ids, flat_scores = search_ids(store, query, 5, route_m=0)
+        # Route ke semua artikel = exact search
+        all_ids, all_scores = search_ids(store, query, 5, route_m=len(store.article_titles))
+        assert all_ids == flat_ids
+        np.testing.assert_allclose(all_scores, flat_scores, rtol=1e-5)
+        # Artikel yang terpisah jelas: top-k flat ada di artikel terdekat
+        routed_ids, _ = search_ids(store, query, 5, route_m=2)
+        assert routed_ids == flat_ids
+
+
+def test_routing_without_titles_falls_back_to_flat(encoder, tmp_path, monkeypatch):
+    monkeypatch.setenv('VECTOR_DB_PATH', str(tmp_path))
+    chunks, embeddings, queries = clustered_corpus(articles=2, chunks_per_article=5)
+    for chunk in chunks:
+        del chunk['source_title']
+    store = VectorStore(model=encoder)
+    store.build_index(chunks, embeddings.copy())
+
+    assert store.article_titles == [] and store.article_centroids is None
+    assert search_ids(store, queries[0], 3, route_m=2) == search_ids(store, queries[0], 3, route_m=0)
+
+
+def test_add_document_rebuilds_router(make_store):
+    store = make_store()
+    titles = len(store.article_titles)
+
+    store.add_document("Budi Utomo", "Budi Utomo didirikan pada tahun 1908 oleh mahasiswa STOVIA.")
+
+    assert len(store.article_titles) == titles + 1
+    results = store.search("Budi Utomo didirikan mahasiswa STOVIA", k=1, route_m=1)
+    assert results[0]['chunk']['source_title'] == "Budi Utomo"
+
+
+def test_adaptive_retrieval_reports_range_search_scan_size(make_store):
+    store = make_store()
+    retriever = RAGRetriever(store)
+
+    context = retriever.retrieve_context("Soekarno presiden pertama", adaptive=True, expand=False)
+    assert context['candidates_examined'] == store.index.ntotal
+
+    context = retriever.retrieve_context("Soekarno presiden pertama", adaptive=True, expand=False,
+                                         filters={'source_title': "Hatta"})
+    assert context['candidates_examined'] == 2
+
+
+def test_mmap_store_refuses_save(clustered_store, encoder, tmp_path):
+    store, _ = clustered_store
+    store.save("routing")
+    store = VectorStore(model=encoder)
+    assert store.load("routing", mmap=True)
+    index_file = tmp_path / "routing.faiss"
+    before = index_file.stat().st_mtime_ns
+
+    store.save("routing")
+
+    assert index_file.stat().st_mtime_ns == before
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+@pytest.mark.parametrize('subset', [False, True])
+def test_mmap_search_subset_matches_exact_search(monkeypatch, subset):
+    monkeypatch.setattr(shared_index, 'SEARCH_BLOCK', 7)
+    _, embeddings, queries = clustered_corpus()
+    allowed_ids = np.arange(3, len(embeddings), 2) if subset else None
+    rows = embeddings if allowed_ids is None else embeddings[allowed_ids]
+    ids = np.arange(len(embeddings)) if allowed_ids is None else allowed_ids
+
+    scores, indices = shared_index.MmapFlatIndex(embeddings).search_subset(queries, 5, allowed_ids)
+
+    exact = queries @ rows.T
+    expected = np.argsort(-exact, axis=1)[:, :5]
+    np.testing.assert_array_equal(indices, ids[expected])
+    np.testing.assert_allclose(scores, np.take_along_axis(exact, expected, axis=1), rtol=1e-5)
+
+
+def test_bucketed_embeddings_keep_input_order(encoder, tmp_path, monkeypatch):
+    monkeypatch.setenv('VECTOR_DB_PATH', str(tmp_path))
+    rng = np.random.default_rng(0)
+    words = ["kemerdekaan", "proklamasi", "pemuda", "kongres", "Jakarta", "Soekarno", "Hatta", "Jepang"]
+    chunks = [{'content': " ".join(rng.choice(words, size=int(length)))} for length in rng.integers(1, 60, 50)]
+    store = VectorStore(model=encoder)
+
+    bucketed = store.create_embeddings(chunks, batch_size=4, max_batch_tokens=128, bucketed=True)
+    batches = encoder.encode_calls[:]
+    plain = store.create_embeddings(chunks, bucketed=False)
+
+    # Bucketing benar-benar memecah dan mengurutkan ulang input
+    assert len(batches) > 1 and [text for batch in batches for text in batch] != [c['content'] for c in chunks]
+    for batch in batches:
+        tokens = [len(text.split()) + 2 for text in batch]
+        assert len(batch) * max(tokens) <= 128
+    np.testing.assert_allclose(bucketed, plain, atol=1e-6)
+
+
+@pytest.mark.parametrize('titles, large', [(["Artikel 3"], False), ([f"Artikel {i}" for i in range(6)], True)])
+def test_filtered_search_returns_only_matching_sources(clustered_store, titles, large):
+    store, queries = clustered_store
+    filters = {'source_title': titles}
+    _, block = store._filter_subset(filters)
+    # Subset kecil memakai blok embeddings, subset besar memakai IDSelector FAISS
+    assert (block is None) == large
+    allowed = np.array([i for i, chunk in enumerate(store.chunks) if chunk['source_title'] in titles])
+
+    for query in queries:
+        results = store.search_by_embedding(query[None, :], k=5, min_score=-1.0, filters=filters)
+        assert [r['chunk']['source_title'] in titles for r in results] == [True] * 5
+        expected = allowed[np.argsort(-(store.embeddings[allowed] @ query))[:5]]
+        assert [r['index'] for r in results] == expected.tolist()
+
+
+def test_add_document_merges_near_duplicate(make_store):
+    store = make_store()
+    store.dedup_threshold = 0.95
+    ntotal = store.index.ntotal
+    original = next(i for i, chunk in enumerate(store.chunks) if chunk['chunk_id'] == "soekarno_chunk_0")
+
+    merged = store.add_document("Arsip Proklamasi", "Soekarno adalah presiden pertama Republik Indonesia!")
+
+    assert merged == original and store.index.ntotal == ntotal
+    chunk = store.chunks[original]
+    assert [source['source_title'] for source in chunk['sources']] == ["Soekarno", "Arsip Proklamasi"]
+    assert chunk['duplicate_count'] == 2
+
+    added = store.add_document("Budi Utomo", "Budi Utomo didirikan pada tahun 1908 oleh mahasiswa STOVIA.")
+    assert added == ntotal and store.index.ntotal == ntotal + 1